@@ -229,7 +229,7 @@ def example5_freecad_integration():
     
     # Convert offsets to 3D points
     points = []
-    for offset in calc.outputs:
+    for offset in calc.outputs.values():
         x = offset["x"] / 100  # Convert cm to m
         y = offset["y"] / 100
         z = offset["z"] / 100
@@ -267,7 +267,7 @@ def example6_export_for_cad():
         writer = csv.writer(f)
         writer.writerow(["Section", "X(cm)", "Y(cm)", "Z(cm)", "Submerged"])
         
-        for offset in calc.outputs:
+        for offset in calc.outputs.values():
             is_submerged = "Yes" if offset["z"] < 0 else "No"
             writer.writerow([
                 offset["section"],
@@ -3,34 +3,478 @@ Pure Python Hull Calculator - No ODS Dependency
 
 Computes hull geometry and offsets from input parameters.
 Output: JSON with all offset values for rows 9-139 of "Offsets x,y,z" sheet.
+
+With NumPy the offsets of every (section, z level) pair are computed as one
+array expression (offset_grid); the per-section loop in
+_compute_section_offsets is kept as the scalar reference implementation.
+
+compute() results are memoized in an LRU ResultCache keyed by the rounded
+inputs, so switching back to an earlier design costs a dict copy. On a
+cache miss only the stages (STAGE_INPUTS) and offset columns
+(OFFSET_COLUMN_INPUTS) whose inputs changed since the last compute() run.
+
+The stations and z levels come from an OffsetGrid (default: the workbook's
+24 sections and 10 levels); iter_offsets() yields fine grids row by row or
+in station blocks without building the outputs.
+
+With NumPy the offsets are stored as one OFFSET_DTYPE structured array
+(HullCalculator.offsets, 36 bytes per point); outputs is an OffsetRows view
+giving the historical {"Row_N": {section, x, y, z, z_level}} rows on access.
 """
 
 import json
 import math
-from typing import Dict, Any, Optional, List, Tuple
+import os
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Dict, Any, Optional, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+
+# Output sections in row order and their X position (% of Lwl from bow)
+SECTION_NAMES = ["Car2", "C0", "C0.5", "C1", "C1.5", "C2", "C2.5", "C3", "C3.5",
+                 "C4", "C4.5", "C5", "C5.5", "C6", "C6.5", "C7", "C7.5",
+                 "C8", "C8.5", "C9", "C9.5", "C10", "Cav1", "Cav2"]
+SECTION_X_PCT = {
+    "Car2": -5.0,  # Carena section 2 - forward of bow
+    "C0": 0.0, "C0.5": 5.0, "C1": 10.0, "C1.5": 15.0, "C2": 20.0,
+    "C2.5": 25.0, "C3": 30.0, "C3.5": 35.0, "C4": 40.0, "C4.5": 45.0,
+    "C5": 50.0, "C5.5": 55.0, "C6": 60.0, "C6.5": 65.0, "C7": 70.0,
+    "C7.5": 75.0, "C8": 80.0, "C8.5": 85.0, "C9": 90.0, "C9.5": 95.0,
+    "C10": 100.0, "Cav1": 110.0, "Cav2": 120.0
+}
+
+
+# Defaults of the inputs read by the calculator (missing inputs take these)
+INPUT_DEFAULTS = {
+    "Lwl": 8.0, "Tc": 0.37, "X_Tc": 50.0, "Xbow": 9.0, "Zbow": 0.85, "Cet": 3.0,
+    "X_tab_ar": -1.3, "Z_tab_ar": 0.24, "Bg": 2.196, "X_Bg": 43.0, "Pui_liv_y": 2.0,
+    "X_liv_ar": -0.6, "Z_liv_m": 0.72, "Z_liv_ar": 0.74,
+}
+
+# Inputs that affect each compute() stage; a stage is skipped when none changed
+STAGE_INPUTS = {
+    "hull_dimensions": ("Lwl", "Tc", "Bg", "Xbow", "Zbow", "X_tab_ar", "Z_tab_ar",
+                        "Z_liv_m", "Z_liv_ar"),
+    "sections": ("Lwl", "X_Tc"),
+    "offsets": ("Lwl", "Tc", "Bg", "Pui_liv_y"),
+}
+
+# Inputs of each offsets column; Tc also fixes the row layout (z levels)
+OFFSET_COLUMN_INPUTS = {"x": ("Lwl",), "y": ("Tc", "Bg", "Pui_liv_y"), "z": ("Tc",)}
+
+# Columns of the offsets structured array; section indexes OffsetRows.sections
+OFFSET_DTYPE = [("section", "<i4"), ("x", "<f8"), ("y", "<f8"), ("z", "<f8"), ("z_level", "<f8")]
+
+# Last axis of compute_batch() results
+BATCH_COLUMNS = ("x", "y", "z")
+
+# Input schema shipped next to this module (parameters compute_batch accepts)
+INPUT_SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "input_schema.json")
+
+
+def z_levels_for(tc: float, below: int = 4, above: int = 6, top: float = 0.5) -> List[float]:
+    """
+    Z levels of every section: `below` levels from -Tc up to the waterline,
+    then `above` levels from 0 to `top` (default: the workbook's 4 + 6)
+    """
+    return ([-tc * (1 - i / below) for i in range(below)] + [0]
+            + [top * j / (above - 1) for j in range(1, above)])
+
+
+class OffsetGrid:
+    """
+    Stations and z levels of the offsets table. Without `stations` the
+    workbook sections are used (SECTION_NAMES at SECTION_X_PCT); otherwise
+    stations S0..S{n-1} run from x_start to x_end (% of Lwl from bow), evenly
+    ("uniform") or clustered at bow and stern ("cosine"). With `max_dz` (m)
+    the level counts grow until no z gap exceeds it, so they adapt to Tc.
+    """
+    
+    SPACINGS = ("uniform", "cosine")
+    
+    def __init__(self, stations: Optional[int] = None, spacing: str = "uniform",
+                 x_start: float = 0.0, x_end: float = 100.0, levels_below: int = 4,
+                 levels_above: int = 6, z_top: float = 0.5, max_dz: Optional[float] = None):
+        if spacing not in self.SPACINGS:
+            raise ValueError(f"Unknown station spacing {spacing!r}, expected one of {self.SPACINGS}")
+        if stations is not None and stations < 2:
+            raise ValueError("An offset grid needs at least 2 stations")
+        if levels_below < 1 or levels_above < 2:
+            raise ValueError("An offset grid needs at least 1 level below and 2 above the waterline")
+        if max_dz is not None and max_dz <= 0:
+            raise ValueError("max_dz must be positive")
+        self.stations = stations
+        self.spacing = spacing
+        self.x_start = x_start
+        self.x_end = x_end
+        self.levels_below = levels_below
+        self.levels_above = levels_above
+        self.z_top = z_top
+        self.max_dz = max_dz
+    
+    @property
+    def key(self) -> Tuple[Any, ...]:
+        return (self.stations, self.spacing, self.x_start, self.x_end, self.levels_below,
+                self.levels_above, self.z_top, self.max_dz)
+    
+    def sections(self) -> Tuple[List[str], List[float]]:
+        """Station names and X positions (% of Lwl), in row order"""
+        if self.stations is None:
+            return list(SECTION_NAMES), [SECTION_X_PCT[name] for name in SECTION_NAMES]
+        n = self.stations
+        span = self.x_end - self.x_start
+        if self.spacing == "cosine":
+            x_pct = [self.x_start + span * (1 - math.cos(math.pi * i / (n - 1))) / 2 for i in range(n)]
+        else:
+            x_pct = [self.x_start + span * i / (n - 1) for i in range(n)]
+        return [f"S{i}" for i in range(n)], x_pct
+    
+    def level_counts(self, tc: float) -> Tuple[int, int]:
+        """(levels below, levels above) the waterline for draft tc"""
+        below, above = self.levels_below, self.levels_above
+        if self.max_dz is not None:
+            below = max(below, math.ceil(abs(tc) / self.max_dz))
+            above = max(above, math.ceil(self.z_top / self.max_dz) + 1)
+        return below, above
+    
+    def z_levels(self, tc) -> List[Any]:
+        """Z levels (m) for draft tc (a float, or an array for compute_batch)"""
+        if self.max_dz is not None and np is not None and np.ndim(tc):
+            raise ValueError("Adaptive z levels (max_dz) differ per design; compute_batch needs a fixed grid")
+        below, above = self.level_counts(tc)
+        return z_levels_for(tc, below, above, self.z_top)
+
+
+def offset_grid(x_pct, z, bg, tc, pui_liv_y):
+    """
+    Half-beam Y for every X position (% of Lwl) and Z level at once.
+    Arguments broadcast: x_pct[:, None] and z[None, :] give a
+    (sections, levels) grid. Same formula as _compute_section_offsets;
+    a negative X with a fractional Pui_liv_y gives NaN instead of a
+    complex number.
+    """
+    x_norm = np.asarray(x_pct, dtype=float) / 100.0
+    z = np.asarray(z, dtype=float)
+    tc = np.asarray(tc, dtype=float)
+    with np.errstate(all="ignore"):
+        z_norm = np.where(tc != 0, z / np.where(tc != 0, tc, 1.0), 0.0)
+        above = 0.1 * bg * (1 - x_norm**2) * (1 + 0.1 * x_norm)
+        below = bg * (1 - x_norm**pui_liv_y) * (1 + np.abs(z_norm) * 0.3)
+    return np.where(z >= 0, above, below)
+
+
+CacheKey = Tuple[Tuple[str, Any], ...]
+
+
+def canonical_inputs(inputs: Dict[str, Any], digits: int = 9) -> CacheKey:
+    """
+    Cache key of an input dict: sorted (name, value) pairs with numbers
+    rounded to `digits` decimals, so 8 and 8.0000000001 share a result.
+    """
+    key = []
+    for name, value in sorted(inputs.items()):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = round(float(value), digits) + 0.0  # -0.0 -> 0.0
+        elif value is not None and not isinstance(value, (str, bool)):
+            value = repr(value)
+        key.append((name, value))
+    return tuple(key)
+
+
+class OffsetRows(Mapping):
+    """
+    Read-only {"Row_N": row dict} view of an OFFSET_DTYPE array, in row
+    order from `first_row`. Row dicts are built on access; the array (made
+    read-only here) is the only storage.
+    """
+    
+    def __init__(self, data: "np.ndarray", sections: List[str], first_row: int = 9):
+        data.flags.writeable = False
+        self.data = data
+        self.sections = sections
+        self.first_row = first_row
+    
+    @classmethod
+    def from_dicts(cls, rows: Sequence[Dict[str, Any]], sections: List[str],
+                   first_row: int = 9) -> "OffsetRows":
+        ids = {name: i for i, name in enumerate(sections)}
+        data = np.array([(ids[r["section"]], r["x"], r["y"], r["z"], r["z_level"]) for r in rows],
+                        dtype=OFFSET_DTYPE)
+        return cls(data, sections, first_row)
+    
+    def __len__(self) -> int:
+        return len(self.data)
+    
+    def __iter__(self):
+        return (f"Row_{self.first_row + i}" for i in range(len(self.data)))
+    
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        i = -1
+        if isinstance(key, str) and key.startswith("Row_") and key[4:].isdigit():
+            i = int(key[4:]) - self.first_row
+        if not 0 <= i < len(self.data):
+            raise KeyError(key)
+        section, x, y, z, z_level = self.data[i].tolist()
+        return {"section": self.sections[section], "x": x, "y": y, "z": z, "z_level": z_level}
+    
+    def rows(self):
+        """("Row_N", row dict) pairs in row order, faster than items()"""
+        sections = self.sections
+        for i, (section, x, y, z, z_level) in enumerate(self.data.tolist(), self.first_row):
+            yield f"Row_{i}", {"section": sections[section], "x": x, "y": y, "z": z, "z_level": z_level}
+    
+    def __repr__(self) -> str:
+        return f"OffsetRows({len(self.data)} rows, {len(self.sections)} sections)"
+    
+    def to_json(self) -> Dict[str, Any]:
+        return {"sections": self.sections, "first_row": self.first_row,
+                "columns": {name: self.data[name].tolist() for name, _ in OFFSET_DTYPE}}
+    
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "OffsetRows":
+        columns = data["columns"]
+        array = np.empty(len(columns["section"]), dtype=OFFSET_DTYPE)
+        for name, _ in OFFSET_DTYPE:
+            array[name] = columns[name]
+        return cls(array, data["sections"], data.get("first_row", 9))
+
+
+class ResultCache:
+    """
+    LRU cache of compute() results (intermediate and outputs), with hit/miss
+    counters and an optional JSON backing file. Stored results cannot be
+    changed through what get() returns: OffsetRows are read-only and shared,
+    dicts are copied.
+    """
+    
+    def __init__(self, capacity: int = 32, path: Optional[str] = None):
+        self.capacity = capacity
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[CacheKey, Tuple[Dict[str, float], Dict[str, Any]]]" = OrderedDict()
+        if path and os.path.exists(path):
+            self.load(path)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, key: CacheKey) -> bool:
+        return key in self._entries
+    
+    def get(self, key: CacheKey) -> Optional[Tuple[Dict[str, float], Dict[str, Any]]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        intermediate, outputs = entry
+        return dict(intermediate), self._copy(outputs)
+    
+    def put(self, key: CacheKey, intermediate: Dict[str, float], outputs: Mapping):
+        if self.capacity <= 0:
+            return
+        self._entries[key] = (dict(intermediate), self._copy(outputs))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+    
+    @staticmethod
+    def _copy(outputs: Mapping) -> Mapping:
+        if isinstance(outputs, OffsetRows):
+            return outputs
+        return {row: dict(data) for row, data in outputs.items()}
+    
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = 0
+    
+    def info(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries),
+                "capacity": self.capacity, "path": self.path}
+    
+    def save(self, path: Optional[str] = None):
+        """Write the entries (least recently used first) to a JSON file"""
+        path = path or self.path
+        if not path:
+            raise ValueError("No cache file path given")
+        data = {"entries": [{"key": [list(pair) for pair in key], "intermediate": intermediate,
+                             "outputs": outputs.to_json() if isinstance(outputs, OffsetRows) else outputs}
+                            for key, (intermediate, outputs) in self._entries.items()]}
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    
+    def load(self, path: str):
+        """Add the entries of a JSON cache file; an unreadable file is ignored"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entries = json.load(f).get("entries", [])
+        except (OSError, ValueError):
+            return
+        for entry in entries:
+            key = tuple((name, value) for name, value in entry["key"])
+            outputs = entry["outputs"]
+            if "columns" in outputs:
+                if np is None:
+                    continue
+                outputs = OffsetRows.from_json(outputs)
+            self.put(key, entry["intermediate"], outputs)
 
 
 class HullCalculator:
     """Main calculator for hull geometry"""
     
-    def __init__(self):
+    def __init__(self, vectorized: bool = True, cache_size: int = 32,
+                 cache_path: Optional[str] = None, cache_digits: int = 9,
+                 grid: Optional[OffsetGrid] = None, schema_path: Optional[str] = None):
         self.inputs: Dict[str, float] = {}
-        self.outputs: Dict[str, Any] = {}
+        # OffsetRows view of the offsets array (plain dict without NumPy)
+        self.outputs: Mapping = {}
         self.intermediate: Dict[str, float] = {}
+        # Array evaluation of the offsets grid; False (or no NumPy) uses the scalar path
+        self.vectorized = vectorized and np is not None
+        # Memoized compute() results; cache_size=0 disables, cache_path persists (save_cache)
+        self.cache = ResultCache(cache_size, cache_path)
+        self.cache_digits = cache_digits
+        self.grid = grid or OffsetGrid()
+        # Inputs of the last compute() (None: nothing computed yet) and stages run by it
+        self._computed_inputs: Optional[Dict[str, Any]] = None
+        self.last_stages: List[str] = []
+        # Input schema whose numeric parameters compute_batch accepts, loaded on
+        # first use (None: the bundled input_schema.json, if present)
+        self.schema_path = schema_path
+        self._batch_parameters: Optional[frozenset] = None
     
     def set_inputs(self, inputs_dict: Dict[str, float]):
-        """Set input parameters"""
+        """Set input parameters (results of unchanged stages are kept for compute())"""
         self.inputs = inputs_dict
-        self.outputs = {}
-        self.intermediate = {}
+    
+    def changed_inputs(self) -> Optional[set]:
+        """Inputs that differ from the last compute(); None before the first one"""
+        if self._computed_inputs is None:
+            return None
+        previous = self._computed_inputs
+        return {k for k in set(self.inputs) | set(previous) if self.inputs.get(k) != previous.get(k)}
+    
+    def invalidate(self):
+        """Make the next compute() run every stage"""
+        self._computed_inputs = None
+    
+    @property
+    def offsets(self) -> Optional["np.ndarray"]:
+        """OFFSET_DTYPE array of the computed offsets (None without NumPy or before compute())"""
+        return self.outputs.data if isinstance(self.outputs, OffsetRows) else None
+    
+    def set_grid(self, grid: OffsetGrid):
+        """Use another station / z level grid for the offsets"""
+        self.grid = grid
+        self.invalidate()
     
     def compute(self) -> Dict[str, Any]:
         """Main computation pipeline"""
-        self._compute_hull_dimensions()
-        self._compute_sections()
-        self._compute_offsets()
+        key = None
+        if self.cache.capacity > 0:
+            key = canonical_inputs(self.inputs, self.cache_digits) + (("grid", repr(self.grid.key)),)
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            self.intermediate, self.outputs = cached
+            self.last_stages = []
+        else:
+            changed = self.changed_inputs()
+            if changed is None:
+                self.intermediate, self.outputs = {}, {}
+            self.last_stages = [stage for stage, names in STAGE_INPUTS.items()
+                                if changed is None or not changed.isdisjoint(names)]
+            if "hull_dimensions" in self.last_stages:
+                self._compute_hull_dimensions()
+            if "sections" in self.last_stages:
+                self._compute_sections()
+            if "offsets" in self.last_stages:
+                self._compute_offsets(changed)
+            if key is not None:
+                self.cache.put(key, self.intermediate, self.outputs)
+        self._computed_inputs = dict(self.inputs)
         return self.outputs
     
+    def cache_info(self) -> Dict[str, Any]:
+        """Hit/miss counters and size of the result cache"""
+        return self.cache.info()
+    
+    def save_cache(self, path: Optional[str] = None):
+        """Persist the result cache (default: the cache_path given at construction)"""
+        self.cache.save(path)
+    
+    def compute_batch(self, inputs_table, parameters: Optional[Sequence[str]] = None) -> "np.ndarray":
+        """
+        Offsets of N designs at once: (N, sections, levels, 3) array of x, y,
+        z in cm (BATCH_COLUMNS, not rounded), sections in grid order.
+        
+        inputs_table is a list of input dicts, or an (N, P) array whose
+        columns are `parameters` (default: the INPUT_DEFAULTS keys). Names
+        must be INPUT_DEFAULTS keys or numeric parameters of the calculator's
+        input schema (accepted but not read); anything else raises
+        KeyError. Inputs missing from the table come from self.inputs, then
+        INPUT_DEFAULTS. Unlike compute(),
+        coinciding z levels (Tc = 0) are kept so every design has the same
+        shape. self.outputs is not touched.
+        """
+        if np is None:
+            raise ImportError("numpy is required for compute_batch")
+        columns = self._batch_columns(inputs_table, parameters)
+        lwl, tc, bg, pui_liv_y = (columns[k][:, None, None] for k in ("Lwl", "Tc", "Bg", "Pui_liv_y"))
+        
+        x_pct = np.array(self.grid.sections()[1])[None, :, None]
+        z = np.stack(np.broadcast_arrays(*self.grid.z_levels(columns["Tc"])), axis=-1)[:, None, :]
+        result = np.empty((len(columns["Lwl"]), x_pct.shape[1], z.shape[-1], 3))
+        result[..., 0] = x_pct / 100.0 * lwl * 100
+        result[..., 1] = offset_grid(x_pct, z, bg, tc, pui_liv_y) * 100
+        result[..., 2] = z * 100
+        return result
+    
+    def _batch_columns(self, inputs_table, parameters: Optional[Sequence[str]]) -> Dict[str, "np.ndarray"]:
+        """One length-N float column per input read by the calculator"""
+        if len(inputs_table) == 0:
+            raise ValueError("compute_batch needs at least one design, got an empty table")
+        if isinstance(inputs_table[0], Mapping):
+            rows = list(inputs_table)
+            self._check_batch_parameters({k for row in rows for k in row})
+            base = {k: self.inputs.get(k, default) for k, default in INPUT_DEFAULTS.items()}
+            return {k: np.array([row.get(k, default) for row in rows], dtype=float)
+                    for k, default in base.items()}
+        
+        table = np.asarray(inputs_table, dtype=float)
+        parameters = list(INPUT_DEFAULTS) if parameters is None else list(parameters)
+        self._check_batch_parameters(parameters)
+        if table.ndim != 2 or table.shape[1] != len(parameters):
+            raise ValueError(f"Expected an (N, {len(parameters)}) table for parameters {parameters}, "
+                             f"got shape {table.shape}")
+        n = table.shape[0]
+        columns = {k: np.full(n, float(self.inputs.get(k, default))) for k, default in INPUT_DEFAULTS.items()}
+        for j, name in enumerate(parameters):
+            if name in columns:
+                columns[name] = table[:, j]
+        return columns
+    
+    def _check_batch_parameters(self, names):
+        """KeyError for names that are neither INPUT_DEFAULTS keys nor schema parameters"""
+        unknown = set(names) - set(INPUT_DEFAULTS)
+        if not unknown:
+            return
+        if self._batch_parameters is None:
+            path = self.schema_path or INPUT_SCHEMA_PATH
+            schema = load_input_schema(path) if self.schema_path or os.path.exists(path) else {}
+            self._batch_parameters = frozenset(INPUT_DEFAULTS) | frozenset(schema_parameters(schema))
+        unknown -= self._batch_parameters
+        if unknown:
+            raise KeyError(f"Unknown input parameters: {sorted(unknown)}")
+    
     def _compute_hull_dimensions(self):
         """Compute basic hull dimensions from inputs"""
         # Extract key inputs
@@ -90,8 +534,108 @@ class HullCalculator:
             # Y (half-beam) will be computed based on hull shape
             # Z (height) will be computed based on freeboard
     
-    def _compute_offsets(self):
-        """Compute offset coordinates (Y, Z) for each section"""
+    def _compute_offsets(self, changed: Optional[set] = None):
+        """
+        Compute offset coordinates (Y, Z) for each section. With `changed`
+        (inputs changed since the previous offsets) and an unchanged Tc only
+        the affected columns of the existing offsets are recomputed.
+        """
+        if not self.vectorized:
+            self.outputs = {}
+            self._compute_offsets_scalar()
+            if np is not None:
+                self.outputs = OffsetRows.from_dicts(list(self.outputs.values()), self.grid.sections()[0])
+            return
+        
+        names, x_pct = self.grid.sections()
+        z_levels = self._z_levels()
+        n_levels = len(z_levels)
+        columns = {c for c, inputs in OFFSET_COLUMN_INPUTS.items()
+                   if changed is None or not changed.isdisjoint(inputs)}
+        if ("z" not in columns and isinstance(self.outputs, OffsetRows)
+                and len(self.outputs) == len(names) * n_levels):
+            data = self.outputs.data.copy()
+            if "x" in columns:
+                data["x"] = np.repeat(self._offset_x_cm(x_pct), n_levels)
+            if "y" in columns:
+                data["y"] = np.ravel(self._offset_y_cm(x_pct, z_levels))
+            self.outputs = OffsetRows(data, names)
+            return
+        
+        self.outputs = OffsetRows(np.concatenate(list(self._offset_blocks(names, x_pct, z_levels, 256))),
+                                  names)
+    
+    def iter_offsets(self, block: Optional[int] = None, chunk: int = 256):
+        """
+        Offsets of the current inputs and grid, generated lazily (self.outputs
+        is not touched). By default ("Row_N", row dict) pairs as in outputs;
+        with `block`, OFFSET_DTYPE arrays of `block` stations each (section
+        ids index the grid's station names). Only one chunk or block of
+        stations is held in memory at a time.
+        """
+        names, x_pct = self.grid.sections()
+        z_levels = self._z_levels()
+        if block is not None:
+            if np is None:
+                raise ImportError("numpy is required for block output")
+            yield from self._offset_blocks(names, x_pct, z_levels, block)
+            return
+        
+        row = 9
+        if self.vectorized:
+            for data in self._offset_blocks(names, x_pct, z_levels, chunk):
+                yield from OffsetRows(data, names, row).rows()
+                row += len(data)
+            return
+        
+        lwl = self.inputs.get("Lwl", 8.0)
+        z_cm = [round(z * 100, 2) for z in z_levels]
+        for section_name, x in zip(names, x_pct):
+            x_cm = round((x / 100.0) * lwl * 100, 2)
+            section = self._compute_section_offsets(section_name, x, z_levels)
+            for z_level, z, y in zip(z_levels, z_cm, section.values()):
+                yield f"Row_{row}", {
+                    "section": section_name,
+                    "x": x_cm,
+                    "y": round(y * 100, 2),
+                    "z": z,
+                    "z_level": z_level
+                }
+                row += 1
+    
+    def _offset_blocks(self, names: List[str], x_pct: List[float], z_levels: List[float], size: int):
+        """OFFSET_DTYPE arrays of `size` stations (Python rounding, as in the scalar path)"""
+        n_levels = len(z_levels)
+        z_cm = [round(z * 100, 2) for z in z_levels]
+        for start in range(0, len(names), size):
+            x_chunk = x_pct[start:start + size]
+            data = np.empty(len(x_chunk) * n_levels, dtype=OFFSET_DTYPE)
+            data["section"] = np.repeat(np.arange(start, start + len(x_chunk)), n_levels)
+            data["x"] = np.repeat(self._offset_x_cm(x_chunk), n_levels)
+            data["y"] = np.ravel(self._offset_y_cm(x_chunk, z_levels))
+            data["z"] = np.tile(z_cm, len(x_chunk))
+            data["z_level"] = np.tile(np.array(z_levels, dtype=float), len(x_chunk))
+            yield data
+    
+    def _z_levels(self) -> List[float]:
+        """Z levels of the current Tc; coinciding levels (Tc = 0) give one row, as in the scalar path"""
+        return list(dict.fromkeys(self.grid.z_levels(self.inputs.get("Tc", 0.37))))
+    
+    def _offset_x_cm(self, x_pct: Sequence[float]) -> List[float]:
+        """Rounded X (cm) of the given sections"""
+        lwl = self.inputs.get("Lwl", 8.0)
+        return [round(x, 2) for x in (np.array(x_pct) / 100.0 * lwl * 100).tolist()]
+    
+    def _offset_y_cm(self, x_pct: Sequence[float], z_levels: List[float]) -> List[List[float]]:
+        """Rounded half-beam Y (cm), sections x z levels"""
+        tc = self.inputs.get("Tc", 0.37)
+        bg = self.inputs.get("Bg", 2.196)
+        pui_liv_y = self.inputs.get("Pui_liv_y", 2.0)
+        y = offset_grid(np.array(x_pct)[:, None], np.array(z_levels)[None, :], bg, tc, pui_liv_y)
+        return [[round(v, 2) for v in row] for row in (y * 100).tolist()]
+    
+    def _compute_offsets_scalar(self):
+        """Reference implementation of _compute_offsets, one section at a time"""
         lwl = self.inputs.get("Lwl", 8.0)
         tc = self.inputs.get("Tc", 0.37)
         bg = self.inputs.get("Bg", 2.196)
@@ -105,15 +649,12 @@ class HullCalculator:
         # This is a simplified offset table
         
         row = 9
-        section_names = ["Car2", "C0", "C0.5", "C1", "C1.5", "C2", "C2.5", "C3", "C3.5", 
-                        "C4", "C4.5", "C5", "C5.5", "C6", "C6.5", "C7", "C7.5", 
-                        "C8", "C8.5", "C9", "C9.5", "C10", "Cav1", "Cav2"]
+        section_names, section_x_pct = self.grid.sections()
         
         # For each section, generate Y/Z offsets at multiple Z levels
-        z_levels = [-tc, -tc*0.75, -tc*0.5, -tc*0.25, 0, 0.1, 0.2, 0.3, 0.4, 0.5]
+        z_levels = self.grid.z_levels(tc)
         
-        for section_name in section_names:
-            x_pct = self._get_section_x_pct(section_name)
+        for section_name, x_pct in zip(section_names, section_x_pct):
             if x_pct is not None:
                 x_pos = (x_pct / 100.0) * lwl
                 
@@ -133,15 +674,8 @@ class HullCalculator:
     
     def _get_section_x_pct(self, section_name: str) -> Optional[float]:
         """Get X position (% of Lwl) for a section"""
-        sections = {
-            "Car2": -5.0,  # Carena section 2 - forward of bow
-            "C0": 0.0, "C0.5": 5.0, "C1": 10.0, "C1.5": 15.0, "C2": 20.0,
-            "C2.5": 25.0, "C3": 30.0, "C3.5": 35.0, "C4": 40.0, "C4.5": 45.0,
-            "C5": 50.0, "C5.5": 55.0, "C6": 60.0, "C6.5": 65.0, "C7": 70.0,
-            "C7.5": 75.0, "C8": 80.0, "C8.5": 85.0, "C9": 90.0, "C9.5": 95.0,
-            "C10": 100.0, "Cav1": 110.0, "Cav2": 120.0
-        }
-        return sections.get(section_name)
+        names, x_pct = self.grid.sections()
+        return dict(zip(names, x_pct)).get(section_name)
     
     def _compute_section_offsets(self, section_name: str, x_pct: float, 
                                  z_levels: List[float]) -> Dict[float, float]:
@@ -178,7 +712,7 @@ class HullCalculator:
         export_data = {
             "inputs": self.inputs,
             "intermediate": self.intermediate,
-            "outputs": self.outputs,
+            "outputs": dict(self.outputs.rows() if isinstance(self.outputs, OffsetRows) else self.outputs),
             "metadata": {
                 "description": "Hull offsets computed from input parameters",
                 "rows": "9-139 from Offsets x,y,z sheet",
@@ -189,15 +723,25 @@ class HullCalculator:
         with open(output_path, "w", encoding="utf-8") as f:
             json.dump(export_data, f, indent=2)
     
-    def export_csv(self, output_path: str):
-        """Export computed offsets to CSV"""
+    def export_csv(self, output_path: str, stream: bool = False):
+        """
+        Export computed offsets to CSV. With stream=True the rows come from
+        iter_offsets() (no compute() needed, memory bounded for large grids).
+        """
         import csv
         
         with open(output_path, "w", newline="", encoding="utf-8") as f:
             writer = csv.writer(f)
             writer.writerow(["Section", "X(cm)", "Y(cm)", "Z(cm)"])
             
-            for row_key, row_data in sorted(self.outputs.items()):
+            # Row order (sorting the "Row_N" keys as strings put Row_100 before Row_11)
+            if stream:
+                rows = self.iter_offsets()
+            elif isinstance(self.outputs, OffsetRows):
+                rows = self.outputs.rows()
+            else:
+                rows = self.outputs.items()
+            for row_key, row_data in rows:
                 writer.writerow([
                     row_data.get("section", ""),
                     row_data.get("x", ""),
@@ -213,6 +757,12 @@ def load_input_schema(schema_path: str) -> Dict[str, Dict[str, Any]]:
     return schema.get("inputs", {})
 
 
+def schema_parameters(schema: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Numeric parameter names of a schema, in schema order (compute_batch columns)"""
+    return [key for key, data in schema.items()
+            if key.isidentifier() and isinstance(data.get("value"), (int, float))]
+
+
 if __name__ == "__main__":
     import sys
     
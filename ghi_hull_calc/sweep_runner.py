@@ -0,0 +1,296 @@
+"""
+Process-pool sweep runner for large design tables.
+
+The design table is copied once into shared memory and split into row
+chunks; each worker process computes a chunk and writes its rows straight
+into a shared result array, so only (start, stop) indices cross process
+boundaries. Two tasks are provided:
+
+- HullSweepTask: HullCalculator.compute_batch over the table rows
+- WorkbookSweepTask: a compiled Gene-Hull workbook (.ghiw) evaluated with
+  WorkbookEvaluator.evaluate_batch, one output column per requested cell
+
+With a checkpoint directory every finished chunk is saved as it completes;
+running the same sweep again after a crash reloads those chunks and only
+computes the missing ones.
+
+    runner = SweepRunner(HullSweepTask(parameters=["Lwl", "Bg"]), table,
+                         workers=8, checkpoint_dir="sweep.ckpt",
+                         progress=print_progress)
+    offsets = runner.run()       # (N, sections, levels, 3)
+"""
+
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .hull_calculator import INPUT_DEFAULTS, HullCalculator, OffsetGrid
+except ImportError:
+    from hull_calculator import INPUT_DEFAULTS, HullCalculator, OffsetGrid
+
+ProgressCallback = Callable[[int, int], None]
+
+# Tasks set up in this pool worker process, by task key (never used in the
+# parent: in-process runs keep their state local to SweepRunner.run)
+_READY: Dict[str, Any] = {}
+
+
+class HullSweepTask:
+    """Offsets of every design row: HullCalculator.compute_batch"""
+
+    def __init__(self, inputs: Optional[Dict[str, float]] = None,
+                 parameters: Optional[Sequence[str]] = None, grid: Optional[OffsetGrid] = None):
+        self.inputs = dict(inputs or {})
+        self.parameters = list(INPUT_DEFAULTS) if parameters is None else list(parameters)
+        self.grid = grid or OffsetGrid()
+
+    @property
+    def key(self) -> str:
+        return "hull:" + json.dumps([sorted(self.inputs.items()), self.parameters, list(self.grid.key)])
+
+    @property
+    def row_shape(self) -> Tuple[int, ...]:
+        return (len(self.grid.sections()[0]), sum(self.grid.level_counts(0.0)), 3)
+
+    def setup(self) -> HullCalculator:
+        calc = HullCalculator(grid=self.grid)
+        calc.set_inputs(self.inputs)
+        return calc
+
+    def run(self, calc: HullCalculator, rows: np.ndarray) -> np.ndarray:
+        return calc.compute_batch(rows, self.parameters)
+
+
+class WorkbookSweepTask:
+    """
+    Output cells of a compiled workbook for every design row. Table columns
+    are the `parameters` cells of `input_sheet`, results the `outputs`
+    cells of `output_sheet` (NaN where unresolved).
+    """
+
+    def __init__(self, compiled_path: str, parameters: Sequence[str], outputs: Sequence[str],
+                 input_sheet: str = "Gene-Hull", output_sheet: str = "Offsets x,y,z"):
+        self.compiled_path = os.path.abspath(compiled_path)
+        self.parameters = list(parameters)
+        self.outputs = list(outputs)
+        self.input_sheet = input_sheet
+        self.output_sheet = output_sheet
+
+    @property
+    def key(self) -> str:
+        stat = os.stat(self.compiled_path)
+        return "workbook:" + json.dumps([self.compiled_path, stat.st_mtime_ns, self.parameters,
+                                         self.outputs, self.input_sheet, self.output_sheet])
+
+    @property
+    def row_shape(self) -> Tuple[int, ...]:
+        return (len(self.outputs),)
+
+    def setup(self):
+        try:
+            from ghi_logic.compiled_workbook import load_compiled
+        except ImportError:
+            # Script use: ghi_logic sits next to this directory
+            sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            from ghi_logic.compiled_workbook import load_compiled
+        return load_compiled(self.compiled_path)
+
+    def run(self, evaluator, rows: np.ndarray) -> np.ndarray:
+        batch = evaluator.evaluate_batch({(self.input_sheet, addr): rows[:, j]
+                                          for j, addr in enumerate(self.parameters)})
+        return np.stack([batch.value(self.output_sheet, addr) for addr in self.outputs], axis=1)
+
+
+def _run_chunk(task, table_name: str, table_shape: Tuple[int, ...], result_name: str,
+               result_shape: Tuple[int, ...], start: int, stop: int, state: Any = None) -> Tuple[int, int]:
+    """
+    Compute rows [start, stop) into the shared result array. Pool workers
+    pass no state and reuse the task set up in _READY.
+    """
+    if state is None:
+        key = task.key
+        state = _READY.get(key)
+        if state is None:
+            state = _READY[key] = task.setup()
+    table_shm = shared_memory.SharedMemory(name=table_name)
+    result_shm = shared_memory.SharedMemory(name=result_name)
+    try:
+        table = np.ndarray(table_shape, dtype=float, buffer=table_shm.buf)
+        result = np.ndarray(result_shape, dtype=float, buffer=result_shm.buf)
+        result[start:stop] = task.run(state, table[start:stop])
+        del table, result
+    finally:
+        table_shm.close()
+        result_shm.close()
+    return start, stop
+
+
+def print_progress(done: int, total: int):
+    """Progress callback writing "rows done/total" on one terminal line"""
+    sys.stderr.write(f"\rSweep: {done}/{total} rows ({100.0 * done / max(total, 1):.1f}%)")
+    if done >= total:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
+
+
+class SweepRunner:
+    """
+    Run `task` over the rows of `table` (N x P floats) on a process pool.
+    `progress(done_rows, total_rows)` is called in this process after each
+    chunk. With `checkpoint_dir` finished chunks are kept on disk and a
+    rerun of the same task, table and chunk size skips them.
+    """
+
+    def __init__(self, task, table, chunk_size: Optional[int] = None, workers: Optional[int] = None,
+                 checkpoint_dir: Optional[str] = None, progress: Optional[ProgressCallback] = None):
+        self.task = task
+        self.table = np.ascontiguousarray(table, dtype=float)
+        if self.table.ndim != 2:
+            raise ValueError(f"Expected an (N, P) design table, got shape {self.table.shape}")
+        self.workers = workers or os.cpu_count() or 1
+        n = len(self.table)
+        self.chunk_size = chunk_size or max(1, -(-n // (4 * self.workers)))
+        self.checkpoint_dir = checkpoint_dir
+        self.progress = progress
+
+    @property
+    def chunks(self) -> List[Tuple[int, int]]:
+        n = len(self.table)
+        return [(a, min(a + self.chunk_size, n)) for a in range(0, n, self.chunk_size)]
+
+    def _sweep_id(self) -> str:
+        h = hashlib.sha256()
+        h.update(self.task.key.encode())
+        h.update(repr((self.table.shape, self.chunk_size)).encode())
+        h.update(self.table.tobytes())
+        return h.hexdigest()
+
+    def _chunk_path(self, start: int) -> str:
+        return os.path.join(self.checkpoint_dir, f"chunk_{start:012d}.npy")
+
+    def _resume(self, result: np.ndarray) -> List[Tuple[int, int]]:
+        """Load finished chunks into result; returns the chunks still to run"""
+        if self.checkpoint_dir is None:
+            return self.chunks
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        manifest = os.path.join(self.checkpoint_dir, "sweep.json")
+        sweep_id = self._sweep_id()
+        try:
+            with open(manifest, "r", encoding="utf-8") as f:
+                same = json.load(f).get("sweep_id") == sweep_id
+        except (OSError, ValueError):
+            same = False
+        if not same:
+            # Checkpoints of another sweep are stale
+            for name in os.listdir(self.checkpoint_dir):
+                if name.startswith("chunk_") and name.endswith(".npy"):
+                    os.remove(os.path.join(self.checkpoint_dir, name))
+            with open(manifest, "w", encoding="utf-8") as f:
+                json.dump({"sweep_id": sweep_id, "rows": len(self.table),
+                           "chunk_size": self.chunk_size}, f)
+            return self.chunks
+
+        todo = []
+        for start, stop in self.chunks:
+            try:
+                saved = np.load(self._chunk_path(start))
+            except (OSError, ValueError):
+                todo.append((start, stop))
+                continue
+            if saved.shape != result[start:stop].shape:
+                todo.append((start, stop))
+                continue
+            result[start:stop] = saved
+        return todo
+
+    def _save_chunk(self, result: np.ndarray, start: int, stop: int):
+        if self.checkpoint_dir is None:
+            return
+        path = self._chunk_path(start)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, result[start:stop])
+        os.replace(tmp, path)
+
+    def run(self) -> np.ndarray:
+        """(N,) + task.row_shape result array"""
+        n = len(self.table)
+        shape = (n,) + tuple(self.task.row_shape)
+        table_shm = shared_memory.SharedMemory(create=True, size=max(self.table.nbytes, 1))
+        result_shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * 8, 1))
+        try:
+            table = np.ndarray(self.table.shape, dtype=float, buffer=table_shm.buf)
+            table[:] = self.table
+            result = np.ndarray(shape, dtype=float, buffer=result_shm.buf)
+            result.fill(np.nan)
+
+            todo = self._resume(result)
+            done = n - sum(stop - start for start, stop in todo)
+            if self.progress is not None:
+                self.progress(done, n)
+            args = (table_shm.name, self.table.shape, result_shm.name, shape)
+
+            if self.workers == 1 or len(todo) <= 1:
+                state = self.task.setup() if todo else None
+                for start, stop in todo:
+                    _run_chunk(self.task, *args, start, stop, state)
+                    done = self._finished(result, start, stop, done, n)
+            else:
+                with ProcessPoolExecutor(self.workers) as pool:
+                    pending = {pool.submit(_run_chunk, self.task, *args, start, stop) for start, stop in todo}
+                    while pending:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            start, stop = future.result()
+                            done = self._finished(result, start, stop, done, n)
+            output = result.copy()
+            del table, result
+            return output
+        finally:
+            table_shm.close()
+            table_shm.unlink()
+            result_shm.close()
+            result_shm.unlink()
+
+    def _finished(self, result: np.ndarray, start: int, stop: int, done: int, total: int) -> int:
+        self._save_chunk(result, start, stop)
+        done += stop - start
+        if self.progress is not None:
+            self.progress(done, total)
+        return done
+
+
+if __name__ == "__main__":
+    import csv
+
+    argv = sys.argv[1:]
+    options = {}
+    for flag in ("--workers", "--chunk-size", "--checkpoint"):
+        if flag in argv:
+            at = argv.index(flag)
+            options[flag] = argv[at + 1]
+            del argv[at:at + 2]
+    if len(argv) < 2:
+        print("Usage: python sweep_runner.py <designs.csv> <offsets.npy> "
+              "[--workers N] [--chunk-size N] [--checkpoint DIR]")
+        sys.exit(1)
+
+    # CSV header: input parameter names, one design per row
+    with open(argv[0], "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        parameters = next(reader)
+        table = np.array([[float(v) for v in row] for row in reader if row])
+    runner = SweepRunner(HullSweepTask(parameters=parameters), table,
+                         chunk_size=int(options["--chunk-size"]) if "--chunk-size" in options else None,
+                         workers=int(options["--workers"]) if "--workers" in options else None,
+                         checkpoint_dir=options.get("--checkpoint"), progress=print_progress)
+    offsets = runner.run()
+    np.save(argv[1], offsets)
+    print(f"{offsets.shape[0]} designs -> {argv[1]} {offsets.shape}")
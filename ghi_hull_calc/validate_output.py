@@ -46,8 +46,8 @@ def print_sample_output():
     print(f"\nInputs Used: {len(calc.inputs)} parameters")
     print(f"Output Points Generated: {len(calc.outputs)}")
     
-    # Convert outputs dict to list for easier processing
-    output_list = [v for k, v in sorted(calc.outputs.items())]
+    # Outputs are in row order (sorting "Row_N" keys as strings misorders them)
+    output_list = list(calc.outputs.values())
     
     print("\nFirst 10 Offset Points:")
     print("-" * 80)
@@ -5,6 +5,8 @@ Provides tools to read and replica the Gene-Hull ODS spreadsheet calculations.
 """
 
 from .gene_hull_calculator import GeneHullCalculator, GeneHullODSReader, FormulaParser
+from .workbook_evaluator import CircularReferenceError, WorkbookEvaluator
 
-__all__ = ["GeneHullCalculator", "GeneHullODSReader", "FormulaParser"]
+__all__ = ["GeneHullCalculator", "GeneHullODSReader", "FormulaParser",
+           "WorkbookEvaluator", "CircularReferenceError"]
 __version__ = "0.1.0"
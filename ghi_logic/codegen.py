@@ -0,0 +1,389 @@
+"""
+Generate a standalone Python/NumPy module from a Gene-Hull workbook.
+
+The backward slice of the "Offsets x,y,z" formula cells is emitted as
+straight-line NumPy code in dependency order: Gene-Hull constants become
+overridable inputs, every other constant (including folded formulas) is
+inlined as a literal. The generated module only needs NumPy:
+
+    import gene_hull_offsets
+    out = gene_hull_offsets.compute({"B12": 8.5})
+    out = gene_hull_offsets.compute({"B12": np.linspace(7, 9, 100)})  # batch
+
+Spreadsheet errors (including infinities) become NaN. Range functions
+reuse the vector_engine helpers, whose source is copied into the module.
+Formulas that cannot be expressed with NumPy (text results, unsupported
+references) are emitted as NaN and listed in the module's SKIPPED tuple.
+"""
+
+import inspect
+import math
+import os
+import sys
+from typing import Any, Callable, Dict, List
+
+try:
+    from . import vector_engine
+    from .formula_engine import FormulaError, range_cells, range_shape
+    from .workbook_evaluator import WorkbookEvaluator
+except ImportError:
+    import vector_engine
+    from formula_engine import FormulaError, range_cells, range_shape
+    from workbook_evaluator import WorkbookEvaluator
+
+OUTPUT_SHEET = "Offsets x,y,z"
+INPUT_SHEET = "Gene-Hull"
+
+BINARY_TEMPLATES = {
+    "+": "({} + {})",
+    "-": "({} - {})",
+    "*": "({} * {})",
+    "/": "({} / {})",
+    "^": "np.power({}, {})",
+    "=": "({} == {})",
+    "<>": "({} != {})",
+    "<": "({} < {})",
+    ">": "({} > {})",
+    "<=": "({} <= {})",
+    ">=": "({} >= {})",
+}
+
+
+def _nested(fn: str) -> Callable[[List[str]], str]:
+    def emit(args: List[str]) -> str:
+        out = args[-1]
+        for arg in reversed(args[:-1]):
+            out = f"{fn}({arg}, {out})"
+        return out
+    return emit
+
+
+def _call(fn: str) -> Callable[[List[str]], str]:
+    return lambda args: f"{fn}({', '.join(args)})"
+
+
+FUNCTION_TEMPLATES: Dict[str, Callable[[List[str]], str]] = {
+    "ABS": _call("np.abs"),
+    "SQRT": _call("np.sqrt"),
+    "POWER": _call("np.power"),
+    "EXP": _call("np.exp"),
+    "LN": _call("np.log"),
+    "LOG": _call("_log"),
+    "LOG10": _call("np.log10"),
+    "SIN": _call("np.sin"),
+    "COS": _call("np.cos"),
+    "TAN": _call("np.tan"),
+    "ASIN": _call("np.arcsin"),
+    "ACOS": _call("np.arccos"),
+    "ATAN": _call("np.arctan"),
+    "ATAN2": lambda args: f"np.arctan2({args[1]}, {args[0]})",  # ODF order is ATAN2(x; y)
+    "RADIANS": _call("np.radians"),
+    "DEGREES": _call("np.degrees"),
+    "PI": lambda args: "np.pi",
+    "SUM": lambda args: "(" + " + ".join(args) + ")",
+    "MIN": _nested("np.minimum"),
+    "MAX": _nested("np.maximum"),
+    "AVERAGE": lambda args: f"(({' + '.join(args)}) / {float(len(args))!r})",
+    "ROUND": _call("_round"),
+    "INT": _call("np.floor"),
+    "MOD": _call("_mod"),
+    "SIGN": _call("np.sign"),
+    "AND": _nested("np.logical_and"),
+    "OR": _nested("np.logical_or"),
+    "NOT": _call("np.logical_not"),
+    "TRUE": lambda args: "True",
+    "FALSE": lambda args: "False",
+}
+
+# Range function -> helper in the generated module (vector_engine sources)
+RANGE_HELPERS = {
+    "SUM": "_vsum",
+    "MIN": "_vmin",
+    "MAX": "_vmax",
+    "AVERAGE": "_vaverage",
+    "COUNT": "_vcount",
+    "SUMPRODUCT": "_vsumproduct",
+    "INDEX": "_vindex",
+}
+
+
+def _helper_sources() -> str:
+    parts = [inspect.getsource(obj) for obj in (
+        vector_engine.RangeArray, vector_engine._vcount, vector_engine._vsum,
+        vector_engine._vextreme, vector_engine._vsumproduct, vector_engine._vindex,
+        vector_engine._vmatch)]
+    return "\n\n".join(parts).replace("{", "{{").replace("}", "}}")
+
+
+MODULE_HEADER = '''"""
+Gene-Hull offsets generated from {source} by ghi_logic.codegen.
+Do not edit: regenerate from the workbook instead.
+
+compute(inputs) evaluates every "{sheet}" formula cell. `inputs` overrides
+"{input_sheet}" cells by address (defaults in INPUTS); values may be NumPy
+arrays for batches. Returns {{address: value}}; spreadsheet errors are NaN.
+"""
+
+from functools import reduce
+from typing import Any, Callable
+
+import numpy as np
+
+INPUTS = {inputs}
+
+OUTPUTS = {outputs}
+
+SKIPPED = {skipped}
+
+
+def _round(x, digits=0.0):
+    scale = 10.0 ** np.trunc(digits)
+    return np.copysign(np.floor(np.abs(x) * scale + 0.5) / scale, x)
+
+
+def _mod(x, y):
+    return x - y * np.floor(x / y)
+
+
+def _log(x, base=10.0):
+    return np.log(x) / np.log(base)
+
+
+def _finite(v):
+    """Infinities are spreadsheet errors (as in CompiledFormula.evaluate): NaN"""
+    v = np.asarray(v, dtype=float)
+    return np.where(np.isfinite(v), v, np.nan)[()]
+
+
+# --- ranges (ghi_logic.vector_engine helpers, one member: data[1, r, c[, n]]) ---
+
+{helpers}
+
+
+_vmin = _vextreme(np.fmin)
+_vmax = _vextreme(np.fmax)
+
+
+def _vaverage(*args):
+    return _vsum(*args) / _vcount(*args)
+
+
+class _Area(RangeArray):
+    """Range whose `bad` scenarios hold an error cell (the formula is an error there)"""
+
+    __slots__ = ("bad",)
+
+
+def _area(rows, cols, cells, skipped=()):
+    """Range of `cells` (row-major); `skipped` positions are empty or text cells"""
+    data = np.stack(np.broadcast_arrays(*[np.asarray(c, dtype=float) for c in cells]))
+    errors = np.isnan(data)
+    errors[list(skipped)] = False
+    area = _Area(data.reshape((1, rows, cols) + data.shape[1:]))
+    area.bad = errors.any(axis=0)
+    return area
+
+
+def _ranges(fn, *args):
+    """Range function over one member; NaN where any argument is an error"""
+    lifted = [a if isinstance(a, RangeArray) else np.asarray(a, dtype=float)[None] for a in args]
+    out = np.asarray(fn(*lifted), dtype=float)[0]
+    for a in args:
+        bad = a.bad if isinstance(a, _Area) else np.isnan(np.asarray(a, dtype=float))
+        out = np.where(bad, np.nan, out)
+    return out[()]
+
+
+def compute(inputs=None):
+    """Offsets for the given Gene-Hull inputs (see INPUTS for defaults)"""
+    x = dict(INPUTS)
+    if inputs:
+        unknown = set(inputs) - set(INPUTS)
+        if unknown:
+            raise KeyError(f"Not an input cell: {{sorted(unknown)}}")
+        x.update(inputs)
+    # float64 arrays: division by zero gives inf/NaN instead of raising
+    x = {{addr: np.asarray(value, dtype=float) for addr, value in x.items()}}
+'''
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float))
+
+
+def _literal(value: Any) -> str:
+    if isinstance(value, bool):
+        return "1.0" if value else "0.0"
+    if _is_number(value) and math.isfinite(value):
+        return repr(float(value))
+    return "np.nan"
+
+
+class _Emitter:
+    def __init__(self, evaluator: WorkbookEvaluator, slice_cells, input_sheet: str):
+        self.ev = evaluator
+        self.slice_cells = slice_cells
+        self.input_sheet = input_sheet
+        self.inputs: Dict[str, str] = {}
+
+    def ref(self, sheet: str, addr: str) -> str:
+        i = self.ev.index[(sheet, addr)]
+        if i in self.slice_cells:
+            return f"v{i}"
+        if (sheet, addr) in self.ev.uncompiled:
+            raise FormulaError(f"{sheet}.{addr} is a formula that did not compile")
+        # Values as loaded: set_input() overrides are not baked into the module
+        value, _ = self.ev.loaded(i)
+        if (sheet == self.input_sheet and i not in self.ev.formulas and i not in self.ev.folded
+                and _is_number(value)):
+            self.inputs[addr] = _literal(value)
+            return f"x[{addr!r}]"
+        return _literal(value)
+
+    def expr(self, node: tuple) -> str:
+        kind = node[0]
+        if kind == "num":
+            return repr(float(node[1]))
+        if kind == "bool":
+            return "True" if node[1] else "False"
+        if kind == "ref":
+            return self.ref(node[1], node[2])
+        if kind == "neg":
+            return f"(-{self.expr(node[1])})"
+        if kind == "pct":
+            return f"({self.expr(node[1])} / 100.0)"
+        if kind == "bin":
+            template = BINARY_TEMPLATES.get(node[1])
+            if template is None:
+                raise FormulaError(f"Operator {node[1]} cannot be generated")
+            return template.format(self.expr(node[2]), self.expr(node[3]))
+        if kind == "range":
+            return self.area(node)
+        if kind == "call":
+            name, args = node[1], [self.expr(arg) for arg in node[2]]
+            if name == "MATCH" or name in ("COUNT", "SUMPRODUCT", "INDEX") \
+                    or any(arg[0] == "range" for arg in node[2]):
+                return self.range_call(name, node[2], args)
+            if name == "IF":
+                then = args[1] if len(args) > 1 else "True"
+                other = args[2] if len(args) > 2 else "False"
+                return f"np.where({args[0]}, {then}, {other})"
+            template = FUNCTION_TEMPLATES.get(name)
+            if template is None:
+                raise FormulaError(f"Function {name} cannot be generated")
+            return template(args)
+        raise FormulaError(f"{kind} values cannot be generated")
+
+    def area(self, node: tuple) -> str:
+        rows, cols = range_shape(node[1:])
+        cells, skipped = [], []
+        for k, (sheet, addr) in enumerate(range_cells(node[1:])):
+            i = self.ev.index.get((sheet, addr))
+            if i is None:
+                cells.append("np.nan")  # not loaded: an error, as in the evaluator
+                continue
+            value, empty = self.ev.loaded(i)
+            if (i not in self.slice_cells and (sheet, addr) not in self.ev.uncompiled
+                    and (empty or (value is not None and not _is_number(value)))):
+                # Empty and text cells are skipped; errors (None) poison the range
+                cells.append("np.nan")
+                skipped.append(k)
+            else:
+                cells.append(self.ref(sheet, addr))
+        return f"_area({rows}, {cols}, ({', '.join(cells)},), {tuple(skipped)!r})"
+
+    def range_call(self, name: str, nodes: List[tuple], args: List[str]) -> str:
+        if name == "MATCH":
+            # As in vector_engine: a constant match type only
+            match_type = vector_engine._literal(nodes[2]) if len(nodes) > 2 else 1.0
+            if match_type is None:
+                raise FormulaError("MATCH is generated for a constant match type only")
+            return f"_ranges(_vmatch({float(match_type)!r}), {', '.join(args[:2])})"
+        helper = RANGE_HELPERS.get(name)
+        if helper is None:
+            raise FormulaError(f"Function {name} cannot be generated over ranges")
+        return f"_ranges({helper}, {', '.join(args)})"
+
+
+def generate_module(evaluator: WorkbookEvaluator, sheet: str = OUTPUT_SHEET,
+                    input_sheet: str = INPUT_SHEET, source: str = "the workbook") -> str:
+    """Source code of a module computing every formula cell of `sheet`"""
+    outputs = sorted(
+        (addr for (s, addr), i in evaluator.index.items()
+         if s == sheet and (i in evaluator.formulas or i in evaluator.folded
+                            or (s, addr) in evaluator.uncompiled)),
+        key=lambda a: evaluator.index[(sheet, a)])
+    targets = [evaluator.index[(sheet, addr)] for addr in outputs]
+    slice_cells = evaluator.backward_slice(targets)
+    emitter = _Emitter(evaluator, slice_cells, input_sheet)
+
+    body: List[str] = []
+    skipped: List[str] = []
+    for i in evaluator.order:
+        if i not in slice_cells:
+            continue
+        cell_sheet, addr = evaluator.cells[i]
+        try:
+            code = emitter.expr(evaluator.formulas[i].ast)
+        except FormulaError as e:
+            code = "np.nan"
+            skipped.append(f"{cell_sheet}.{addr}")
+            body.append(f"        # {cell_sheet}.{addr}: {e}")
+        body.append(f"        v{i} = _finite({code})  # {cell_sheet}.{addr}")
+
+    returned = []
+    for addr, i in zip(outputs, targets):
+        if i in slice_cells:
+            returned.append(f"        {addr!r}: v{i},")
+        elif (sheet, addr) in evaluator.uncompiled:
+            skipped.append(f"{sheet}.{addr}")
+            returned.append(f"        {addr!r}: np.nan,")
+        else:
+            returned.append(f"        {addr!r}: {_literal(evaluator.vals[i])},")
+
+    inputs = "{\n" + "".join(f"    {addr!r}: {value},\n" for addr, value in
+                             sorted(emitter.inputs.items(), key=lambda kv: evaluator.index[(input_sheet, kv[0])])) + "}"
+    header = MODULE_HEADER.format(
+        source=source, sheet=sheet, input_sheet=input_sheet, inputs=inputs,
+        outputs=repr(tuple(outputs)), skipped=repr(tuple(skipped)), helpers=_helper_sources())
+    lines = [header, "    with np.errstate(all=\"ignore\"):"]
+    lines.extend(body or ["        pass"])
+    lines.append("    return {")
+    lines.extend(returned)
+    lines.append("    }")
+    return "\n".join(lines) + "\n"
+
+
+def write_module(evaluator: WorkbookEvaluator, path: str, **kwargs) -> str:
+    """Write generate_module() output to path; returns the path"""
+    code = generate_module(evaluator, **kwargs)
+    compile(code, path, "exec")  # fail here rather than at import time
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(code)
+    return path
+
+
+if __name__ == "__main__":
+    try:
+        from .gene_hull_calculator import GeneHullCalculator
+        from .compiled_workbook import COMPILED_SUFFIX
+        from .workbook_cache import cache_from_argv
+    except ImportError:
+        from gene_hull_calculator import GeneHullCalculator
+        from compiled_workbook import COMPILED_SUFFIX
+        from workbook_cache import cache_from_argv
+
+    argv = sys.argv[1:]
+    cache = cache_from_argv(argv)
+    if len(argv) < 2:
+        print("Usage: python codegen.py <ods_path|compiled" + COMPILED_SUFFIX + "> <output.py> [--no-cache] [--clear-cache]")
+        sys.exit(1)
+
+    source_path, output_path = argv[0], argv[1]
+    if source_path.endswith(COMPILED_SUFFIX):
+        calc = GeneHullCalculator.from_compiled(source_path)
+    else:
+        calc = GeneHullCalculator(source_path, streaming=True,
+                                  sheets=GeneHullCalculator.REQUIRED_SHEETS, cache=cache)
+    write_module(calc.evaluator, output_path, source=os.path.basename(source_path))
+    print(f"Module written to {output_path}")
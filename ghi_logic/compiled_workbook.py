@@ -0,0 +1,106 @@
+"""
+Compiled workbook artifacts.
+
+Parsing the ODS and compiling its formulas happens once per workbook
+version: save_compiled() writes the loaded sheets (as cell runs) and the
+evaluator state (dependency order, formula ASTs, folded constants, input
+sheets, formula groups) to one gzip-compressed JSON file, and
+load_compiled() rebuilds a ready WorkbookEvaluator from it without odfpy
+and without parsing a single formula.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional
+
+try:
+    from .sheet_store import CellRun, RunLengthSheet, parse_cell_ref
+    from .workbook_evaluator import WorkbookEvaluator
+except ImportError:
+    from sheet_store import CellRun, RunLengthSheet, parse_cell_ref
+    from workbook_evaluator import WorkbookEvaluator
+
+ARTIFACT_FORMAT = "genehull-compiled-workbook"
+ARTIFACT_VERSION = 1
+COMPILED_SUFFIX = ".ghiw"
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def sheet_to_runs(sheet: Mapping) -> List[list]:
+    """[[row, count, [[col, count, value, text, formula], ...]], ...]"""
+    if isinstance(sheet, RunLengthSheet):
+        return [[row.start, row.count,
+                 [[c.start, c.count, c.payload.get("value"), c.payload.get("text"),
+                   c.payload.get("formula")] for c in row.cells]]
+                for row in sheet.row_runs()]
+    # Other layouts: one run per cell
+    rows: Dict[int, list] = {}
+    for addr, payload in sheet.items():
+        r, c = parse_cell_ref(addr)
+        rows.setdefault(r, []).append(
+            [c, 1, payload.get("value"), payload.get("text"), payload.get("formula")])
+    return [[r, 1, sorted(cells)] for r, cells in sorted(rows.items())]
+
+
+def sheet_from_runs(runs: List[list]) -> RunLengthSheet:
+    sheet = RunLengthSheet()
+    for row, count, cells in runs:
+        sheet.add_row(row, count, [
+            CellRun(col, n, {"value": value, "text": text, "formula": formula})
+            for col, n, value, text, formula in cells])
+    return sheet
+
+
+def save_compiled(evaluator: WorkbookEvaluator, path: str, source_path: Optional[str] = None):
+    """
+    Write the evaluator and its sheets; source_path records the ODS hash.
+    The artifact holds the workbook as loaded: set_input() overrides are
+    not saved (see WorkbookEvaluator.to_state).
+    """
+    artifact = {
+        "format": ARTIFACT_FORMAT,
+        "version": ARTIFACT_VERSION,
+        "source": os.path.basename(source_path) if source_path else None,
+        "source_sha256": file_sha256(source_path) if source_path else None,
+        "sheets": {name: sheet_to_runs(sheet) for name, sheet in evaluator.sheets.items()},
+        "evaluator": evaluator.to_state(),
+    }
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(artifact, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def read_artifact(path: str) -> Dict[str, Any]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        artifact = json.load(f)
+    if artifact.get("format") != ARTIFACT_FORMAT or artifact.get("version") != ARTIFACT_VERSION:
+        raise ValueError(f"{path} is not a compiled workbook of version {ARTIFACT_VERSION}")
+    return artifact
+
+
+def load_compiled(path: str, ods_path: Optional[str] = None,
+                  vectorize: Optional[bool] = None) -> WorkbookEvaluator:
+    """
+    Rebuild the evaluator saved by save_compiled(). With ods_path, raise
+    ValueError if the artifact was compiled from a different version of it.
+    """
+    artifact = read_artifact(path)
+    if ods_path is not None and artifact.get("source_sha256") != file_sha256(ods_path):
+        raise ValueError(f"{path} was not compiled from the current {ods_path}")
+    sheets = {name: sheet_from_runs(runs) for name, runs in artifact["sheets"].items()}
+    return WorkbookEvaluator.from_state(artifact["evaluator"], sheets, vectorize=vectorize)
@@ -3,109 +3,48 @@ Extract hull input parameters (rows 11-58) and output formulas (rows 9-139)
 from Gene-Hull ODS to create schema and formula mapping.
 """
 
-from odf.opendocument import load
-from odf.table import Table, TableRow, TableCell
-from odf.text import P
 from typing import Dict, Optional, List
 import json
 import re
-
-
-def get_cell_ref(row: int, col: int) -> str:
-    """Convert row, col to cell address"""
-    letters = ""
-    col_idx = col
-    while col_idx > 0:
-        col_idx, rem = divmod(col_idx - 1, 26)
-        letters = chr(65 + rem) + letters
-    return f"{letters}{row}"
-
-
-def get_text(cell: TableCell) -> str:
-    paras = cell.getElementsByType(P)
-    if not paras:
-        return ""
-    texts = []
-    for p in paras:
-        texts.append("".join([getattr(t, 'data', '') for t in p.childNodes]))
-    return "\n".join(texts).strip()
-
-
-def get_value(cell: TableCell) -> Optional[str]:
-    try:
-        val = cell.getAttribute("value")
-        if val is not None:
-            return val
-    except Exception:
-        pass
-    return get_text(cell)
-
-
-def get_formula(cell: TableCell) -> Optional[str]:
-    try:
-        return cell.getAttribute("formula")
-    except Exception:
-        return None
-
-
-def extract_sheet_rows(ods_path: str, sheet_name: str, start_row: int, end_row: int) -> Dict[int, Dict[str, dict]]:
-    """Extract rows from a sheet"""
-    doc = load(ods_path)
-    tables = doc.spreadsheet.getElementsByType(Table)
-    
-    sheet = None
-    for table in tables:
-        try:
-            name = table.getAttribute("name")
-        except Exception:
-            name = ""
-        if name == sheet_name:
-            sheet = table
-            break
-    
-    if not sheet:
+import sys
+
+try:
+    from .ods_cells import iter_cells, raw_value, read_workbook
+    from .sheet_store import cell_ref
+    from .workbook_cache import WorkbookCache, cache_from_argv
+except ImportError:
+    from ods_cells import iter_cells, raw_value, read_workbook
+    from sheet_store import cell_ref
+    from workbook_cache import WorkbookCache, cache_from_argv
+
+
+def extract_sheet_rows(ods_path: str, sheet_name: str, start_row: int, end_row: int,
+                       cache: Optional[WorkbookCache] = None) -> Dict[int, Dict[str, dict]]:
+    """
+    Extract non-empty cells of rows start_row..end_row from a sheet,
+    streaming only the requested sheet and rows. Repeated rows are expanded
+    to their real indices; empty rows and cells are omitted.
+    """
+    parsed = read_workbook(ods_path, [sheet_name], {sheet_name: (start_row, end_row)}, cache)
+    if not parsed:
         raise ValueError(f"Sheet '{sheet_name}' not found")
     
     rows_data: Dict[int, Dict[str, dict]] = {}
-    row_idx = 0
-    
-    for row in sheet.getElementsByType(TableRow):
-        row_idx += 1
-        if row_idx < start_row or row_idx > end_row:
-            continue
-        
-        row_cells = {}
-        col_idx = 0
-        for cell in row.getElementsByType(TableCell):
-            try:
-                repeat_attr = cell.getAttribute("numbercolumnsrepeated")
-            except Exception:
-                repeat_attr = None
-            repeat = int(repeat_attr or "1")
-            
-            for _ in range(repeat):
-                col_idx += 1
-                addr = get_cell_ref(row_idx, col_idx)
-                formula = get_formula(cell)
-                value = get_value(cell)
-                text = get_text(cell)
-                
-                row_cells[addr] = {
-                    "col": col_idx,
-                    "text": text,
-                    "value": value,
-                    "formula": formula
-                }
-        
-        rows_data[row_idx] = row_cells
+    for row_idx, col_idx, cell in iter_cells(parsed[0][1]):
+        rows_data.setdefault(row_idx, {})[cell_ref(row_idx, col_idx)] = {
+            "col": col_idx,
+            "text": cell.text,
+            "value": raw_value(cell),
+            "formula": cell.formula
+        }
     
     return rows_data
 
 
-def extract_inputs(ods_path: str) -> Dict[str, dict]:
+def extract_inputs(ods_path: str, cache: Optional[WorkbookCache] = None) -> Dict[str, dict]:
     """Extract input parameters from Gene-Hull rows 11-58"""
     print("Extracting inputs from Gene-Hull rows 11-58...")
-    rows = extract_sheet_rows(ods_path, "Gene-Hull", 11, 58)
+    rows = extract_sheet_rows(ods_path, "Gene-Hull", 11, 58, cache)
     
     inputs = {}
     
@@ -145,10 +84,10 @@ def extract_inputs(ods_path: str) -> Dict[str, dict]:
     return inputs
 
 
-def extract_formulas(ods_path: str) -> Dict[str, dict]:
+def extract_formulas(ods_path: str, cache: Optional[WorkbookCache] = None) -> Dict[str, dict]:
     """Extract formulas from Offsets x,y,z rows 9-139"""
     print("Extracting formulas from Offsets x,y,z rows 9-139...")
-    rows = extract_sheet_rows(ods_path, "Offsets x,y,z", 9, 139)
+    rows = extract_sheet_rows(ods_path, "Offsets x,y,z", 9, 139, cache)
     
     formulas = {}
     
@@ -170,15 +109,16 @@ def extract_formulas(ods_path: str) -> Dict[str, dict]:
 
 def main():
     ods_path = "ghi_utils/Gene-Hull Sailboat 3.4_2025 02.ods"
+    cache = cache_from_argv(sys.argv)
     
     # Extract inputs
-    inputs = extract_inputs(ods_path)
+    inputs = extract_inputs(ods_path, cache)
     print(f"\nFound {len(inputs)} input parameters:")
     for name, data in sorted(inputs.items())[:10]:
         print(f"  {name}: {data['value']} - {data['comment'][:50]}")
     
     # Extract formulas
-    formulas = extract_formulas(ods_path)
+    formulas = extract_formulas(ods_path, cache)
     print(f"\nFound {len(formulas)} cells with formulas/values")
     
     # Save schema
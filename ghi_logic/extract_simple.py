@@ -1,95 +1,47 @@
 """
 Extract hull input parameters (rows 11-58) from Gene-Hull ODS.
-Uses simple, robust extraction to avoid odfpy parsing issues.
+Uses the shared streaming extraction core, so odfpy is not required.
 """
 
 import sys
 import json
-from odf.opendocument import load
-from odf.table import Table, TableRow, TableCell
-from odf.text import P
 
-
-def get_text(cell):
-    paras = cell.getElementsByType(P)
-    if not paras:
-        return ""
-    texts = []
-    for p in paras:
-        for t in p.childNodes:
-            if hasattr(t, 'data'):
-                texts.append(t.data)
-    return "".join(texts).strip()
+try:
+    from .ods_cells import iter_cells, read_workbook
+    from .workbook_cache import cache_from_argv
+except ImportError:
+    from ods_cells import iter_cells, read_workbook
+    from workbook_cache import cache_from_argv
 
 
 def get_value(cell):
-    try:
-        val = cell.getAttribute("value")
-        if val:
-            try:
-                return float(val)
-            except ValueError:
-                return val
-    except:
-        pass
-    txt = get_text(cell)
+    """Numeric value (office:value or numeric-looking text) else text"""
+    if cell.value:
+        try:
+            return float(cell.value)
+        except ValueError:
+            return cell.value
+    txt = cell.text
     try:
         return float(txt) if txt else None
     except ValueError:
         return txt if txt else None
 
 
-def get_sheet_data(ods_path, sheet_name):
-    """Get raw sheet data without complex parsing"""
-    try:
-        doc = load(ods_path)
-    except Exception as e:
-        print(f"Error loading ODS: {e}")
-        return None
-    
-    tables = doc.spreadsheet.getElementsByType(Table)
-    for table in tables:
-        try:
-            name = table.getAttribute("name")
-        except:
-            name = ""
-        
-        if name == sheet_name:
-            return table
-    
-    return None
-
-
-def extract_inputs(ods_path):
+def extract_inputs(ods_path, cache=None):
     """Extract inputs from Gene-Hull rows 11-58 (columns A-G)"""
     print("Extracting inputs from Gene-Hull...")
-    sheet = get_sheet_data(ods_path, "Gene-Hull")
-    if not sheet:
+    parsed = read_workbook(ods_path, ["Gene-Hull"], {"Gene-Hull": (11, 58)}, cache)
+    if not parsed:
         print("Error: Gene-Hull sheet not found")
         return {}
     
-    inputs = {}
-    row_idx = 0
+    rows = {}
+    for row_idx, col_idx, cell in iter_cells(parsed[0][1]):
+        rows.setdefault(row_idx, []).append((col_idx, cell.text, get_value(cell)))
     
-    for row in sheet.getElementsByType(TableRow):
-        row_idx += 1
-        if row_idx < 11 or row_idx > 58:
-            continue
-        
-        cells = []
-        col_idx = 0
-        for cell in row.getElementsByType(TableCell):
-            try:
-                repeat = int(cell.getAttribute("numbercolumnsrepeated") or "1")
-            except:
-                repeat = 1
-            
-            for _ in range(repeat):
-                col_idx += 1
-                value = get_value(cell)
-                text = get_text(cell)
-                cells.append((col_idx, text, value))
-        
+    inputs = {}
+    for row_idx, cells in sorted(rows.items()):
         # Parse: A=label, B=value, D=type, G=comment
         if cells:
             label = ""
@@ -125,8 +77,9 @@ def extract_inputs(ods_path):
 
 def main():
     ods_path = "ghi_utils/Gene-Hull Sailboat 3.4_2025 02.ods"
+    cache = cache_from_argv(sys.argv)
     
-    inputs = extract_inputs(ods_path)
+    inputs = extract_inputs(ods_path, cache)
     print(f"\nExtracted {len(inputs)} inputs:")
     for name, data in sorted(inputs.items())[:15]:
         print(f"  {name}: {data['value']} ({data['type']})")
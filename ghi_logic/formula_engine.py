@@ -0,0 +1,627 @@
+"""
+Compiled ODF formula engine.
+
+Formulas such as of:=IF(['Gene-Hull'.$B$12]>0;[.C5]*2;-1) are tokenized and
+parsed once into a small tuple AST, then compiled into a Python closure.
+Each distinct (formula, host sheet) pair is compiled only once (LRU cache);
+evaluating it is a plain function call over already-resolved operands, with
+no string manipulation or eval() in the hot path. A range operand is a 2-D
+NumPy array of its cells (NaN for empty and text cells), so range functions
+(SUM, MIN, INDEX, MATCH, ...) are single array operations.
+
+AST nodes (plain tuples, JSON friendly):
+    ("num", value)  ("str", text)  ("bool", flag)
+    ("ref", sheet, addr)           addr without $ anchors
+    ("range", sheet, first, last)  [.A1:.B20], top-left and bottom-right
+    ("neg", node)  ("pct", node)   unary minus, postfix %
+    ("bin", op, left, right)       + - * / ^ & = <> < > <= >=
+    ("call", NAME, [args])
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+try:
+    from .sheet_store import cell_ref, col_index, parse_cell_ref
+except ImportError:
+    from sheet_store import cell_ref, col_index, parse_cell_ref
+
+# NumPy backs range operands; without it range formulas are unresolved
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+
+
+class FormulaError(ValueError):
+    """Formula that cannot be tokenized, parsed or compiled"""
+
+
+Ref = Tuple[str, str]
+RangeRef = Tuple[str, str, str]  # (sheet, top-left, bottom-right)
+
+# Larger ranges are rejected rather than expanded cell by cell
+MAX_RANGE_CELLS = 100_000
+
+# --- Tokenizer ---------------------------------------------------------------
+
+TOKEN_PATTERN = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<str>"(?:[^"]|"")*")
+  | (?P<ref>\[[^\]]*\])
+  | (?P<name>[A-Za-z_][A-Za-z0-9_.]*)
+  | (?P<op><>|<=|>=|[-+*/^&=<>%();,])
+""", re.VERBOSE)
+
+# [$'Sheet name'.$A$1], [Sheet.A1], [.A1]
+REF_BODY = re.compile(r"""
+    ^\$?(?:'(?P<qsheet>(?:[^']|'')*)'|(?P<sheet>[^.'\[\]]*))?
+    \.(?P<cabs>\$?)(?P<col>[A-Za-z]+)(?P<rabs>\$?)(?P<row>\d+)$
+""", re.VERBOSE)
+
+
+def tokenize(formula: str) -> List[Tuple[str, Any]]:
+    """Split an ODF formula (with or without the of:= prefix) into tokens"""
+    if formula.startswith("of:"):
+        formula = formula[3:]
+    if formula.startswith("="):
+        formula = formula[1:]
+
+    tokens: List[Tuple[str, Any]] = []
+    pos = 0
+    while pos < len(formula):
+        m = TOKEN_PATTERN.match(formula, pos)
+        if not m:
+            raise FormulaError(f"Unexpected character {formula[pos]!r} at {pos} in {formula!r}")
+        pos = m.end()
+        kind = m.lastgroup
+        text = m.group()
+        if kind == "ws":
+            continue
+        if kind == "num":
+            tokens.append(("num", float(text)))
+        elif kind == "str":
+            tokens.append(("str", text[1:-1].replace('""', '"')))
+        elif kind == "ref":
+            tokens.append(("ref", text[1:-1]))
+        elif kind == "name":
+            tokens.append(("name", text.upper()))
+        else:
+            tokens.append(("op", ";" if text == "," else text))
+    return tokens
+
+
+def parse_ref(body: str, host_sheet: str) -> Ref:
+    """'Gene-Hull'.$B$12 -> ("Gene-Hull", "B12"); .A1 -> (host_sheet, "A1")"""
+    m = REF_BODY.match(body.strip())
+    if not m:
+        raise FormulaError(f"Unsupported reference [{body}]")
+    if m.group("qsheet") is not None:
+        sheet = m.group("qsheet").replace("''", "'")
+    else:
+        sheet = m.group("sheet") or host_sheet
+    return sheet, f"{m.group('col').upper()}{m.group('row')}"
+
+
+def _split_range(body: str) -> Optional[Tuple[str, str]]:
+    """Split "A:B" at the colon outside quoted sheet names; None if no colon"""
+    quoted = False
+    for i, ch in enumerate(body):
+        if ch == "'":
+            quoted = not quoted
+        elif ch == ":" and not quoted:
+            return body[:i], body[i + 1:]
+    return None
+
+
+def parse_range(body: str, host_sheet: str) -> RangeRef:
+    """.A1:.B20 -> (host_sheet, "A1", "B20"); corners are normalized"""
+    parts = _split_range(body.strip())
+    if parts is None:
+        raise FormulaError(f"Not a range [{body}]")
+    first, last = parts
+    sheet, first_addr = parse_ref(first, host_sheet)
+    last = last.strip()
+    last_sheet, last_addr = parse_ref(last if "." in last else "." + last, sheet)
+    if last_sheet != sheet:
+        raise FormulaError(f"Ranges across sheets are not supported [{body}]")
+    (r0, c0), (r1, c1) = parse_cell_ref(first_addr), parse_cell_ref(last_addr)
+    if (abs(r1 - r0) + 1) * (abs(c1 - c0) + 1) > MAX_RANGE_CELLS:
+        raise FormulaError(f"Range [{body}] has more than {MAX_RANGE_CELLS} cells")
+    return sheet, cell_ref(min(r0, r1), min(c0, c1)), cell_ref(max(r0, r1), max(c0, c1))
+
+
+def range_shape(rng: RangeRef) -> Tuple[int, int]:
+    """(rows, columns) of a range"""
+    (r0, c0), (r1, c1) = parse_cell_ref(rng[1]), parse_cell_ref(rng[2])
+    return r1 - r0 + 1, c1 - c0 + 1
+
+
+def range_cells(rng: RangeRef) -> List[Ref]:
+    """Cells of a range in row-major order"""
+    sheet = rng[0]
+    (r0, c0), (r1, c1) = parse_cell_ref(rng[1]), parse_cell_ref(rng[2])
+    return [(sheet, cell_ref(r, c)) for r in range(r0, r1 + 1) for c in range(c0, c1 + 1)]
+
+
+def _r1c1_part(axis: str, anchored: bool, index: int, host: int) -> str:
+    if anchored:
+        return f"{axis}{index}"
+    return f"{axis}[{index - host}]" if index != host else axis
+
+
+def to_r1c1(formula: str, host_row: int, host_col: int) -> str:
+    """
+    Formula text with every cell reference in R1C1 form relative to the
+    host cell ($-anchored parts stay absolute): [.B9]*['Gene-Hull'.$B$12]
+    in C9 -> [.RC[-1]]*['Gene-Hull'.R12C2]. Cells whose formulas differ only
+    by row/column offsets get the same text.
+    """
+    prefix = ""
+    if formula.startswith("of:"):
+        prefix, formula = "of:", formula[3:]
+    out: List[str] = [prefix]
+    pos = 0
+    while pos < len(formula):
+        m = TOKEN_PATTERN.match(formula, pos)
+        if not m:
+            return prefix + formula
+        pos = m.end()
+        text = m.group()
+        if m.lastgroup != "ref":
+            out.append(text)
+            continue
+        body = text[1:-1].strip()
+        parts = _split_range(body) or (body,)
+        converted = [_ref_to_r1c1(part.strip(), host_row, host_col) for part in parts]
+        out.append(text if None in converted else "[" + ":".join(converted) + "]")
+    return "".join(out)
+
+
+def _ref_to_r1c1(body: str, host_row: int, host_col: int) -> Optional[str]:
+    ref = REF_BODY.match(body)
+    if ref is None:
+        return None
+    row = _r1c1_part("R", bool(ref.group("rabs")), int(ref.group("row")), host_row)
+    col = _r1c1_part("C", bool(ref.group("cabs")), col_index(ref.group("col").upper()), host_col)
+    return f"{body[:ref.start('cabs')]}{row}{col}"
+
+
+# --- Parser ------------------------------------------------------------------
+
+# Binary operator precedence (higher binds tighter); all left-associative
+BINARY_PRECEDENCE = {
+    "=": 1, "<>": 1, "<": 1, ">": 1, "<=": 1, ">=": 1,
+    "&": 2,
+    "+": 3, "-": 3,
+    "*": 4, "/": 4,
+    "^": 5,
+}
+
+
+class _Parser:
+    def __init__(self, tokens: List[Tuple[str, Any]], host_sheet: str,
+                 names: frozenset = frozenset()):
+        self.tokens = tokens
+        self.pos = 0
+        self.host_sheet = host_sheet
+        # Bare names accepted as variables ("ref" nodes with an empty sheet)
+        self.names = names
+
+    def peek(self) -> Tuple[str, Any]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else ("end", None)
+
+    def take(self) -> Tuple[str, Any]:
+        tok = self.peek()
+        self.pos += 1
+        return tok
+
+    def expect(self, value: str):
+        tok = self.take()
+        if tok != ("op", value):
+            raise FormulaError(f"Expected '{value}', got {tok[1]!r}")
+
+    def parse(self) -> tuple:
+        node = self.expression(0)
+        if self.peek()[0] != "end":
+            raise FormulaError(f"Unexpected token {self.peek()[1]!r}")
+        return node
+
+    def expression(self, min_prec: int) -> tuple:
+        left = self.unary()
+        while True:
+            kind, value = self.peek()
+            prec = BINARY_PRECEDENCE.get(value) if kind == "op" else None
+            if prec is None or prec < min_prec:
+                return left
+            self.take()
+            right = self.expression(prec + 1)
+            left = ("bin", value, left, right)
+
+    def unary(self) -> tuple:
+        kind, value = self.peek()
+        if kind == "op" and value in ("-", "+"):
+            self.take()
+            operand = self.unary()
+            return ("neg", operand) if value == "-" else operand
+        return self.postfix()
+
+    def postfix(self) -> tuple:
+        node = self.primary()
+        while self.peek() == ("op", "%"):
+            self.take()
+            node = ("pct", node)
+        return node
+
+    def primary(self) -> tuple:
+        kind, value = self.take()
+        if kind == "num":
+            return ("num", value)
+        if kind == "str":
+            return ("str", value)
+        if kind == "ref":
+            if _split_range(value) is not None:
+                return ("range",) + parse_range(value, self.host_sheet)
+            return ("ref",) + parse_ref(value, self.host_sheet)
+        if kind == "op" and value == "(":
+            node = self.expression(0)
+            self.expect(")")
+            return node
+        if kind == "name":
+            if self.peek() != ("op", "("):
+                if value in ("TRUE", "FALSE"):
+                    return ("bool", value == "TRUE")
+                if value in self.names:
+                    return ("ref", "", value)
+                raise FormulaError(f"Named expressions are not supported: {value}")
+            self.take()
+            args: List[tuple] = []
+            if self.peek() != ("op", ")"):
+                while True:
+                    args.append(self.expression(0))
+                    if self.peek() == ("op", ";"):
+                        self.take()
+                        continue
+                    break
+            self.expect(")")
+            return ("call", value, args)
+        raise FormulaError(f"Unexpected token {value!r}")
+
+
+def parse(formula: str, host_sheet: str) -> tuple:
+    """Parse a formula into an AST; relative refs ([.A1]) use host_sheet"""
+    return _Parser(tokenize(formula), host_sheet).parse()
+
+
+def ast_from_json(node: Any) -> Any:
+    """Inverse of JSON encoding an AST: lists back to tuples"""
+    if isinstance(node, list):
+        return tuple(ast_from_json(x) for x in node)
+    return node
+
+
+# --- Function library --------------------------------------------------------
+
+def _round(x: float, digits: float = 0) -> float:
+    # Spreadsheet rounding: half away from zero
+    scale = 10.0 ** int(digits)
+    return math.copysign(math.floor(abs(x) * scale + 0.5) / scale, x)
+
+
+def _log(x: float, base: float = 10.0) -> float:
+    return math.log(x, base)
+
+
+def _sign(x: float) -> float:
+    return float((x > 0) - (x < 0))
+
+
+def _numbers(args: Sequence[Any]) -> List[Any]:
+    """Arguments with ranges flattened; empty and text range cells are skipped"""
+    out: List[Any] = []
+    for a in args:
+        if np is not None and isinstance(a, np.ndarray):
+            out.extend(a[~np.isnan(a)].tolist())
+        else:
+            out.append(a)
+    return out
+
+
+def _count(*args: Any) -> float:
+    return float(sum(1 for v in _numbers(args) if isinstance(v, (int, float))))
+
+
+def _average(*args: Any) -> float:
+    values = _numbers(args)
+    return sum(values) / len(values)
+
+
+def _sumproduct(*areas: "np.ndarray") -> float:
+    if any(a.shape != areas[0].shape for a in areas):
+        raise ValueError("SUMPRODUCT ranges differ in size")
+    product = areas[0]
+    for a in areas[1:]:
+        product = product * a
+    return float(np.nansum(product))
+
+
+def _index(area: "np.ndarray", row: float, col: Optional[float] = None) -> float:
+    # One index addresses a single row or column range; empty cells read as 0
+    rows, cols = area.shape
+    if col is None:
+        if rows == 1:
+            row, col = 1, row
+        elif cols == 1:
+            col = 1
+        else:
+            raise ValueError("INDEX of a 2-D range needs a column")
+    r, c = int(row) - 1, int(col) - 1
+    if not (0 <= r < rows and 0 <= c < cols):
+        raise ValueError("INDEX out of range")
+    value = float(area[r, c])
+    return 0.0 if math.isnan(value) else value
+
+
+def _match(value: Any, area: "np.ndarray", match_type: float = 1) -> float:
+    # 1: last of the ascending values <= value, -1: last of the descending
+    # values >= value, 0: first exact match
+    if min(area.shape) != 1:
+        raise ValueError("MATCH needs a single row or column")
+    values = area.ravel()
+    if match_type == 0:
+        hits = np.flatnonzero(values == value)
+        position = int(hits[0]) + 1 if hits.size else 0
+    else:
+        position = int(np.count_nonzero(values <= value if match_type > 0 else values >= value))
+    if position == 0:
+        raise ValueError("MATCH found no value")
+    return float(position)
+
+
+FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "ABS": abs,
+    "SQRT": math.sqrt,
+    "POWER": math.pow,
+    "EXP": math.exp,
+    "LN": math.log,
+    "LOG": _log,
+    "LOG10": math.log10,
+    "SIN": math.sin,
+    "COS": math.cos,
+    "TAN": math.tan,
+    "ASIN": math.asin,
+    "ACOS": math.acos,
+    "ATAN": math.atan,
+    "ATAN2": lambda x, y: math.atan2(y, x),  # ODF order is ATAN2(x; y)
+    "RADIANS": math.radians,
+    "DEGREES": math.degrees,
+    "PI": lambda: math.pi,
+    "SUM": lambda *a: sum(_numbers(a)),
+    "MIN": lambda *a: min(_numbers(a), default=0.0),
+    "MAX": lambda *a: max(_numbers(a), default=0.0),
+    "AVERAGE": _average,
+    "COUNT": _count,
+    "SUMPRODUCT": _sumproduct,
+    "INDEX": _index,
+    "MATCH": _match,
+    "ROUND": _round,
+    "INT": lambda x: float(math.floor(x)),
+    "MOD": lambda x, y: x - y * math.floor(x / y),
+    "SIGN": _sign,
+    "AND": lambda *a: all(a),
+    "OR": lambda *a: any(a),
+    "NOT": lambda x: not x,
+    "TRUE": lambda: True,
+    "FALSE": lambda: False,
+}
+
+# Functions taking range arguments: argument positions that accept a range
+# and positions that require one (None: every argument). Ranges anywhere
+# else are rejected at compile time.
+RANGE_ARGUMENTS: Dict[str, Tuple[Optional[Tuple[int, ...]], Tuple[int, ...]]] = {
+    "SUM": (None, ()),
+    "MIN": (None, ()),
+    "MAX": (None, ()),
+    "AVERAGE": (None, ()),
+    "COUNT": (None, ()),
+    "SUMPRODUCT": (None, None),
+    "INDEX": ((0,), (0,)),
+    "MATCH": ((1,), (1,)),
+}
+
+
+def check_range_arguments(name: str, args: Sequence[tuple]):
+    """Raise FormulaError unless `args` put ranges where `name` accepts them"""
+    accepted, required = RANGE_ARGUMENTS.get(name, ((), ()))
+    for k, arg in enumerate(args):
+        is_range = arg[0] == "range"
+        if is_range and accepted is not None and k not in accepted:
+            raise FormulaError(f"{name} does not take a range as argument {k + 1}")
+        if not is_range and (required is None or k in required):
+            raise FormulaError(f"{name} needs a range as argument {k + 1}")
+
+
+def _to_text(v: Any) -> str:
+    if isinstance(v, bool):
+        return "TRUE" if v else "FALSE"
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+def _equal(a: Any, b: Any) -> bool:
+    if isinstance(a, str) and isinstance(b, str):
+        return a.lower() == b.lower()
+    return a == b
+
+
+BINARY_OPS: Dict[str, Callable[[Any, Any], Any]] = {
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b,
+    "/": lambda a, b: a / b,
+    # math.pow raises ValueError where ** would return a complex number
+    "^": math.pow,
+    "&": lambda a, b: _to_text(a) + _to_text(b),
+    "=": _equal,
+    "<>": lambda a, b: not _equal(a, b),
+    "<": lambda a, b: a < b,
+    ">": lambda a, b: a > b,
+    "<=": lambda a, b: a <= b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+# --- Compiler ----------------------------------------------------------------
+
+Closure = Callable[[Sequence[Any]], Any]
+
+
+def collect_refs(node: tuple, out: Optional[Dict[Ref, int]] = None) -> Dict[Ref, int]:
+    """Distinct references of an AST in first-seen order -> operand index"""
+    if out is None:
+        out = {}
+    kind = node[0]
+    if kind == "ref":
+        out.setdefault((node[1], node[2]), len(out))
+    elif kind in ("neg", "pct"):
+        collect_refs(node[1], out)
+    elif kind == "bin":
+        collect_refs(node[2], out)
+        collect_refs(node[3], out)
+    elif kind == "call":
+        for arg in node[2]:
+            collect_refs(arg, out)
+    return out
+
+
+def collect_ranges(node: tuple, out: Optional[Dict[RangeRef, int]] = None) -> Dict[RangeRef, int]:
+    """Distinct ranges of an AST in first-seen order -> range number"""
+    if out is None:
+        out = {}
+    kind = node[0]
+    if kind == "range":
+        out.setdefault((node[1], node[2], node[3]), len(out))
+    elif kind in ("neg", "pct"):
+        collect_ranges(node[1], out)
+    elif kind == "bin":
+        collect_ranges(node[2], out)
+        collect_ranges(node[3], out)
+    elif kind == "call":
+        for arg in node[2]:
+            collect_ranges(arg, out)
+    return out
+
+
+def _scalar_node(node: tuple) -> tuple:
+    if node[0] == "range":
+        raise FormulaError(f"Range [.{node[2]}:.{node[3]}] used as a single value")
+    return node
+
+
+def compile_ast(node: tuple, ref_index: Dict[tuple, int]) -> Closure:
+    """
+    Turn an AST into a closure taking the operand sequence. `ref_index`
+    maps refs (sheet, addr) and ranges (sheet, first, last) to operand
+    positions.
+    """
+    kind = node[0]
+    if kind in ("num", "str", "bool"):
+        const = node[1]
+        return lambda ops: const
+    if kind == "ref":
+        i = ref_index[(node[1], node[2])]
+        return lambda ops: ops[i]
+    if kind == "range":
+        if np is None:
+            raise FormulaError("NumPy is required for range references")
+        i = ref_index[(node[1], node[2], node[3])]
+        return lambda ops: ops[i]
+    if kind == "neg":
+        f = compile_ast(_scalar_node(node[1]), ref_index)
+        return lambda ops: -f(ops)
+    if kind == "pct":
+        f = compile_ast(_scalar_node(node[1]), ref_index)
+        return lambda ops: f(ops) / 100.0
+    if kind == "bin":
+        op = BINARY_OPS[node[1]]
+        a = compile_ast(_scalar_node(node[2]), ref_index)
+        b = compile_ast(_scalar_node(node[3]), ref_index)
+        return lambda ops: op(a(ops), b(ops))
+    if kind == "call":
+        check_range_arguments(node[1], node[2])
+        name, args = node[1], [compile_ast(arg, ref_index) for arg in node[2]]
+        if name == "IF":
+            if not 1 <= len(args) <= 3:
+                raise FormulaError("IF takes 1 to 3 arguments")
+            cond = args[0]
+            then = args[1] if len(args) > 1 else (lambda ops: True)
+            other = args[2] if len(args) > 2 else (lambda ops: False)
+            return lambda ops: then(ops) if cond(ops) else other(ops)
+        fn = FUNCTIONS.get(name)
+        if fn is None:
+            raise FormulaError(f"Unsupported function {name}")
+        if len(args) == 1:
+            a0 = args[0]
+            return lambda ops: fn(a0(ops))
+        return lambda ops: fn(*[a(ops) for a in args])
+    raise FormulaError(f"Unknown AST node {kind}")
+
+
+class CompiledFormula:
+    """
+    A formula compiled for one host sheet. evaluate() expects the values of
+    the distinct (sheet, addr) `refs`, in order, followed by one 2-D array
+    per entry of `ranges` (NaN for empty and text cells).
+    """
+
+    __slots__ = ("source", "host_sheet", "ast", "refs", "ranges", "fn")
+
+    def __init__(self, source: str, host_sheet: str, ast: tuple):
+        self.source = source
+        self.host_sheet = host_sheet
+        self.ast = _scalar_node(ast)
+        ref_index: Dict[tuple, int] = collect_refs(ast)
+        self.refs: Tuple[Ref, ...] = tuple(ref_index)
+        ranges = collect_ranges(ast)
+        self.ranges: Tuple[RangeRef, ...] = tuple(ranges)
+        ref_index.update((rng, len(self.refs) + k) for rng, k in ranges.items())
+        self.fn: Closure = compile_ast(ast, ref_index)
+
+    def evaluate(self, operands: Sequence[Any]) -> Optional[Any]:
+        """
+        Value for the given operand values; None on a spreadsheet error,
+        including overflow to an infinity and NaN (#NUM! in the spreadsheet)
+        """
+        try:
+            result = self.fn(operands)
+        except (ArithmeticError, TypeError, ValueError):
+            return None
+        if isinstance(result, (bool, int)):
+            return float(result)
+        if isinstance(result, float) and not math.isfinite(result):
+            return None
+        return result
+
+    def __repr__(self) -> str:
+        return f"<CompiledFormula {self.source!r} @ {self.host_sheet}>"
+
+
+@lru_cache(maxsize=None)
+def compile_formula(formula: str, host_sheet: str) -> CompiledFormula:
+    """Compile (and cache) a formula; raises FormulaError if unsupported"""
+    return CompiledFormula(formula, host_sheet, parse(formula, host_sheet))
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(expression: str, names: FrozenSet[str]) -> CompiledFormula:
+    """
+    Compile a plain expression over bare variable names ("A1+B2*C3").
+    Names are case-insensitive and become refs ("", NAME): pass their
+    values to evaluate() in the order of `refs`.
+    """
+    ast = _Parser(tokenize(expression), "", frozenset(n.upper() for n in names)).parse()
+    return CompiledFormula(expression, "", ast)
@@ -3,107 +3,96 @@ Gene-Hull ODS Replica - Core Module
 Reads Gene-Hull ODS and replicates calculations for "Offsets x,y,z" sheet.
 """
 
-from odf.opendocument import load
-from odf.table import Table, TableRow, TableCell
-from odf.text import P
-from typing import Dict, Optional, Tuple, Any
+from typing import Dict, Iterable, Optional, Tuple, Any
+import os
 import re
 import json
 
+try:
+    from .ods_cells import CellFilter, has_content, read_workbook, run_length_sheet
+    from .sheet_store import ColumnarSheet, RunLengthSheet, cell_ref, parse_cell_ref
+    from .workbook_cache import WorkbookCache, cache_from_argv
+    from .formula_engine import FormulaError, compile_expression, compile_formula, parse_range
+    from .workbook_evaluator import WorkbookEvaluator
+    from .compiled_workbook import COMPILED_SUFFIX, load_compiled, save_compiled
+except ImportError:
+    # Run as a script from inside ghi_logic/
+    from ods_cells import CellFilter, has_content, read_workbook, run_length_sheet
+    from sheet_store import ColumnarSheet, RunLengthSheet, cell_ref, parse_cell_ref
+    from workbook_cache import WorkbookCache, cache_from_argv
+    from formula_engine import FormulaError, compile_expression, compile_formula, parse_range
+    from workbook_evaluator import WorkbookEvaluator
+    from compiled_workbook import COMPILED_SUFFIX, load_compiled, save_compiled
+
 
 class GeneHullODSReader:
-    """Read and extract data from Gene-Hull ODS"""
+    """
+    Read and extract data from Gene-Hull ODS.
     
-    def __init__(self, ods_path: str):
-        self.ods_path = ods_path
-        self.doc = load(ods_path)
-        self.sheets: Dict[str, Dict[str, Dict]] = {}
-        self._load_all_sheets()
+    With streaming=True content.xml is parsed incrementally instead of
+    loading the whole odfpy DOM; the resulting `sheets` are the same.
+    Both backends go through the shared ods_cells extraction core.
     
-    def _get_cell_ref(self, row: int, col: int) -> str:
-        """Convert row, col to cell address"""
-        letters = ""
-        col_idx = col
-        while col_idx > 0:
-            col_idx, rem = divmod(col_idx - 1, 26)
-            letters = chr(65 + rem) + letters
-        return f"{letters}{row}"
-    
-    def _get_text(self, cell: TableCell) -> str:
-        paras = cell.getElementsByType(P)
-        if not paras:
-            return ""
-        texts = []
-        for p in paras:
-            texts.append("".join([getattr(t, 'data', '') for t in p.childNodes]))
-        return "\n".join(texts).strip()
-    
-    def _get_formula(self, cell: TableCell) -> Optional[str]:
-        try:
-            return cell.getAttribute("formula")
-        except Exception:
-            return None
+    sheets restricts loading to the named sheets and row_ranges maps a sheet
+    name to an inclusive (first_row, last_row) range; rows outside it are
+    skipped and streaming stops once every requested sheet has been read.
+    cell_filter decides which non-empty cells are kept (default: all).
     
-    def _get_value(self, cell: TableCell) -> Optional[Any]:
-        try:
-            val = cell.getAttribute("value")
-            if val is not None:
-                try:
-                    return float(val)
-                except ValueError:
-                    return val
-        except Exception:
-            pass
-        txt = self._get_text(cell)
-        return txt if txt else None
-    
-    def _load_all_sheets(self):
-        """Load all sheets from ODS"""
-        tables = self.doc.spreadsheet.getElementsByType(Table)
-        for table in tables:
-            try:
-                sheet_name = table.getAttribute("name") or "Sheet"
-            except Exception:
-                sheet_name = "Sheet"
-            
-            sheet_data = self._load_sheet(table)
-            self.sheets[sheet_name] = sheet_data
+    Each sheet is a RunLengthSheet: repeated cells/rows are stored once as
+    runs and empty cells are not stored at all.
     
-    def _load_sheet(self, table: Table) -> Dict[str, Dict]:
-        """Load single sheet data"""
-        sheet_map: Dict[str, Dict] = {}
-        row_idx = 0
-        
-        for row in table.getElementsByType(TableRow):
-            row_idx += 1
-            col_idx = 0
-            for cell in row.getElementsByType(TableCell):
-                try:
-                    repeat_attr = cell.getAttribute("numbercolumnsrepeated")
-                except Exception:
-                    repeat_attr = None
-                repeat = int(repeat_attr or "1")
-                
-                for _ in range(repeat):
-                    col_idx += 1
-                    addr = self._get_cell_ref(row_idx, col_idx)
-                    
-                    formula = self._get_formula(cell)
-                    value = self._get_value(cell)
-                    text = self._get_text(cell)
-                    
-                    if formula or value is not None or text:
-                        entry = {
-                            "value": value,
-                            "text": text,
-                            "formula": formula,
-                        }
-                        sheet_map[addr] = entry
+    With a WorkbookCache, an unchanged workbook read with the same options is
+    decoded from the on-disk cache; misses are parsed and then cached.
+    
+    layout="columnar" converts every sheet to a NumPy-backed ColumnarSheet
+    (float64 matrix + mask) for O(1) (row, col) access and zero-copy slices.
+    """
+    
+    LAYOUTS = ("runs", "columnar")
+    
+    def __init__(self, ods_path: str, streaming: bool = False,
+                 sheets: Optional[Iterable[str]] = None,
+                 row_ranges: Optional[Dict[str, Tuple[int, Optional[int]]]] = None,
+                 cache: Optional[WorkbookCache] = None,
+                 layout: str = "runs",
+                 cell_filter: CellFilter = has_content):
+        if layout not in self.LAYOUTS:
+            raise ValueError(f"Unknown sheet layout '{layout}', expected one of {self.LAYOUTS}")
+        self.ods_path = ods_path
+        self.streaming = streaming
+        self.sheet_filter = set(sheets) if sheets is not None else None
+        self.row_ranges = dict(row_ranges or {})
+        self.cell_filter = cell_filter
+        self.layout = layout
         
-        return sheet_map
+        parsed = read_workbook(ods_path, self.sheet_filter, self.row_ranges, cache,
+                               backend="stream" if streaming else "odfpy")
+        self.sheets: Dict[str, Any] = {}
+        for sheet_name, rows in parsed:
+            sheet = run_length_sheet(rows, cell_filter)
+            self.sheets[sheet_name] = ColumnarSheet.from_runs(sheet) if layout == "columnar" else sheet
     
-    def get_sheet(self, sheet_name: str) -> Dict[str, Dict]:
-        return self.sheets.get(sheet_name, {})
+    @classmethod
+    def from_sheets(cls, sheets: Dict[str, Any], ods_path: Optional[str] = None) -> "GeneHullODSReader":
+        """Reader over already loaded sheets (e.g. from a compiled workbook)"""
+        reader = cls.__new__(cls)
+        reader.ods_path = ods_path
+        reader.streaming = False
+        reader.sheet_filter = None
+        reader.row_ranges = {}
+        reader.cell_filter = has_content
+        reader.layout = "runs"
+        reader.sheets = sheets
+        return reader
+    
+    def _get_cell_ref(self, row: int, col: int) -> str:
+        """Convert row, col to cell address"""
+        return cell_ref(row, col)
+    
+    def get_sheet(self, sheet_name: str):
+        """RunLengthSheet or ColumnarSheet, depending on the reader layout"""
+        sheet = self.sheets.get(sheet_name)
+        return sheet if sheet is not None else RunLengthSheet()
     
     def get_cell(self, sheet_name: str, cell_addr: str) -> Optional[Any]:
         """Get value or formula of a cell"""
@@ -123,8 +112,11 @@ class GeneHullODSReader:
 class FormulaParser:
     """Parse and evaluate ODF formulas"""
     
-    # Regex to extract cell references: [Sheet.A1], [.A1], [Sheet.$A$1]
-    REF_PATTERN = re.compile(r"\[(['\"]?[\w\s-]+['\"]?\.)?([A-Z]+)(\$?)(\d+)\]")
+    # Regex to extract cell references: [Sheet.A1], [.A1], [Sheet.$A$1] and
+    # ranges [.A1:.B20]; groups: sheet prefix, column, row, end column, end row
+    REF_PATTERN = re.compile(
+        r"\[\$?((?:'[^']*'|[\w\s-]*)\.)\$?([A-Z]+)\$?(\d+)"
+        r"(?::\$?(?:(?:'[^']*'|[\w\s-]*)\.)?\$?([A-Z]+)\$?(\d+))?\]")
     
     @staticmethod
     def parse_cell_reference(ref_str: str) -> Tuple[Optional[str], str]:
@@ -145,51 +137,163 @@ class FormulaParser:
         
         return (None, ref_str)
     
+    @staticmethod
+    def parse_range_reference(ref_str: str) -> Tuple[Optional[str], str, str]:
+        """
+        Parse a range like 'Gene-Hull'.A1:.B20 -> ('Gene-Hull', 'A1', 'B20')
+        (.A1:.B20 -> (None, 'A1', 'B20')); corners are normalized.
+        """
+        sheet, first, last = parse_range(ref_str, "")
+        return (sheet or None, first, last)
+    
     @staticmethod
     def extract_references(formula_str: str) -> list:
-        """Extract all cell references from an ODF formula"""
-        refs = re.findall(r"\[([^\]]+)\]", formula_str)
-        return refs
+        """Extract all cell and range references from an ODF formula"""
+        return [m.group(0)[1:-1] for m in FormulaParser.REF_PATTERN.finditer(formula_str)]
     
     @staticmethod
     def evaluate_arithmetic(expr: str, context: Dict[str, Any]) -> Optional[float]:
         """
-        Safely evaluate arithmetic expressions with variable substitution.
-        E.g., "A1+B2*C3" becomes "10+20*30"
+        Evaluate an arithmetic expression over the variables in context,
+        e.g. "A1+B2*C3". Compiled with the formula engine (no eval);
+        names are case-insensitive. None if it cannot be evaluated.
         """
+        values = {name.upper(): value for name, value in context.items()}
         try:
-            # This is simplified; real production code should use a proper expression evaluator
-            result = eval(expr, {"__builtins__": {}}, context)
-            return float(result)
-        except Exception as e:
+            compiled = compile_expression(expr, frozenset(values))
+        except FormulaError:
             return None
+        result = compiled.evaluate([values[name] for _, name in compiled.refs])
+        return float(result) if isinstance(result, (int, float)) else None
 
 
 class GeneHullCalculator:
     """Main calculator for Gene-Hull replica"""
     
-    def __init__(self, ods_path: str):
-        self.reader = GeneHullODSReader(ods_path)
+    INPUT_SHEET = "Gene-Hull"
+    OUTPUT_SHEET = "Offsets x,y,z"
+    # Sheets read by compute_offsets; pass as `sheets` to skip the others
+    REQUIRED_SHEETS = (INPUT_SHEET, OUTPUT_SHEET)
+    # Named row blocks of the output sheet accepted by compute(targets=...)
+    BLOCKS = {
+        "sections": (13, 35),       # section Y/Z pairs
+        "rear_transom": (64, 113),  # rear transom intersection
+        "centreline": (118, 136),
+    }
+    
+    def __init__(self, ods_path: str, streaming: bool = False,
+                 sheets: Optional[Iterable[str]] = None,
+                 row_ranges: Optional[Dict[str, Tuple[int, Optional[int]]]] = None,
+                 cache: Optional[WorkbookCache] = None, layout: str = "runs"):
+        self.reader = GeneHullODSReader(ods_path, streaming=streaming,
+                                        sheets=sheets, row_ranges=row_ranges,
+                                        cache=cache, layout=layout)
         self.cache: Dict[str, Any] = {}
+        self._evaluator: Optional[WorkbookEvaluator] = None
+    
+    @property
+    def evaluator(self) -> WorkbookEvaluator:
+        """
+        Dependency-graph evaluator over all loaded sheets (built on first use).
+        Only Gene-Hull constants are inputs: formulas that do not depend on
+        them are folded to constants when the evaluator is built.
+        """
+        if self._evaluator is None:
+            self._evaluator = WorkbookEvaluator(self.reader.sheets, input_sheets=(self.INPUT_SHEET,))
+        return self._evaluator
+    
+    def export_compiled(self, path: str):
+        """Save the compiled workbook so later runs skip ODS parsing and compiling"""
+        save_compiled(self.evaluator, path, source_path=self.reader.ods_path)
+    
+    def generate_module(self, path: str) -> str:
+        """Write a standalone NumPy module with compute(inputs) for the offsets"""
+        # Imported here so `python -m ghi_logic.codegen` does not import itself twice
+        try:
+            from .codegen import write_module
+        except ImportError:
+            from codegen import write_module
+        source = os.path.basename(self.reader.ods_path) if self.reader.ods_path else "the workbook"
+        return write_module(self.evaluator, path, sheet=self.OUTPUT_SHEET,
+                            input_sheet=self.INPUT_SHEET, source=source)
+    
+    @classmethod
+    def from_compiled(cls, path: str, ods_path: Optional[str] = None) -> "GeneHullCalculator":
+        """
+        Calculator backed by a compiled workbook (see export_compiled); needs
+        neither the ODS nor odfpy. With ods_path the artifact must match it.
+        """
+        evaluator = load_compiled(path, ods_path)
+        calc = cls.__new__(cls)
+        calc.reader = GeneHullODSReader.from_sheets(evaluator.sheets, ods_path)
+        calc.cache = {}
+        calc._evaluator = evaluator
+        return calc
+    
+    def set_inputs(self, inputs: Dict[str, Any], sheet: str = INPUT_SHEET):
+        """Override input cells ({"B12": 8.5, ...}); compute_offsets() uses them"""
+        for cell_addr, value in inputs.items():
+            self.evaluator.set_input(sheet, cell_addr, value)
     
     def compute_offsets(self) -> Dict[str, Dict]:
         """
         Compute all offsets from input sheet and formulas.
         Returns computed sheet data for "Offsets x,y,z".
+        The workbook is recalculated in dependency order (only the cells
+        downstream of inputs changed since the last call), so intermediate
+        formula cells reflect the current inputs.
+        """
+        return self.compute()
+    
+    def _target_filter(self, targets: Iterable[str]):
+        """Expand targets to a predicate over (row, col) of the output sheet"""
+        boxes = []
+        for target in targets:
+            if target in self.BLOCKS:
+                first, last = self.BLOCKS[target]
+                boxes.append((first, last, 1, None))
+                continue
+            corners = [parse_cell_ref(part.replace("$", "").upper()) for part in target.split(":")]
+            if len(corners) > 2 or None in corners:
+                raise ValueError(f"Unknown target '{target}', expected a cell, a range "
+                                 f"or one of {sorted(self.BLOCKS)}")
+            (r0, c0), (r1, c1) = corners[0], corners[-1]
+            boxes.append((min(r0, r1), max(r0, r1), min(c0, c1), max(c0, c1)))
+        
+        def wanted(row: int, col: int) -> bool:
+            return any(r0 <= row <= r1 and c0 <= col and (c1 is None or col <= c1)
+                       for r0, r1, c0, c1 in boxes)
+        return wanted
+    
+    def compute(self, targets: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """
+        Compute the "Offsets x,y,z" cells selected by `targets` (None: all).
+        Targets are named blocks (see BLOCKS), cells ("G13") or ranges
+        ("G13:H35"); only the formula cells they depend on are evaluated.
         """
-        input_sheet = self.reader.get_sheet("Gene-Hull")
-        output_sheet = self.reader.get_sheet("Offsets x,y,z")
+        output_sheet = self.reader.get_sheet(self.OUTPUT_SHEET)
+        evaluator = self.evaluator
+        
+        cells = sorted(output_sheet.items())
+        if targets is not None:
+            wanted = self._target_filter(targets)
+            cells = [(addr, data) for addr, data in cells if wanted(*parse_cell_ref(addr))]
+            evaluator.recalc([evaluator.index[(self.OUTPUT_SHEET, addr)] for addr, _ in cells])
+        else:
+            evaluator.recalc()
         
         results = {}
         
         # For each cell in output sheet
-        for cell_addr, cell_data in sorted(output_sheet.items()):
+        for cell_addr, cell_data in cells:
             formula = cell_data.get("formula")
             value = cell_data.get("value")
             
             if formula:
-                # Parse and resolve formula
-                computed_value = self._resolve_formula(formula, input_sheet)
+                if (self.OUTPUT_SHEET, cell_addr) in evaluator.uncompiled:
+                    computed_value = None
+                else:
+                    computed_value = evaluator.value(self.OUTPUT_SHEET, cell_addr)
                 results[cell_addr] = {
                     "value": computed_value,
                     "formula": formula,
@@ -203,45 +307,52 @@ class GeneHullCalculator:
         
         return results
     
-    def _resolve_formula(self, formula_str: str, input_sheet: Dict) -> Optional[Any]:
-        """Resolve an ODF formula to a value"""
+    def compute_offsets_batch(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Evaluate the workbook for N input scenarios at once.
+        `inputs` maps Gene-Hull cells to length-N sequences (or scalars
+        shared by every scenario), e.g. {"B12": [7.5, 8.0, 8.5]}. Returns
+        the length-N value vector of every "Offsets x,y,z" formula cell
+        (NaN where unresolved).
+        """
+        batch = self.evaluator.evaluate_batch(
+            {(self.INPUT_SHEET, addr): column for addr, column in inputs.items()})
+        output_sheet = self.reader.get_sheet(self.OUTPUT_SHEET)
+        results = {}
+        for cell_addr, cell_data in sorted(output_sheet.items()):
+            if cell_data.get("formula"):
+                values = batch.value(self.OUTPUT_SHEET, cell_addr)
+                if (self.OUTPUT_SHEET, cell_addr) in self.evaluator.uncompiled:
+                    values[:] = float("nan")
+                results[cell_addr] = values
+        return results
+    
+    def _resolve_formula(self, formula_str: str, input_sheet: Optional[Dict] = None,
+                         host_sheet: str = INPUT_SHEET) -> Optional[Any]:
+        """
+        Resolve an ODF formula to a value using the cached ODS cell values.
+        The formula is compiled once (see formula_engine); relative refs
+        ([.A1]) point into host_sheet. Empty cells count as 0; a reference
+        to a sheet that was not loaded or an unsupported formula gives None.
+        """
         if not formula_str:
             return None
-        
-        # Remove "of:=" prefix
-        formula_str = formula_str.replace("of:=", "").strip()
-        
-        # Extract all references
-        refs = FormulaParser.extract_references(formula_str)
-        
-        # Build context dict with cell values
-        context = {}
-        resolved_formula = formula_str
-        
-        for ref in refs:
-            sheet_name, cell_addr = FormulaParser.parse_cell_reference(ref)
-            
-            if sheet_name is None:
-                sheet_name = "Gene-Hull"  # Default to input sheet
-            
-            # Get value from input sheet
-            if sheet_name in self.reader.sheets:
-                sheet = self.reader.sheets[sheet_name]
-                if cell_addr in sheet:
-                    cell_value = sheet[cell_addr].get("value")
-                    if cell_value is not None:
-                        context[f"'{ref}'"] = cell_value
-                        resolved_formula = resolved_formula.replace(f"[{ref}]", str(cell_value))
-        
-        # Try to evaluate
         try:
-            if resolved_formula.replace(" ", "").replace("+", "").replace("-", "").replace("*", "").replace("/", "").replace(".", "").replace("-", "").isdigit():
-                return float(resolved_formula)
-            else:
-                result = eval(resolved_formula, {"__builtins__": {}})
-                return float(result) if isinstance(result, (int, float)) else result
-        except Exception:
+            compiled = compile_formula(formula_str, host_sheet)
+        except FormulaError:
             return None
+        
+        sheets = self.reader.sheets
+        operands = []
+        for sheet_name, cell_addr in compiled.refs:
+            sheet = sheets.get(sheet_name)
+            if sheet is None:
+                return None
+            cell = sheet.get(cell_addr)
+            value = cell.get("value") if cell is not None else None
+            operands.append(0.0 if value is None else value)
+        
+        return compiled.evaluate(operands)
     
     def export_offsets(self, output_file: str, format_type: str = "json"):
         """
@@ -264,13 +375,36 @@ class GeneHullCalculator:
 if __name__ == "__main__":
     import sys
     
-    if len(sys.argv) < 2:
-        print("Usage: python gene_hull_calculator.py <ods_path> [output_json]")
+    argv = sys.argv[1:]
+    cache = cache_from_argv(argv)
+    streaming = "--stream" in argv
+    profiling = "--profile" in argv
+    compiled_out = None
+    if "--save-compiled" in argv:
+        at = argv.index("--save-compiled")
+        compiled_out = argv[at + 1] if at + 1 < len(argv) else None
+        del argv[at:at + 2]
+    args = [a for a in argv if a not in ("--stream", "--profile")]
+    
+    if len(args) < 1:
+        print("Usage: python gene_hull_calculator.py <ods_path|compiled" + COMPILED_SUFFIX + "> [output_json] "
+              "[--stream] [--no-cache] [--clear-cache] [--profile] [--save-compiled <path" + COMPILED_SUFFIX + ">]")
         sys.exit(1)
     
-    ods_path = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else "offsets_computed.json"
+    ods_path = args[0]
+    output_file = args[1] if len(args) > 1 else "offsets_computed.json"
     
-    calc = GeneHullCalculator(ods_path)
+    if ods_path.endswith(COMPILED_SUFFIX):
+        calc = GeneHullCalculator.from_compiled(ods_path)
+    else:
+        # Only the input and output sheets are needed to export offsets
+        calc = GeneHullCalculator(ods_path, streaming=streaming,
+                                  sheets=GeneHullCalculator.REQUIRED_SHEETS, cache=cache)
+    profile = calc.evaluator.set_profiling() if profiling else None
     calc.export_offsets(output_file, format_type="json")
     print(f"Offsets exported to {output_file}")
+    if profile is not None:
+        print(profile.report())
+    if compiled_out:
+        calc.export_compiled(compiled_out)
+        print(f"Compiled workbook saved to {compiled_out}")
@@ -0,0 +1,112 @@
+"""
+Shared ODS cell-extraction core.
+
+Every Gene-Hull tool (calculator, extractors, analyzer) reads cells through
+this module, so value/text/formula rules and any speedup live in one place:
+- read_workbook: raw row runs from the streaming or odfpy backend (+ cache)
+- value rules: how a cell's value is presented (typed float or raw string)
+- cell filters: pluggable predicates deciding which cells a tool keeps
+- sheet_map / run_length_sheet: the two sheet shapes built from the runs
+"""
+
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    from .ods_stream import RowRanges, StreamCell
+    from .sheet_store import CellRun, RunLengthSheet, cell_ref
+    from .workbook_cache import ParsedSheets, WorkbookCache, read_sheets
+except ImportError:
+    from ods_stream import RowRanges, StreamCell
+    from sheet_store import CellRun, RunLengthSheet, cell_ref
+    from workbook_cache import ParsedSheets, WorkbookCache, read_sheets
+
+CellFilter = Callable[[StreamCell], bool]
+ValueRule = Callable[[StreamCell], Any]
+
+
+# Cell filters. Backends already drop empty cells, so these only narrow.
+
+def has_content(cell: StreamCell) -> bool:
+    return cell.value is not None or bool(cell.text) or bool(cell.formula)
+
+
+def has_formula(cell: StreamCell) -> bool:
+    return bool(cell.formula)
+
+
+def has_value(cell: StreamCell) -> bool:
+    return cell.value is not None or bool(cell.text)
+
+
+# Value rules
+
+def typed_value(cell: StreamCell) -> Optional[Any]:
+    """office:value as float (raw string if not numeric), else text or None"""
+    if cell.value is not None:
+        try:
+            return float(cell.value)
+        except ValueError:
+            return cell.value
+    return cell.text if cell.text else None
+
+
+def raw_value(cell: StreamCell) -> Optional[str]:
+    """office:value string as written in the file, else text or None"""
+    if cell.value is not None:
+        return cell.value
+    return cell.text if cell.text else None
+
+
+def read_workbook(ods_path: str,
+                  sheets: Optional[Iterable[str]] = None,
+                  row_ranges: Optional[RowRanges] = None,
+                  cache: Optional[WorkbookCache] = None,
+                  backend: str = "stream") -> ParsedSheets:
+    """Raw (sheet_name, row runs) of the selected sheets/rows"""
+    return read_sheets(ods_path, sheets, row_ranges, cache, backend)
+
+
+def iter_cells(rows, cell_filter: Optional[CellFilter] = None
+               ) -> Iterator[Tuple[int, int, StreamCell]]:
+    """Expand row runs to (row, col, cell); the filter runs once per XML cell"""
+    for row_idx, row_count, cells in rows:
+        kept = [c for c in cells if cell_filter(c)] if cell_filter else cells
+        if not kept:
+            continue
+        for r in range(row_idx, row_idx + row_count):
+            for cell in kept:
+                for c in range(cell.col, cell.col + cell.count):
+                    yield r, c, cell
+
+
+def sheet_map(rows, cell_filter: Optional[CellFilter] = None,
+              value_rule: ValueRule = typed_value) -> Dict[str, Dict[str, Any]]:
+    """Plain "A1" -> {"value", "text", "formula"} dict (runs share one entry)"""
+    out: Dict[str, Dict[str, Any]] = {}
+    for row_idx, row_count, cells in rows:
+        for cell in cells:
+            if cell_filter is not None and not cell_filter(cell):
+                continue
+            entry = {
+                "value": value_rule(cell),
+                "text": cell.text,
+                "formula": cell.formula,
+            }
+            for r in range(row_idx, row_idx + row_count):
+                for c in range(cell.col, cell.col + cell.count):
+                    out[cell_ref(r, c)] = entry
+    return out
+
+
+def run_length_sheet(rows, cell_filter: Optional[CellFilter] = None,
+                     value_rule: ValueRule = typed_value) -> RunLengthSheet:
+    """Compact RunLengthSheet with one payload per XML cell run"""
+    sheet = RunLengthSheet()
+    for row_idx, row_count, cells in rows:
+        runs = [CellRun(c.col, c.count, {
+                    "value": value_rule(c),
+                    "text": c.text,
+                    "formula": c.formula,
+                }) for c in cells if cell_filter is None or cell_filter(c)]
+        sheet.add_row(row_idx, row_count, runs)
+    return sheet
@@ -0,0 +1,89 @@
+"""
+odfpy DOM backend for the ODS cell-extraction core.
+Produces the same (sheet_name, rows) runs as ods_stream.iter_sheets from a
+fully loaded odfpy document, for callers that already hold one.
+"""
+
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from .ods_stream import RowRanges, StreamCell
+except ImportError:
+    from ods_stream import RowRanges, StreamCell
+
+try:
+    from odf.opendocument import load
+    from odf.table import Table, TableRow
+    from odf.text import P
+except Exception:
+    load = None  # type: ignore
+    Table = TableRow = P = None  # type: ignore
+
+
+def _node_text(node) -> str:
+    data = getattr(node, "data", None)
+    if data is not None:
+        return data
+    return "".join(_node_text(child) for child in node.childNodes)
+
+
+def cell_text(cell) -> str:
+    """Text of all paragraphs in a cell, one line per paragraph"""
+    return "\n".join(_node_text(p) for p in cell.getElementsByType(P)).strip()
+
+
+def _rows(table, first_row: int, last_row: Optional[int]) -> Iterator[Tuple[int, int, List[StreamCell]]]:
+    next_row = 1
+    for row in table.getElementsByType(TableRow):
+        row_idx = next_row
+        row_count = int(row.getAttribute("numberrowsrepeated") or "1")
+        next_row += row_count
+        if next_row - 1 < first_row:
+            continue
+        if last_row is not None and row_idx > last_row:
+            return
+
+        cells: List[StreamCell] = []
+        col_idx = 0
+        for cell in row.childNodes:
+            kind = getattr(cell, "qname", (None, None))[1]
+            if kind not in ("table-cell", "covered-table-cell"):
+                continue
+            repeat = int(cell.getAttribute("numbercolumnsrepeated") or "1")
+            # Covered (merged) cells only occupy their columns
+            if kind == "table-cell":
+                value = cell.getAttribute("value")
+                formula = cell.getAttribute("formula")
+                text = cell_text(cell) if cell.childNodes else ""
+                if value is not None or formula or text:
+                    cells.append(StreamCell(col_idx + 1, repeat, value, text, formula))
+            col_idx += repeat
+
+        if cells:
+            start = max(row_idx, first_row)
+            end = next_row - 1 if last_row is None else min(next_row - 1, last_row)
+            yield start, end - start + 1, cells
+
+
+def table_rows(table) -> Iterator[Tuple[int, int, List[StreamCell]]]:
+    """Row runs of an already loaded odfpy Table"""
+    return _rows(table, 1, None)
+
+
+def iter_dom_sheets(ods_path_or_doc,
+                    sheets: Optional[Iterable[str]] = None,
+                    row_ranges: Optional[RowRanges] = None
+                    ) -> Iterator[Tuple[str, Iterator[Tuple[int, int, List[StreamCell]]]]]:
+    """Same contract as ods_stream.iter_sheets, using the odfpy DOM"""
+    if load is None:
+        raise ImportError("odfpy is not available; use the streaming backend")
+    doc = load(ods_path_or_doc) if isinstance(ods_path_or_doc, str) else ods_path_or_doc
+    wanted = set(sheets) if sheets is not None else None
+    row_ranges = row_ranges or {}
+
+    for table in doc.spreadsheet.getElementsByType(Table):
+        name = table.getAttribute("name") or "Sheet"
+        if wanted is not None and name not in wanted:
+            continue
+        first_row, last_row = row_ranges.get(name, (1, None))
+        yield name, _rows(table, first_row, last_row)
@@ -4,83 +4,20 @@ Helps understand the structure and complexity for Python replica.
 """
 
 import sys
-from odf.opendocument import load
-from odf.table import Table, TableRow, TableCell
-from odf.text import P
 from typing import Dict, List, Optional, Set
 import re
 
+try:
+    from .ods_cells import has_content, raw_value, read_workbook, sheet_map
+    from .workbook_cache import cache_from_argv
+except ImportError:
+    from ods_cells import has_content, raw_value, read_workbook, sheet_map
+    from workbook_cache import cache_from_argv
 
-def get_cell_ref(row: int, col: int) -> str:
-    """Convert row, col to cell address (A1, B2, etc.)"""
-    letters = ""
-    col_idx = col
-    while col_idx > 0:
-        col_idx, rem = divmod(col_idx - 1, 26)
-        letters = chr(65 + rem) + letters
-    return f"{letters}{row}"
 
-
-def get_text(cell: TableCell) -> str:
-    paras = cell.getElementsByType(P)
-    if not paras:
-        return ""
-    texts = []
-    for p in paras:
-        texts.append("".join([getattr(t, 'data', '') for t in p.childNodes]))
-    return "\n".join(texts).strip()
-
-
-def get_formula(cell: TableCell) -> Optional[str]:
-    try:
-        return cell.getAttribute("formula")
-    except Exception:
-        return None
-
-
-def get_value(cell: TableCell) -> Optional[str]:
-    try:
-        val = cell.getAttribute("value")
-    except Exception:
-        val = None
-    if val is not None:
-        return val
-    txt = get_text(cell)
-    return txt if txt else None
-
-
-def extract_sheet_formulas(table: Table, sheet_name: str) -> Dict[str, Dict]:
-    """Extract all formulas and their references from a sheet"""
-    formulas: Dict[str, Dict] = {}
-    row_idx = 0
-    
-    for row in table.getElementsByType(TableRow):
-        row_idx += 1
-        col_idx = 0
-        for cell in row.getElementsByType(TableCell):
-            try:
-                repeat_attr = cell.getAttribute("numbercolumnsrepeated")
-            except Exception:
-                repeat_attr = None
-            repeat = int(repeat_attr or "1")
-            
-            for _ in range(repeat):
-                col_idx += 1
-                addr = get_cell_ref(row_idx, col_idx)
-                
-                formula = get_formula(cell)
-                value = get_value(cell)
-                text = get_text(cell)
-                
-                if formula or value or text:
-                    entry = {
-                        "value": value,
-                        "text": text,
-                        "formula": formula,
-                    }
-                    formulas[addr] = entry
-    
-    return formulas
+def extract_sheet_formulas(rows, sheet_name: str) -> Dict[str, Dict]:
+    """Extract all formulas and their references from a sheet's row runs"""
+    return sheet_map(rows, cell_filter=has_content, value_rule=raw_value)
 
 
 def parse_odf_formula_references(formula_str: str) -> Set[str]:
@@ -95,36 +32,27 @@ def parse_odf_formula_references(formula_str: str) -> Set[str]:
 
 
 def main():
+    cache = cache_from_argv(sys.argv)
     if len(sys.argv) < 2:
-        print("Usage: python ods_formula_extractor.py <path_to.ods>")
+        print("Usage: python ods_formula_extractor.py <path_to.ods> [--no-cache] [--clear-cache]")
         sys.exit(1)
     
     ods_path = sys.argv[1]
-    doc = load(ods_path)
-    tables = doc.spreadsheet.getElementsByType(Table)
+    tables = read_workbook(ods_path, cache=cache)
     
     print(f"Found {len(tables)} sheets in ODS:\n")
     
     # Get first and last sheet names
-    first_table = tables[0]
-    last_table = tables[-1]
-    
-    try:
-        first_name = first_table.getAttribute("name") or "PrimoFoglio"
-    except Exception:
-        first_name = "PrimoFoglio"
-    
-    try:
-        last_name = last_table.getAttribute("name") or "UltimoFoglio"
-    except Exception:
-        last_name = "UltimoFoglio"
+    first_name = tables[0][0] or "PrimoFoglio"
+    last_name, last_rows = tables[-1]
+    last_name = last_name or "UltimoFoglio"
     
     print(f"First sheet: {first_name}")
     print(f"Last sheet: {last_name}\n")
     
     # Extract formulas from last sheet
     print(f"\n=== FORMULAS IN '{last_name}' ===\n")
-    last_formulas = extract_sheet_formulas(last_table, last_name)
+    last_formulas = extract_sheet_formulas(last_rows, last_name)
     
     formula_count = 0
     function_types: Dict[str, int] = {}
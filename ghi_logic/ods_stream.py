@@ -0,0 +1,171 @@
+"""
+Streaming ODS reader.
+Pulls content.xml straight out of the ODS zip and walks it with an incremental
+XML parser, emitting cells row by row instead of building the odfpy DOM.
+
+Repeated cells and rows are reported as runs (start, count) and empty runs are
+skipped without expansion, so cost scales with distinct XML cells.
+"""
+
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+TABLE_NS = "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+OFFICE_NS = "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+TEXT_NS = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+
+TABLE_TAG = f"{{{TABLE_NS}}}table"
+ROW_TAG = f"{{{TABLE_NS}}}table-row"
+CELL_TAG = f"{{{TABLE_NS}}}table-cell"
+COVERED_CELL_TAG = f"{{{TABLE_NS}}}covered-table-cell"
+P_TAG = f"{{{TEXT_NS}}}p"
+
+NAME_ATTR = f"{{{TABLE_NS}}}name"
+FORMULA_ATTR = f"{{{TABLE_NS}}}formula"
+COLS_REPEATED_ATTR = f"{{{TABLE_NS}}}number-columns-repeated"
+ROWS_REPEATED_ATTR = f"{{{TABLE_NS}}}number-rows-repeated"
+VALUE_ATTR = f"{{{OFFICE_NS}}}value"
+
+
+class StreamCell(NamedTuple):
+    """
+    Raw non-empty cell run as found in content.xml: `count` columns from
+    `col` with the same content (value is the office:value string).
+    """
+    col: int
+    count: int
+    value: Optional[str]
+    text: str
+    formula: Optional[str]
+
+
+def cell_text(cell: ET.Element) -> str:
+    """Text of all paragraphs in a cell, one line per paragraph"""
+    texts = ["".join(p.itertext()) for p in cell.iter(P_TAG)]
+    return "\n".join(texts).strip()
+
+
+RowRanges = Dict[str, Tuple[int, Optional[int]]]
+
+
+def _iter_events(ods_path: str,
+                 sheets: Optional[Iterable[str]] = None,
+                 row_ranges: Optional[RowRanges] = None) -> Iterator[tuple]:
+    """
+    Yield ("table", name) when a selected sheet starts and ("row", row_idx,
+    row_count, cells) for every non-empty row run inside its row range,
+    clipped to that range. Finished rows and tables are
+    detached from the tree so memory stays bounded by the size of a single
+    row. Parsing stops as soon as every requested sheet has been read.
+    """
+    wanted = set(sheets) if sheets is not None else None
+    remaining = set(wanted) if wanted is not None else None
+    row_ranges = row_ranges or {}
+
+    with zipfile.ZipFile(ods_path) as zf:
+        with zf.open("content.xml") as content:
+            stack: List[ET.Element] = []
+            sheet_name = ""
+            active = False
+            in_range = False
+            first_row, last_row = 1, None
+            row_idx = 0
+            row_count = 1
+            next_row = 1
+            cells: List[StreamCell] = []
+            col_idx = 0
+
+            for event, elem in ET.iterparse(content, events=("start", "end")):
+                if event == "start":
+                    stack.append(elem)
+                    if elem.tag == TABLE_TAG:
+                        sheet_name = elem.get(NAME_ATTR) or "Sheet"
+                        active = wanted is None or sheet_name in wanted
+                        first_row, last_row = row_ranges.get(sheet_name, (1, None))
+                        next_row = 1
+                        if active:
+                            yield ("table", sheet_name)
+                    elif elem.tag == ROW_TAG:
+                        row_idx = next_row
+                        row_count = int(elem.get(ROWS_REPEATED_ATTR) or "1")
+                        next_row += row_count
+                        col_idx = 0
+                        cells = []
+                        in_range = active and next_row - 1 >= first_row
+                        if active and last_row is not None and row_idx > last_row:
+                            # Past the last requested row: this sheet is done
+                            active = in_range = False
+                            if remaining is not None:
+                                remaining.discard(sheet_name)
+                                if not remaining:
+                                    return
+                    continue
+
+                stack.pop()
+                tag = elem.tag
+                if tag == CELL_TAG:
+                    if not in_range:
+                        continue
+                    repeat = int(elem.get(COLS_REPEATED_ATTR) or "1")
+                    value = elem.get(VALUE_ATTR)
+                    formula = elem.get(FORMULA_ATTR)
+                    text = cell_text(elem) if len(elem) else ""
+                    if value is not None or formula or text:
+                        cells.append(StreamCell(col_idx + 1, repeat, value, text, formula))
+                    col_idx += repeat
+                elif tag == COVERED_CELL_TAG:
+                    # Cells hidden by a merge still occupy their columns
+                    col_idx += int(elem.get(COLS_REPEATED_ATTR) or "1")
+                elif tag == ROW_TAG:
+                    if in_range and cells:
+                        start = max(row_idx, first_row)
+                        end = next_row - 1 if last_row is None else min(next_row - 1, last_row)
+                        yield ("row", start, end - start + 1, cells)
+                    elem.clear()
+                    if stack:
+                        stack[-1].remove(elem)
+                elif tag == TABLE_TAG:
+                    elem.clear()
+                    if stack:
+                        stack[-1].remove(elem)
+                    if remaining is not None:
+                        remaining.discard(sheet_name)
+                        if not remaining:
+                            return
+                    active = in_range = False
+
+
+def iter_sheets(ods_path: str,
+                sheets: Optional[Iterable[str]] = None,
+                row_ranges: Optional[RowRanges] = None
+                ) -> Iterator[Tuple[str, Iterator[Tuple[int, int, List[StreamCell]]]]]:
+    """
+    Iterate sheets in document order as (sheet_name, rows) pairs, where rows
+    yields (row_idx, row_count, cells) lazily for non-empty row runs. Like
+    itertools.groupby, each rows iterator must be consumed before advancing
+    to the next sheet.
+    
+    sheets limits parsing to the named sheets; row_ranges maps a sheet name
+    to an inclusive (first_row, last_row) range, last_row None meaning open.
+    """
+    events = _iter_events(ods_path, sheets, row_ranges)
+    pending = [next(events, None)]
+
+    def rows() -> Iterator[Tuple[int, int, List[StreamCell]]]:
+        while True:
+            ev = next(events, None)
+            if ev is None or ev[0] == "table":
+                pending[0] = ev
+                return
+            yield ev[1], ev[2], ev[3]
+
+    while pending[0] is not None:
+        ev = pending[0]
+        if ev[0] != "table":
+            pending[0] = next(events, None)
+            continue
+        sheet_rows = rows()
+        yield ev[1], sheet_rows
+        for _ in sheet_rows:
+            pass
@@ -0,0 +1,160 @@
+"""
+Opt-in profiling of workbook evaluation.
+
+WorkbookEvaluator.set_profiling() attaches an EvaluationProfile: every
+formula group evaluation (recalc or scenario batch) then records its
+wall time, member count and vector width. When profiling is off the
+evaluator takes its usual code path and pays nothing.
+
+    profile = ev.set_profiling()
+    ev.recalculate()
+    print(profile.report(top=10))
+    profile.write_json("profile.json")
+    profile.write_folded("profile.folded")   # flamegraph.pl / speedscope
+"""
+
+import json
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Tuple
+
+try:
+    from .formula_engine import Ref
+    from .sheet_store import cell_ref, parse_cell_ref
+except ImportError:
+    from formula_engine import Ref
+    from sheet_store import cell_ref, parse_cell_ref
+
+# (scope, topological level, R1C1 formula)
+GroupKey = Tuple[str, int, str]
+
+
+def cell_ranges(cells: Iterable[Ref]) -> List[str]:
+    """Compact "Sheet.B9:B48" ranges of contiguous rows, per sheet and column"""
+    columns: Dict[Tuple[str, int], List[int]] = defaultdict(list)
+    for sheet, addr in cells:
+        row, col = parse_cell_ref(addr)
+        columns[(sheet, col)].append(row)
+    out = []
+    for (sheet, col), rows in sorted(columns.items()):
+        rows.sort()
+        start = prev = rows[0]
+        for row in rows[1:] + [None]:
+            if row is not None and row == prev + 1:
+                prev = row
+                continue
+            first, last = cell_ref(start, col), cell_ref(prev, col)
+            out.append(f"{sheet}.{first}" if start == prev else f"{sheet}.{first}:{last}")
+            if row is not None:
+                start = prev = row
+    return out
+
+
+class GroupStats:
+    """Accumulated evaluations of one formula group"""
+
+    __slots__ = ("evaluations", "seconds", "cells", "width", "max_width", "vector_evaluations",
+                 "scalar_cells", "members")
+
+    def __init__(self, members: List[int]):
+        self.evaluations = 0
+        self.seconds = 0.0
+        self.cells = 0               # member cells evaluated, summed over evaluations
+        self.width = 0               # vector widths, summed over evaluations
+        self.max_width = 0           # largest vector (members x scenarios) evaluated at once
+        self.vector_evaluations = 0
+        self.scalar_cells = 0        # cells evaluated one by one (no vector fn, errors)
+        self.members = set(members)
+
+
+class EvaluationProfile:
+    """Per-group timings collected while profiling is enabled"""
+
+    def __init__(self, evaluator):
+        self.evaluator = evaluator
+        self.groups: Dict[GroupKey, GroupStats] = {}
+
+    def reset(self):
+        self.groups.clear()
+
+    def record(self, key: GroupKey, members: List[int], width: int, seconds: float,
+               vector: bool, scalar_cells: int):
+        stats = self.groups.get(key)
+        if stats is None:
+            stats = self.groups[key] = GroupStats(members)
+        else:
+            stats.members.update(members)
+        stats.evaluations += 1
+        stats.seconds += seconds
+        stats.cells += len(members)
+        stats.width += width
+        stats.max_width = max(stats.max_width, width)
+        stats.vector_evaluations += vector
+        stats.scalar_cells += scalar_cells
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(s.seconds for s in self.groups.values())
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """One dict per group, slowest first"""
+        total = self.total_seconds or 1.0
+        cells = self.evaluator.cells
+        ranked = sorted(self.groups.items(), key=lambda kv: kv[1].seconds, reverse=True)
+        return [{
+            "rank": rank,
+            "scope": scope,
+            "level": level,
+            "formula": r1c1,
+            "cells": cell_ranges(cells[i] for i in stats.members),
+            "members": len(stats.members),
+            "evaluations": stats.evaluations,
+            "seconds": stats.seconds,
+            "share": stats.seconds / total,
+            "cells_evaluated": stats.cells,
+            "mean_width": stats.width / stats.evaluations,
+            "max_width": stats.max_width,
+            "vector_evaluations": stats.vector_evaluations,
+            "scalar_cells": stats.scalar_cells,
+        } for rank, ((scope, level, r1c1), stats) in enumerate(ranked, 1)]
+
+    def report(self, top: int = 20) -> str:
+        """Ranked text table of the `top` slowest groups"""
+        entries = self.entries()
+        lines = [f"Formula groups: {len(entries)}, total {self.total_seconds * 1000:.2f} ms",
+                 f"{'#':>3} {'ms':>9} {'%':>5} {'evals':>6} {'width':>7} {'scalar':>6}  "
+                 f"{'scope':<6} {'lvl':>3}  cells / formula"]
+        for e in entries[:top]:
+            ranges = ", ".join(e["cells"][:3]) + (" ..." if len(e["cells"]) > 3 else "")
+            lines.append(
+                f"{e['rank']:>3} {e['seconds'] * 1000:>9.3f} {e['share'] * 100:>5.1f} "
+                f"{e['evaluations']:>6} {e['max_width']:>7} {e['scalar_cells']:>6}  "
+                f"{e['scope']:<6} {e['level']:>3}  {ranges}")
+            lines.append(f"{'':>45}{e['formula'][:100]}")
+        if len(entries) > top:
+            lines.append(f"... {len(entries) - top} more groups")
+        return "\n".join(lines)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"total_seconds": self.total_seconds, "groups": self.entries()}
+
+    def write_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, indent=2)
+
+    def folded_stacks(self) -> str:
+        """
+        Folded stacks ("scope;level;cells;formula microseconds" per line) for
+        flamegraph.pl, speedscope or inferno.
+        """
+        lines = []
+        for e in self.entries():
+            frames = [e["scope"], f"level {e['level']}", e["cells"][0] if e["cells"] else "?",
+                      e["formula"]]
+            # ';' separates frames (ODF argument separators become ',')
+            stack = ";".join(f.replace(";", ",") for f in frames)
+            lines.append(f"{stack} {max(1, round(e['seconds'] * 1e6))}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def write_folded(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.folded_stacks())
@@ -1,26 +1,32 @@
 #!/usr/bin/env python
 """
 Quick start script for GeneHull ODS replica.
-Usage: python quickstart.py <path_to_ods> [output_file]
+Usage: python quickstart.py <path_to_ods> [output_file] [--stream] [--no-cache] [--clear-cache]
 """
 
 import sys
 import json
 from ghi_logic import GeneHullCalculator
+from ghi_logic.workbook_cache import cache_from_argv
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python quickstart.py <path_to_ods> [output_json]")
+    argv = sys.argv[1:]
+    cache = cache_from_argv(argv)
+    streaming = "--stream" in argv
+    args = [a for a in argv if a != "--stream"]
+    
+    if len(args) < 1:
+        print("Usage: python quickstart.py <path_to_ods> [output_json] [--stream] [--no-cache] [--clear-cache]")
         print("\nExample:")
         print('  python quickstart.py "Gene-Hull Sailboat 3.4_2025 02.ods" results.json')
         sys.exit(1)
     
-    ods_path = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else "offsets.json"
+    ods_path = args[0]
+    output_file = args[1] if len(args) > 1 else "offsets.json"
     
     print(f"Loading ODS: {ods_path}")
-    calc = GeneHullCalculator(ods_path)
+    calc = GeneHullCalculator(ods_path, streaming=streaming, cache=cache)
     
     print(f"Sheets found: {list(calc.reader.sheets.keys())}")
     print("Computing offsets...")
@@ -37,6 +43,7 @@ def main():
     print(f"  Direct values: {direct_count}")
     print(f"  Computed: {computed_count}")
     print(f"  Unresolved: {unresolved_count}")
+    print(f"  Folded constants: {len(calc.evaluator.folded)}")
     
     # Save to JSON
     with open(output_file, 'w', encoding='utf-8') as f:
@@ -0,0 +1,281 @@
+"""
+Compact sheet storage for the Gene-Hull ODS reader.
+Cells are kept as run-length rows so repeated cells and rows cost one entry
+per distinct XML cell, while still behaving like the old "A1" -> entry dict.
+ColumnarSheet is the NumPy-backed alternative for numeric row/column access.
+"""
+
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from collections.abc import ItemsView, Mapping, ValuesView
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+# NumPy is only needed by ColumnarSheet
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+
+ADDR_PATTERN = re.compile(r"^\$?([A-Z]+)\$?(\d+)$")
+
+
+@lru_cache(maxsize=None)
+def col_letters(col: int) -> str:
+    """Convert 1-based column index to letters (1 -> A, 27 -> AA), memoized"""
+    letters = ""
+    while col > 0:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def cell_ref(row: int, col: int) -> str:
+    """Convert row, col to cell address"""
+    return f"{col_letters(col)}{row}"
+
+
+def col_index(col: Union[int, str]) -> int:
+    """Column letters (or an index, returned as is) to 1-based column index"""
+    if isinstance(col, int):
+        return col
+    idx = 0
+    for ch in col.lstrip("$"):
+        idx = idx * 26 + ord(ch) - 64
+    return idx
+
+
+def parse_cell_ref(addr: str) -> Optional[Tuple[int, int]]:
+    """Convert "B12" (or "$B$12") to (row, col); None if not a cell address"""
+    m = ADDR_PATTERN.match(addr)
+    if not m:
+        return None
+    col = 0
+    for ch in m.group(1):
+        col = col * 26 + ord(ch) - 64
+    return int(m.group(2)), col
+
+
+class CellRun(NamedTuple):
+    """`count` consecutive columns starting at `start` sharing one payload"""
+    start: int
+    count: int
+    payload: Dict
+
+
+class RowRun(NamedTuple):
+    """`count` consecutive rows starting at `start` sharing the same cell runs"""
+    start: int
+    count: int
+    cells: List[CellRun]
+
+
+class RunLengthSheet(Mapping):
+    """
+    Read-only mapping "A1" -> {"value", "text", "formula"} backed by runs.
+
+    Rows must be added in increasing order. Empty cells are never stored, so
+    lookups and `len` only depend on the number of distinct runs. Cells of a
+    run share the same payload dict.
+    """
+
+    def __init__(self):
+        self._row_starts: List[int] = []
+        self._rows: List[RowRun] = []
+        self._col_starts: List[List[int]] = []
+        self._size = 0
+
+    def add_row(self, row: int, count: int, cells: List[CellRun]):
+        """Append a run of `count` identical rows starting at `row`"""
+        if not cells:
+            return
+        self._row_starts.append(row)
+        self._rows.append(RowRun(row, count, cells))
+        self._col_starts.append([c.start for c in cells])
+        self._size += count * sum(c.count for c in cells)
+
+    def row_runs(self) -> List[RowRun]:
+        return self._rows
+
+    def cell(self, row: int, col: int) -> Optional[Dict]:
+        """Payload at (row, col) or None if empty"""
+        i = bisect_right(self._row_starts, row) - 1
+        if i < 0:
+            return None
+        row_run = self._rows[i]
+        if row >= row_run.start + row_run.count:
+            return None
+        j = bisect_right(self._col_starts[i], col) - 1
+        if j < 0:
+            return None
+        cell_run = row_run.cells[j]
+        if col >= cell_run.start + cell_run.count:
+            return None
+        return cell_run.payload
+
+    def __getitem__(self, addr: str) -> Dict:
+        pos = parse_cell_ref(addr) if isinstance(addr, str) else None
+        payload = self.cell(*pos) if pos else None
+        if payload is None:
+            raise KeyError(addr)
+        return payload
+
+    def __contains__(self, addr) -> bool:
+        pos = parse_cell_ref(addr) if isinstance(addr, str) else None
+        return pos is not None and self.cell(*pos) is not None
+
+    def iter_items(self) -> Iterator[Tuple[str, Dict]]:
+        """Walk (address, payload) pairs in row-major order without lookups"""
+        for row_run in self._rows:
+            for row in range(row_run.start, row_run.start + row_run.count):
+                for cell_run in row_run.cells:
+                    for col in range(cell_run.start, cell_run.start + cell_run.count):
+                        yield f"{col_letters(col)}{row}", cell_run.payload
+
+    def __iter__(self) -> Iterator[str]:
+        for addr, _ in self.iter_items():
+            yield addr
+
+    def __len__(self) -> int:
+        return self._size
+
+    def items(self) -> ItemsView:
+        return _RunItemsView(self)
+
+    def values(self) -> ValuesView:
+        return _RunValuesView(self)
+
+    def __repr__(self) -> str:
+        return f"<RunLengthSheet {self._size} cells in {len(self._rows)} row runs>"
+
+
+class _RunItemsView(ItemsView):
+    def __iter__(self):
+        return self._mapping.iter_items()
+
+
+class _RunValuesView(ValuesView):
+    def __iter__(self):
+        for _, payload in self._mapping.iter_items():
+            yield payload
+
+
+class ColumnarSheet(Mapping):
+    """
+    NumPy-backed sheet: a float64 `values` matrix with a `mask` of cells that
+    hold a numeric value, plus side tables for text, non-numeric values and
+    formulas keyed by (row, col). Indices are 1-based like the sheet, so cell
+    (row, col) lives at values[row - 1, col - 1].
+
+    Row and column accessors return views into `values` (no copies). The
+    Mapping interface builds {"value", "text", "formula"} entries on demand,
+    so get_cell and friends keep working unchanged.
+    """
+
+    def __init__(self, n_rows: int, n_cols: int):
+        if np is None:
+            raise ImportError("numpy is required for ColumnarSheet")
+        self.values = np.full((n_rows, n_cols), np.nan, dtype=np.float64)
+        self.mask = np.zeros((n_rows, n_cols), dtype=bool)
+        self.present = np.zeros((n_rows, n_cols), dtype=bool)
+        self.texts: Dict[Tuple[int, int], str] = {}
+        self.str_values: Dict[Tuple[int, int], str] = {}
+        self.formulas: Dict[Tuple[int, int], str] = {}
+
+    @classmethod
+    def from_runs(cls, sheet: RunLengthSheet) -> "ColumnarSheet":
+        """Convert a RunLengthSheet; each run is filled with one slice assignment"""
+        n_rows = n_cols = 0
+        for row_run in sheet.row_runs():
+            n_rows = max(n_rows, row_run.start + row_run.count - 1)
+            last = row_run.cells[-1]
+            n_cols = max(n_cols, last.start + last.count - 1)
+
+        out = cls(n_rows, n_cols)
+        for row_run in sheet.row_runs():
+            r0, r1 = row_run.start - 1, row_run.start - 1 + row_run.count
+            for cell_run in row_run.cells:
+                c0, c1 = cell_run.start - 1, cell_run.start - 1 + cell_run.count
+                out.present[r0:r1, c0:c1] = True
+                payload = cell_run.payload
+                value = payload.get("value")
+                if isinstance(value, float):
+                    out.values[r0:r1, c0:c1] = value
+                    out.mask[r0:r1, c0:c1] = True
+                side = [(table, item) for table, item in (
+                    (out.texts, payload.get("text")),
+                    (out.formulas, payload.get("formula")),
+                    (out.str_values, None if isinstance(value, float) else value),
+                ) if item]
+                if not side:
+                    continue
+                for r in range(r0 + 1, r1 + 1):
+                    for c in range(c0 + 1, c1 + 1):
+                        for table, item in side:
+                            table[(r, c)] = item
+        return out
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.values.shape
+
+    def value_at(self, row: int, col: Union[int, str]) -> Optional[Any]:
+        """Value at (row, col): float, string value or None"""
+        r, c = row - 1, col_index(col) - 1
+        if not (0 <= r < self.values.shape[0] and 0 <= c < self.values.shape[1]):
+            return None
+        if self.mask[r, c]:
+            return float(self.values[r, c])
+        return self.str_values.get((row, c + 1))
+
+    def row(self, row: int) -> "np.ndarray":
+        """View of one row (index 0 is column A)"""
+        return self.values[row - 1]
+
+    def column(self, col: Union[int, str], first_row: int = 1,
+               last_row: Optional[int] = None) -> "np.ndarray":
+        """View of a column between first_row and last_row (inclusive)"""
+        c = col_index(col) - 1
+        return self.values[first_row - 1:last_row, c]
+
+    def block(self, first_row: int, last_row: int,
+              first_col: Union[int, str], last_col: Union[int, str]) -> "np.ndarray":
+        """View of an inclusive rectangular block, e.g. block(13, 35, "C", "D")"""
+        return self.values[first_row - 1:last_row, col_index(first_col) - 1:col_index(last_col)]
+
+    def cell(self, row: int, col: int) -> Optional[Dict]:
+        r, c = row - 1, col - 1
+        if not (0 <= r < self.values.shape[0] and 0 <= c < self.values.shape[1]):
+            return None
+        if not self.present[r, c]:
+            return None
+        return {
+            "value": self.value_at(row, col),
+            "text": self.texts.get((row, col), ""),
+            "formula": self.formulas.get((row, col)),
+        }
+
+    def __getitem__(self, addr: str) -> Dict:
+        pos = parse_cell_ref(addr) if isinstance(addr, str) else None
+        payload = self.cell(*pos) if pos else None
+        if payload is None:
+            raise KeyError(addr)
+        return payload
+
+    def __contains__(self, addr) -> bool:
+        pos = parse_cell_ref(addr) if isinstance(addr, str) else None
+        if pos is None:
+            return False
+        r, c = pos[0] - 1, pos[1] - 1
+        return (0 <= r < self.values.shape[0] and 0 <= c < self.values.shape[1]
+                and bool(self.present[r, c]))
+
+    def __iter__(self) -> Iterator[str]:
+        for r, c in zip(*np.nonzero(self.present)):
+            yield f"{col_letters(int(c) + 1)}{int(r) + 1}"
+
+    def __len__(self) -> int:
+        return int(self.present.sum())
+
+    def __repr__(self) -> str:
+        return f"<ColumnarSheet {len(self)} cells, shape {self.values.shape}>"
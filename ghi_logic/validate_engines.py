@@ -0,0 +1,337 @@
+"""
+Differential check of the ghi_logic evaluation paths on a synthetic workbook.
+
+The reference is a fresh scalar WorkbookEvaluator per scenario (inputs
+written into the sheets, no folding); it is itself checked against plain
+Python arithmetic. Every path in CHECKS must give the reference value for
+every formula cell. Errors are None (NaN in array results) on every path
+and never match a number, infinities included.
+
+    python ghi_logic/validate_engines.py
+"""
+
+import math
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+try:
+    from .codegen import generate_module
+    from .compiled_workbook import COMPILED_SUFFIX, load_compiled, save_compiled
+    from .workbook_evaluator import WorkbookEvaluator
+except ImportError:
+    from codegen import generate_module
+    from compiled_workbook import COMPILED_SUFFIX, load_compiled, save_compiled
+    from workbook_evaluator import WorkbookEvaluator
+
+INPUT_SHEET = "Gene-Hull"
+OUTPUT_SHEET = "Offsets x,y,z"
+ROWS = 30
+
+# Gene-Hull inputs varied per scenario: (B1 divisor, B2 base, B3 scale)
+PARAMETERS = ("B1", "B2", "B3")
+SCENARIOS = [
+    (2.0, 8.0, 1.5),
+    (0.0, 8.0, 1.5),     # division by zero
+    (4.0, -8.0, 0.5),    # negative base, fractional exponent
+    (-3.0, 27.0, 0.0),
+    (1e-300, 2.0, 7.0),  # overflow to inf
+]
+
+Results = List[Dict[str, Any]]  # one {address: value} per scenario
+
+
+def d_value(r: int) -> Any:
+    """Gene-Hull D{r}: numbers, one text cell (D4) and one empty cell (D6)"""
+    if r == 4:
+        return "text"
+    return None if r == 6 else float((r * 7) % 23 - 5)
+
+
+def synthetic_sheets(scenario=SCENARIOS[0]) -> Dict[str, Dict[str, dict]]:
+    """
+    Gene-Hull inputs, constants of a non-input "Data" sheet and an
+    "Offsets x,y,z" sheet of formulas over them; the rows of a column
+    share one R1C1 formula, so they form one group
+    """
+    inputs = {addr: {"value": value} for addr, value in zip(PARAMETERS, scenario)}
+    for r in range(1, ROWS + 11):
+        inputs[f"E{r}"] = {"value": float(r)}
+        value = d_value(r)
+        if value is not None:
+            inputs[f"D{r}"] = {"value": value, "text": str(value)}
+
+    data = {f"A{r}": {"value": r / 4.0} for r in range(1, ROWS + 1)}
+
+    gh = "['Gene-Hull'."
+    out = {}
+    for r in range(1, ROWS + 1):
+        cells = {
+            "A": f"{gh}D{r}]*{gh}$B$3]+{gh}E{r}]",
+            "B": f"[.A{r}]/{gh}$B$1]",
+            "C": f"1/[.B{r}]",
+            "D": f"{gh}$B$2]^(1/3)+[.A{r}]",
+            "E": f"IF([.A{r}]>5;ROUND([.B{r}];2);MOD([.A{r}];4))",
+            "L": f"SQRT([.A{r}])+POWER({gh}$B$2];{gh}$B$3])",
+            "M": f"[.B{r}]*1e10",
+            "N": f"1/MOD([.A{r}];4)",
+            "O": f"['Data'.A{r}]*2+PI()",  # input-independent: folded
+            "P": f"[.O{r}]*[.B{r}]",
+            # Ranges over D, which holds a text and an empty cell
+            "F": f"SUM({gh}D{r}:.D{r + 5}])*{gh}$B$3]",
+            "G": f"MAX({gh}D{r}:.D{r + 9}];[.A{r}]/10)-MIN({gh}D{r}:.D{r + 3}])",
+            "H": f"AVERAGE({gh}D{r}:.D{r + 2}])+COUNT({gh}D{r}:.D{r + 4}])",
+            "I": f"INDEX({gh}$D$1:.$D${ROWS}];MOD({gh}E{r}]*3;{ROWS})+1)",
+            "J": f"MATCH({gh}D{r}];{gh}$D$1:.$D${ROWS}];0)",
+            "K": f"SUMPRODUCT({gh}D{r}:.D{r + 2}];{gh}D{r + 1}:.D{r + 3}])+SUM([.B{r}:.C{r}])",
+        }
+        for col, formula in cells.items():
+            out[f"{col}{r}"] = {"formula": f"of:={formula}"}
+    return {INPUT_SHEET: inputs, "Data": data, OUTPUT_SHEET: out}
+
+
+def _py(fn: Callable[[], Any]) -> Any:
+    """fn() with spreadsheet error semantics: exceptions and non-finite results are None"""
+    try:
+        value = float(fn())
+    except (ArithmeticError, TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _round(x: float, digits: int) -> float:
+    scale = 10.0 ** digits
+    return math.copysign(math.floor(abs(x) * scale + 0.5) / scale, x)
+
+
+def numbers(first: int, last: int) -> List[float]:
+    """Numbers of D{first}:D{last}; range functions skip text and empty cells"""
+    return [v for v in map(d_value, range(first, last + 1)) if isinstance(v, float)]
+
+
+def python_values(scenario) -> Dict[str, Any]:
+    """Plain Python value of every formula cell of the synthetic workbook"""
+    b1, b2, b3 = scenario
+    column = [d_value(k) for k in range(1, ROWS + 1)]
+    out = {}
+    for r in range(1, ROWS + 1):
+        d = d_value(r)
+        d = 0.0 if d is None else d
+        a = out[f"A{r}"] = _py(lambda: d * b3 + r)
+        b = out[f"B{r}"] = _py(lambda: a / b1)
+        out[f"C{r}"] = _py(lambda: 1 / b)
+        out[f"D{r}"] = _py(lambda: math.pow(b2, 1 / 3) + a)
+        out[f"E{r}"] = _py(lambda: _round(b, 2) if a > 5 else a - 4 * math.floor(a / 4))
+        out[f"L{r}"] = _py(lambda: math.sqrt(a) + math.pow(b2, b3))
+        out[f"M{r}"] = _py(lambda: b * 1e10)
+        out[f"N{r}"] = _py(lambda: 1 / (a - 4 * math.floor(a / 4)))
+        o = out[f"O{r}"] = _py(lambda: r / 4.0 * 2 + math.pi)
+        out[f"P{r}"] = _py(lambda: o * b)
+        out[f"F{r}"] = _py(lambda: sum(numbers(r, r + 5)) * b3)
+        out[f"G{r}"] = _py(lambda: max(numbers(r, r + 9) + [a / 10]) - min(numbers(r, r + 3), default=0.0))
+        out[f"H{r}"] = _py(lambda: sum(numbers(r, r + 2)) / len(numbers(r, r + 2)) + len(numbers(r, r + 4)))
+        # INDEX reads empty and text cells as 0; MATCH of text finds nothing
+        index = column[(r * 3) % ROWS]
+        out[f"I{r}"] = index if isinstance(index, float) else 0.0
+        out[f"J{r}"] = _py(lambda: next((k + 1 for k, v in enumerate(column)
+                                         if isinstance(v, float) and v == d), None))
+        pairs = [(d_value(k), d_value(k + 1)) for k in range(r, r + 3)]
+        c = out[f"C{r}"]
+        out[f"K{r}"] = _py(lambda: sum(x * y for x, y in pairs if isinstance(x, float) and isinstance(y, float))
+                           + b + c)
+    return out
+
+
+def reference() -> Results:
+    results = []
+    for scenario in SCENARIOS:
+        ev = WorkbookEvaluator(synthetic_sheets(scenario), vectorize=False,
+                               input_sheets=(INPUT_SHEET,), fold_constants=False)
+        ev.recalculate()
+        results.append(ev.sheet_values(OUTPUT_SHEET))
+    return results
+
+
+def scenario_values(ev: WorkbookEvaluator) -> Results:
+    """Output values of `ev` after set_input() of each scenario and recalc()"""
+    results = []
+    for scenario in SCENARIOS:
+        for addr, value in zip(PARAMETERS, scenario):
+            ev.set_input(INPUT_SHEET, addr, value)
+        ev.recalc()
+        results.append(ev.sheet_values(OUTPUT_SHEET))
+    return results
+
+
+def incremental(sheets) -> Results:
+    ev = WorkbookEvaluator(sheets, vectorize=False, input_sheets=(INPUT_SHEET,), fold_constants=False)
+    ev.recalculate()
+    return scenario_values(ev)
+
+
+def vectorized(sheets) -> Results:
+    ev = WorkbookEvaluator(sheets, vectorize=True, input_sheets=(INPUT_SHEET,), fold_constants=False)
+    ev.recalculate()
+    return scenario_values(ev)
+
+
+def batch(sheets) -> Results:
+    ev = WorkbookEvaluator(sheets, vectorize=True, input_sheets=(INPUT_SHEET,))
+    result = ev.evaluate_batch({(INPUT_SHEET, addr): [s[k] for s in SCENARIOS]
+                                for k, addr in enumerate(PARAMETERS)})
+    # valid values as they are (an inf would show), errors None, other results from extra
+    return [{addr: float(result.values[i, n]) if result.valid[i, n] else result.extra.get((i, n))
+             for (sheet, addr), i in ev.index.items() if sheet == OUTPUT_SHEET}
+            for n in range(len(SCENARIOS))]
+
+
+def targeted(sheets) -> Results:
+    """recalc(targets) of columns C and N only: the other cells stay dirty"""
+    ev = WorkbookEvaluator(sheets, vectorize=True, input_sheets=(INPUT_SHEET,), fold_constants=False)
+    addrs = [addr for addr in sheets[OUTPUT_SHEET] if addr[0] in "CN"]
+    targets = [ev.cell_index(OUTPUT_SHEET, addr) for addr in addrs]
+    results = []
+    for scenario in SCENARIOS:
+        for addr, value in zip(PARAMETERS, scenario):
+            ev.set_input(INPUT_SHEET, addr, value)
+        ev.recalc(targets)
+        results.append({addr: ev.value(OUTPUT_SHEET, addr) for addr in addrs})
+    return results
+
+
+def folded(sheets) -> Results:
+    ev = WorkbookEvaluator(sheets, vectorize=False, input_sheets=(INPUT_SHEET,), fold_constants=True)
+    if not ev.folded:
+        raise AssertionError("nothing folded: the synthetic workbook lost its constant cells")
+    ev.recalculate()
+    return scenario_values(ev)
+
+
+def compiled(sheets) -> Results:
+    """Reload of an artifact saved after set_input(): it must hold the sheets as loaded"""
+    ev = WorkbookEvaluator(sheets, vectorize=True, input_sheets=(INPUT_SHEET,))
+    ev.recalculate()
+    for addr, value in zip(PARAMETERS, SCENARIOS[1]):
+        ev.set_input(INPUT_SHEET, addr, value)
+    ev.recalc()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic" + COMPILED_SUFFIX)
+        save_compiled(ev, path)
+        loaded = load_compiled(path)
+    loaded.recalc()
+    # First scenario: the loaded inputs as saved, without set_input()
+    return [loaded.sheet_values(OUTPUT_SHEET)] + scenario_values(loaded)[1:]
+
+
+def generated_module(sheets) -> dict:
+    """Namespace of the module generated after a set_input() override (not a default)"""
+    ev = WorkbookEvaluator(sheets, vectorize=True, input_sheets=(INPUT_SHEET,))
+    ev.set_input(INPUT_SHEET, PARAMETERS[0], SCENARIOS[1][0])
+    ev.recalc()
+    namespace: dict = {}
+    code = generate_module(ev, sheet=OUTPUT_SHEET, input_sheet=INPUT_SHEET, source="the synthetic workbook")
+    exec(compile(code, "<generated>", "exec"), namespace)
+    return namespace
+
+
+def _array_value(value) -> Any:
+    """NaN is the generated module's error; anything else is kept (inf too)"""
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+def generated(sheets) -> Results:
+    compute = generated_module(sheets)["compute"]
+    # First scenario: the module's INPUTS defaults
+    runs = [compute()] + [compute(dict(zip(PARAMETERS, s))) for s in SCENARIOS[1:]]
+    return [{addr: _array_value(value) for addr, value in out.items()} for out in runs]
+
+
+def generated_batch(sheets) -> Results:
+    compute = generated_module(sheets)["compute"]
+    out = compute({addr: np.array([s[k] for s in SCENARIOS]) for k, addr in enumerate(PARAMETERS)})
+    # Input-independent outputs come back as scalars
+    columns = {addr: np.broadcast_to(value, len(SCENARIOS)) for addr, value in out.items()}
+    return [{addr: _array_value(column[n]) for addr, column in columns.items()}
+            for n in range(len(SCENARIOS))]
+
+
+def threaded(sheets) -> Results:
+    """Every level on a two-thread pool (min_cost=1: no level is too small)"""
+    ev = WorkbookEvaluator(sheets, vectorize=True, input_sheets=(INPUT_SHEET,), fold_constants=False)
+    with ThreadPoolExecutor(2) as executor:
+        ev.set_executor(executor, min_cost=1)
+        ev.recalculate()
+        return scenario_values(ev)
+
+
+def profiled(sheets) -> Results:
+    """Recalculation with profiling on: timing groups one by one must not change values"""
+    ev = WorkbookEvaluator(sheets, vectorize=True, input_sheets=(INPUT_SHEET,), fold_constants=False)
+    profile = ev.set_profiling(True)
+    ev.recalculate()
+    results = scenario_values(ev)
+    if profile is None or not profile.groups:
+        raise AssertionError("profiling recorded no group")
+    return results
+
+
+# Evaluation paths compared with the reference: (name, function of the
+# sheets returning one {address: value} dict per scenario)
+CHECKS: List[Tuple[str, Callable[[Dict[str, Dict[str, dict]]], Results]]] = [
+    ("incremental", incremental),
+    ("vectorized", vectorized),
+    ("evaluate_batch", batch),
+    ("recalc(targets)", targeted),
+    ("folded", folded),
+    ("compiled", compiled),
+    ("codegen", generated),
+    ("codegen batch", generated_batch),
+    ("threads", threaded),
+    ("profiled", profiled),
+]
+
+
+def same(expected: Any, value: Any) -> bool:
+    if expected is None or value is None:
+        return expected is value
+    if not (math.isfinite(expected) and math.isfinite(value)):
+        return expected == value
+    return abs(expected - value) <= 1e-9 * max(1.0, abs(expected), abs(value))
+
+
+def run() -> int:
+    sheets = synthetic_sheets()
+    expected = reference()
+    paths = [("Python", [python_values(s) for s in SCENARIOS])]
+    paths += [(name, check(sheets)) for name, check in CHECKS]
+
+    addrs = sorted(sheets[OUTPUT_SHEET])
+    mismatches = []
+    for name, results in paths:
+        for n, scenario in enumerate(SCENARIOS):
+            for addr in addrs:
+                if addr not in results[n]:
+                    continue  # not covered by this path
+                value = results[n][addr]
+                if not same(expected[n][addr], value):
+                    mismatches.append((scenario, addr, name, expected[n][addr], value))
+
+    checked = len(SCENARIOS) * len(addrs)
+    print(f"Scenarios: {len(SCENARIOS)}, formula cells: {len(addrs)}, "
+          f"paths: {', '.join(name for name, _ in paths)}")
+    for scenario, addr, name, value, got in mismatches[:40]:
+        print(f"  MISMATCH {scenario} {addr} {name}: expected {value}, got {got}")
+    if mismatches:
+        print(f"{len(mismatches)} mismatches")
+        return 1
+    print(f"All paths agree on {checked} cell evaluations each")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,266 @@
+"""
+NumPy evaluation of formula groups.
+
+Cells whose formulas are identical in relative (R1C1) form share one AST
+shape, so a whole group can be evaluated as a handful of array operations:
+compile_vector turns that shape into a closure over operand arrays, one row
+per reference occurrence (see ref_occurrences), followed by one
+(n_cells, rows, cols) array per range occurrence (see range_occurrences).
+Only numeric/boolean formulas vectorize; text constants and & raise
+FormulaError and the caller keeps the scalar closures for that group.
+"""
+
+from functools import reduce
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+try:
+    from .formula_engine import FormulaError, RangeRef, Ref
+except ImportError:
+    from formula_engine import FormulaError, RangeRef, Ref
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+
+VectorClosure = Callable[[Sequence["np.ndarray"]], "np.ndarray"]
+
+
+def ref_occurrences(node: tuple, out: Optional[List[Ref]] = None) -> List[Ref]:
+    """Every reference of an AST in evaluation order, duplicates included"""
+    if out is None:
+        out = []
+    kind = node[0]
+    if kind == "ref":
+        out.append((node[1], node[2]))
+    elif kind in ("neg", "pct"):
+        ref_occurrences(node[1], out)
+    elif kind == "bin":
+        ref_occurrences(node[2], out)
+        ref_occurrences(node[3], out)
+    elif kind == "call":
+        for arg in node[2]:
+            ref_occurrences(arg, out)
+    return out
+
+
+def range_occurrences(node: tuple, out: Optional[List[RangeRef]] = None) -> List[RangeRef]:
+    """Every range of an AST in evaluation order, duplicates included"""
+    if out is None:
+        out = []
+    kind = node[0]
+    if kind == "range":
+        out.append((node[1], node[2], node[3]))
+    elif kind in ("neg", "pct"):
+        range_occurrences(node[1], out)
+    elif kind == "bin":
+        range_occurrences(node[2], out)
+        range_occurrences(node[3], out)
+    elif kind == "call":
+        for arg in node[2]:
+            range_occurrences(arg, out)
+    return out
+
+
+class RangeArray:
+    """Range operand of a group: data[m, r, c[, n]], NaN for empty and text cells"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: "np.ndarray"):
+        self.data = data
+
+
+def _vcount(*args) -> Any:
+    return sum(np.count_nonzero(~np.isnan(a.data), axis=(1, 2)) if isinstance(a, RangeArray) else 1.0
+               for a in args)
+
+
+def _vsum(*args) -> Any:
+    return reduce(np.add, [np.nansum(a.data, axis=(1, 2)) if isinstance(a, RangeArray) else a
+                           for a in args])
+
+
+def _vextreme(ufunc) -> Callable:
+    # fmin/fmax skip NaN; like the spreadsheet, no numbers at all gives 0
+    def extreme(*args):
+        parts = [ufunc.reduce(a.data, axis=(1, 2)) if isinstance(a, RangeArray) else a for a in args]
+        return np.where(_vcount(*args) > 0, reduce(ufunc, parts), 0.0)
+    return extreme
+
+
+def _vsumproduct(*areas: RangeArray) -> "np.ndarray":
+    if any(a.data.shape != areas[0].data.shape for a in areas):
+        raise ValueError("SUMPRODUCT ranges differ in size")
+    return np.nansum(reduce(np.multiply, [a.data for a in areas]), axis=(1, 2))
+
+
+def _vindex(area: RangeArray, row, col=None) -> "np.ndarray":
+    data = area.data
+    m, rows, cols = data.shape[:3]
+    if col is None:
+        if rows == 1:
+            row, col = 1.0, row
+        elif cols == 1:
+            col = 1.0
+        else:
+            raise ValueError("INDEX of a 2-D range needs a column")
+    # (m[, n], rows * cols): one flat lookup per member (and scenario)
+    grid = np.moveaxis(data.reshape((m, rows * cols) + data.shape[3:]), 1, -1)
+    r = np.trunc(np.asarray(row, dtype=float)) - 1
+    c = np.trunc(np.asarray(col, dtype=float)) - 1
+    inside = (r >= 0) & (r < rows) & (c >= 0) & (c < cols)
+    flat = np.broadcast_to(np.where(inside, r * cols + c, 0).astype(np.intp), grid.shape[:-1])
+    value = np.take_along_axis(grid, flat[..., None], axis=-1)[..., 0]
+    # Out of range is NaN, which sends those cells to the scalar path
+    return np.where(inside, np.nan_to_num(value, nan=0.0), np.nan)
+
+
+def _vmatch(match_type: float) -> Callable:
+    def match(value, area: RangeArray):
+        data = area.data
+        if min(data.shape[1:3]) != 1:
+            raise ValueError("MATCH needs a single row or column")
+        values = data.reshape((data.shape[0], -1) + data.shape[3:])
+        value = np.asarray(value, dtype=float)
+        if value.ndim:
+            value = np.expand_dims(value, 1)
+        if match_type == 0:
+            hits = values == value
+            return np.where(hits.any(axis=1), hits.argmax(axis=1) + 1.0, np.nan)
+        count = np.count_nonzero(values <= value if match_type > 0 else values >= value, axis=1)
+        return np.where(count > 0, count.astype(float), np.nan)
+    return match
+
+
+def _literal(node: tuple) -> Optional[float]:
+    if node[0] == "num":
+        return node[1]
+    if node[0] == "neg" and node[1][0] == "num":
+        return -node[1][1]
+    return None
+
+
+def _vround(x, digits=0.0):
+    scale = 10.0 ** np.trunc(digits)
+    return np.copysign(np.floor(np.abs(x) * scale + 0.5) / scale, x)
+
+
+def _vectors() -> Dict[str, Callable]:
+    return {
+        "ABS": np.abs,
+        "SQRT": np.sqrt,
+        "POWER": np.power,
+        "EXP": np.exp,
+        "LN": np.log,
+        "LOG": lambda x, base=10.0: np.log(x) / np.log(base),
+        "LOG10": np.log10,
+        "SIN": np.sin,
+        "COS": np.cos,
+        "TAN": np.tan,
+        "ASIN": np.arcsin,
+        "ACOS": np.arccos,
+        "ATAN": np.arctan,
+        "ATAN2": lambda x, y: np.arctan2(y, x),  # ODF order is ATAN2(x; y)
+        "RADIANS": np.radians,
+        "DEGREES": np.degrees,
+        "PI": lambda: np.pi,
+        "SUM": _vsum,
+        "MIN": _vextreme(np.fmin),
+        "MAX": _vextreme(np.fmax),
+        "AVERAGE": lambda *a: _vsum(*a) / _vcount(*a),
+        "COUNT": _vcount,
+        "SUMPRODUCT": _vsumproduct,
+        "INDEX": _vindex,
+        "ROUND": _vround,
+        "INT": np.floor,
+        "MOD": lambda x, y: x - y * np.floor(x / y),
+        "SIGN": np.sign,
+        "AND": lambda *a: reduce(np.logical_and, a),
+        "OR": lambda *a: reduce(np.logical_or, a),
+        "NOT": np.logical_not,
+        "TRUE": lambda: True,
+        "FALSE": lambda: False,
+    }
+
+
+VECTOR_FUNCTIONS: Dict[str, Callable] = _vectors() if np is not None else {}
+
+VECTOR_BINARY_OPS: Dict[str, Callable] = {
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b,
+    "/": lambda a, b: a / b,
+    "^": lambda a, b: np.power(a, b),
+    "=": lambda a, b: np.equal(a, b),
+    "<>": lambda a, b: np.not_equal(a, b),
+    "<": lambda a, b: np.less(a, b),
+    ">": lambda a, b: np.greater(a, b),
+    "<=": lambda a, b: np.less_equal(a, b),
+    ">=": lambda a, b: np.greater_equal(a, b),
+}
+
+
+def _compile(node: tuple, counter: List[int]) -> VectorClosure:
+    kind = node[0]
+    if kind in ("num", "bool"):
+        const = node[1]
+        return lambda ops: const
+    if kind == "str":
+        raise FormulaError("Text constants are not vectorized")
+    if kind == "ref":
+        i = counter[0]
+        counter[0] += 1
+        return lambda ops: ops[i]
+    if kind == "range":
+        j = counter[1]
+        counter[1] += 1
+        return lambda ops: RangeArray(ops[j])
+    if kind == "neg":
+        f = _compile(node[1], counter)
+        return lambda ops: -f(ops)
+    if kind == "pct":
+        f = _compile(node[1], counter)
+        return lambda ops: f(ops) / 100.0
+    if kind == "bin":
+        op = VECTOR_BINARY_OPS.get(node[1])
+        if op is None:
+            raise FormulaError(f"Operator {node[1]} is not vectorized")
+        a = _compile(node[2], counter)
+        b = _compile(node[3], counter)
+        return lambda ops: op(a(ops), b(ops))
+    if kind == "call":
+        name, args = node[1], [_compile(arg, counter) for arg in node[2]]
+        if name == "IF":
+            if not 1 <= len(args) <= 3:
+                raise FormulaError("IF takes 1 to 3 arguments")
+            cond = args[0]
+            then = args[1] if len(args) > 1 else (lambda ops: True)
+            other = args[2] if len(args) > 2 else (lambda ops: False)
+            # Both branches are computed; errors in the unused one are masked
+            return lambda ops: np.where(cond(ops), then(ops), other(ops))
+        if name == "MATCH":
+            # Vectorized for a constant match type only
+            match_type = _literal(node[2][2]) if len(node[2]) > 2 else 1.0
+            if match_type is None:
+                raise FormulaError("MATCH is vectorized for a constant match type only")
+            fn = _vmatch(match_type)
+            args = args[:2]
+        else:
+            fn = VECTOR_FUNCTIONS.get(name)
+        if fn is None:
+            raise FormulaError(f"Function {name} is not vectorized")
+        return lambda ops: fn(*[a(ops) for a in args])
+    raise FormulaError(f"Unknown AST node {kind}")
+
+
+def compile_vector(ast: tuple) -> VectorClosure:
+    """
+    Closure evaluating `ast` over operands: one row per ref_occurrences(ast)
+    entry, then one (n_cells, rows, cols) array per range_occurrences(ast)
+    entry. Raises FormulaError if the formula cannot be vectorized (or NumPy
+    is missing).
+    """
+    if np is None:
+        raise FormulaError("NumPy is required for vectorized evaluation")
+    return _compile(ast, [0, len(ref_occurrences(ast))])
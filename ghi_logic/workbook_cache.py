@@ -0,0 +1,264 @@
+"""
+Content-addressed on-disk cache of parsed Gene-Hull workbooks.
+
+Entries are keyed by a SHA-256 of the ODS bytes plus the reader options, and
+hold the streamed row runs in a compact binary form: int32 arrays for
+positions plus one interned string table for values, texts and formulas.
+The cache directory is size-bounded; least recently used entries go first.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .ods_stream import RowRanges, StreamCell, iter_sheets
+    from .ods_dom import iter_dom_sheets
+except ImportError:
+    from ods_stream import RowRanges, StreamCell, iter_sheets
+    from ods_dom import iter_dom_sheets
+
+BACKENDS = {"stream": iter_sheets, "odfpy": iter_dom_sheets}
+
+MAGIC = b"GHIC"
+FORMAT_VERSION = 1
+ENTRY_SUFFIX = ".ghic"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# [(sheet_name, [(row_idx, row_count, [StreamCell, ...]), ...]), ...]
+ParsedSheets = List[Tuple[str, List[Tuple[int, int, List[StreamCell]]]]]
+
+
+def default_cache_dir() -> str:
+    """GHI_CACHE_DIR if set, else ~/.cache/genehull"""
+    return os.environ.get("GHI_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "genehull")
+
+
+def _int_array(values: List[int]) -> bytes:
+    arr = array("i", values)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return struct.pack("<I", len(arr)) + arr.tobytes()
+
+
+def _read_int_array(buf: bytes, pos: int) -> Tuple[array, int]:
+    (n,) = struct.unpack_from("<I", buf, pos)
+    pos += 4
+    arr = array("i")
+    arr.frombytes(buf[pos:pos + 4 * n])
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr, pos + 4 * n
+
+
+def encode_sheets(sheets: ParsedSheets) -> bytes:
+    """Serialize parsed sheets to the binary cache format"""
+    strings: List[str] = []
+    index: Dict[str, int] = {}
+
+    def intern(s: Optional[str]) -> int:
+        if s is None:
+            return -1
+        i = index.get(s)
+        if i is None:
+            i = index[s] = len(strings)
+            strings.append(s)
+        return i
+
+    parts = [struct.pack("<I", len(sheets))]
+    for name, rows in sheets:
+        row_start, row_count, row_ncells = [], [], []
+        col, count, value, text, formula = [], [], [], [], []
+        for r, n, cells in rows:
+            row_start.append(r)
+            row_count.append(n)
+            row_ncells.append(len(cells))
+            for cell in cells:
+                col.append(cell.col)
+                count.append(cell.count)
+                value.append(intern(cell.value))
+                text.append(intern(cell.text))
+                formula.append(intern(cell.formula))
+        parts.append(struct.pack("<i", intern(name)))
+        for arr in (row_start, row_count, row_ncells, col, count, value, text, formula):
+            parts.append(_int_array(arr))
+
+    blob = "\0".join(strings).encode("utf-8")
+    body = struct.pack("<II", len(strings), len(blob)) + blob + b"".join(parts)
+    return MAGIC + struct.pack("<I", FORMAT_VERSION) + zlib.compress(body, 6)
+
+
+def decode_sheets(data: bytes) -> ParsedSheets:
+    """Inverse of encode_sheets; raises ValueError on a foreign/corrupt entry"""
+    if data[:4] != MAGIC or struct.unpack_from("<I", data, 4)[0] != FORMAT_VERSION:
+        raise ValueError("Not a workbook cache entry of this version")
+    try:
+        buf = zlib.decompress(data[8:])
+    except zlib.error as e:
+        raise ValueError(f"Corrupt workbook cache entry: {e}")
+
+    n_strings, n_bytes = struct.unpack_from("<II", buf, 0)
+    pos = 8
+    strings = buf[pos:pos + n_bytes].decode("utf-8").split("\0") if n_strings else []
+    pos += n_bytes
+    lookup = lambda i: strings[i] if i >= 0 else None
+
+    (n_sheets,) = struct.unpack_from("<I", buf, pos)
+    pos += 4
+    sheets: ParsedSheets = []
+    for _ in range(n_sheets):
+        (name_idx,) = struct.unpack_from("<i", buf, pos)
+        pos += 4
+        arrays = []
+        for _ in range(8):
+            arr, pos = _read_int_array(buf, pos)
+            arrays.append(arr)
+        row_start, row_count, row_ncells, col, count, value, text, formula = arrays
+
+        rows = []
+        k = 0
+        for r, n, ncells in zip(row_start, row_count, row_ncells):
+            cells = [StreamCell(col[i], count[i], lookup(value[i]), strings[text[i]], lookup(formula[i]))
+                     for i in range(k, k + ncells)]
+            k += ncells
+            rows.append((r, n, cells))
+        sheets.append((strings[name_idx], rows))
+    return sheets
+
+
+class WorkbookCache:
+    """Size-bounded directory of encoded workbooks keyed by content hash"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(ods_path: str, options: Optional[dict] = None) -> str:
+        """SHA-256 of the ODS bytes, the reader options and the format version"""
+        h = hashlib.sha256()
+        with open(ods_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        h.update(json.dumps([FORMAT_VERSION, options or {}], sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ENTRY_SUFFIX)
+
+    def get(self, key: str) -> Optional[ParsedSheets]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            sheets = decode_sheets(data)
+        except (OSError, ValueError, struct.error):
+            return None
+        try:
+            os.utime(path)  # mark as recently used for eviction
+        except OSError:
+            pass
+        return sheets
+
+    def put(self, key: str, sheets: ParsedSheets):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(encode_sheets(sheets))
+        os.replace(tmp, path)
+        self.evict()
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(ENTRY_SUFFIX):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits max_bytes"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self) -> int:
+        """Remove every entry; returns how many were removed"""
+        removed = 0
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+def read_sheets(ods_path: str,
+                sheets: Optional[Iterable[str]] = None,
+                row_ranges: Optional[RowRanges] = None,
+                cache: Optional[WorkbookCache] = None,
+                backend: str = "stream") -> ParsedSheets:
+    """
+    Read the selected sheets/rows of an ODS into memory with the given
+    backend ("stream" or "odfpy"), going through `cache` when given: an
+    unchanged workbook read with the same options is decoded from disk
+    instead of parsed.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown ODS backend '{backend}', expected one of {sorted(BACKENDS)}")
+    key = None
+    if cache is not None:
+        options = {
+            "backend": backend,
+            "sheets": sorted(sheets) if sheets is not None else None,
+            "row_ranges": {k: list(v) for k, v in sorted((row_ranges or {}).items())},
+        }
+        key = cache.key(ods_path, options)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    parse = BACKENDS[backend]
+    parsed: ParsedSheets = [(name, list(rows)) for name, rows in parse(ods_path, sheets, row_ranges)]
+    if cache is not None:
+        try:
+            cache.put(key, parsed)
+        except OSError:
+            pass  # a read-only or full cache dir must not break loading
+    return parsed
+
+
+def cache_from_argv(argv: List[str]) -> Optional[WorkbookCache]:
+    """
+    Handle the shared --no-cache / --clear-cache CLI flags. Removes them
+    from argv in place and returns the cache to use (None when bypassed).
+    """
+    cache = WorkbookCache()
+    if "--clear-cache" in argv:
+        argv.remove("--clear-cache")
+        print(f"Cleared {cache.clear()} cached workbook(s) in {cache.cache_dir}")
+    if "--no-cache" in argv:
+        argv.remove("--no-cache")
+        return None
+    return cache
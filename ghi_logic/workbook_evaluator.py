@@ -0,0 +1,826 @@
+"""
+Dependency-graph evaluation of a whole Gene-Hull workbook.
+
+Every formula cell of every loaded sheet is compiled once (formula_engine),
+the cross-sheet dependency graph is built and ordered topologically, and a
+recalculation evaluates each formula cell exactly once in that order. New
+"Gene-Hull" inputs therefore drive every offset without a LibreOffice
+round-trip, instead of reusing the values LibreOffice last saved.
+
+Changing an input marks its transitive dependents dirty; recalc() then
+re-evaluates only those cells, so small tweaks do not pay for a full pass.
+
+With NumPy, formula cells are grouped by (topological level, formula in
+R1C1 form): the long runs of Offsets formulas that differ only by row
+offsets become one FormulaGroup each, evaluated as array operations over
+gathered operands (vector_engine). Groups that cannot vectorize, and
+cells whose operands are not numeric, use the scalar closures.
+
+evaluate_batch() runs the same groups for N input scenarios at once: every
+cell carries a vector of N values and each group is one broadcast array
+operation per batch rather than one evaluation per scenario.
+
+Groups of one topological level are independent: with set_executor() large
+levels (and large groups, split into member chunks) run on a thread pool;
+NumPy releases the GIL inside array operations.
+
+Range references ([.A1:.B20]) depend on every cell of the range; a
+formula receives each range as a 2-D array and a group as one
+(members, rows, cols) gather.
+
+set_profiling() records the time, width and scalar fallbacks of every
+group evaluation (see profiling); disabled, it costs one check per level.
+
+recalc(targets) evaluates only the backward slice of the requested cells
+(their formula ancestors), for consumers that need a single block.
+
+At load time the input-independent subgraph (formulas that reach no input
+cell) is evaluated once and frozen as constants (`folded`); it is left out
+of the order, the groups and every later recalculation or batch.
+"""
+
+import os
+from collections.abc import Mapping
+from time import perf_counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import groupby
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+try:
+    from .formula_engine import (CompiledFormula, FormulaError, RangeRef, Ref, ast_from_json,
+                                 compile_formula, range_cells, range_shape, to_r1c1)
+    from .profiling import EvaluationProfile
+    from .sheet_store import parse_cell_ref
+    from .vector_engine import VectorClosure, compile_vector, np, range_occurrences, ref_occurrences
+except ImportError:
+    from formula_engine import (CompiledFormula, FormulaError, RangeRef, Ref, ast_from_json,
+                                compile_formula, range_cells, range_shape, to_r1c1)
+    from profiling import EvaluationProfile
+    from sheet_store import parse_cell_ref
+    from vector_engine import VectorClosure, compile_vector, np, range_occurrences, ref_occurrences
+
+# Smaller groups are cheaper to evaluate cell by cell (single scenario)
+MIN_VECTOR_GROUP = 8
+# Vector work (cells x operands x scenarios) below which a level stays
+# serial, and the smallest chunk handed to a worker thread
+PARALLEL_MIN_COST = 1_000_000
+PARALLEL_MIN_CHUNK = 100_000
+
+
+def _gather_range(values: "np.ndarray", idx: "np.ndarray", is_empty: "np.ndarray") -> "np.ndarray":
+    """values of the range cells idx[m, r, c], NaN for empty cells"""
+    empty = is_empty[idx]
+    if values.ndim == 2:
+        empty = empty[..., None]
+    return np.where(empty, np.nan, values[idx])
+
+
+def _vector_result(fn: VectorClosure, operands: "np.ndarray", ranges: List["np.ndarray"],
+                   values: "np.ndarray", is_empty: "np.ndarray", n_members: int) -> Optional["np.ndarray"]:
+    """fn over gathered operands, broadcast to (members[, scenarios]); None on error"""
+    with np.errstate(all="ignore"):
+        try:
+            ops = values[operands]
+            if ranges:
+                ops = list(ops) + [_gather_range(values, idx, is_empty) for idx in ranges]
+            result = fn(ops)
+        except (ArithmeticError, TypeError, ValueError):
+            return None
+    return np.broadcast_to(np.asarray(result, dtype=float), (n_members,) + values.shape[1:])
+
+
+class CircularReferenceError(FormulaError):
+    """The workbook formulas contain a dependency cycle"""
+
+    def __init__(self, cells: List[Ref]):
+        self.cells = cells
+        shown = ", ".join(f"{s}.{a}" for s, a in cells[:10])
+        more = f" (+{len(cells) - 10} more)" if len(cells) > 10 else ""
+        super().__init__(f"Circular reference between {shown}{more}")
+
+
+def _norm_addr(addr: str) -> str:
+    return addr.replace("$", "").upper()
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float))
+
+
+class FormulaGroup:
+    """
+    Formula cells of one topological level sharing an R1C1 formula.
+    `operands[k, m]` is the cell index feeding reference occurrence k of
+    member m, `ranges[k][m]` the (rows, cols) cell indices of its range
+    occurrence k; `fn` is the vector closure, or None when not vectorizable.
+    """
+
+    __slots__ = ("level", "r1c1", "members", "operands", "ranges", "fn")
+
+    def __init__(self, level: int, r1c1: str, members: "np.ndarray",
+                 operands: "np.ndarray", fn: Optional[VectorClosure],
+                 ranges: Optional[List["np.ndarray"]] = None):
+        self.level = level
+        self.r1c1 = r1c1
+        self.members = members
+        self.operands = operands
+        self.ranges = ranges or []
+        self.fn = fn
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __repr__(self) -> str:
+        mode = "vector" if self.fn is not None else "scalar"
+        return f"<FormulaGroup L{self.level} {self.r1c1!r} x{len(self)} {mode}>"
+
+
+class ScenarioBatch:
+    """
+    Values of every evaluator cell for N input scenarios. `values[i, n]` is
+    cell i in scenario n, NaN where `valid` is False (spreadsheet errors and
+    non-numeric results; the latter are kept in `extra[(i, n)]`).
+    """
+
+    def __init__(self, evaluator: "WorkbookEvaluator", values: "np.ndarray",
+                 valid: "np.ndarray", extra: Dict[Tuple[int, int], Any]):
+        self.evaluator = evaluator
+        self.values = values
+        self.valid = valid
+        self.extra = extra
+
+    def __len__(self) -> int:
+        return self.values.shape[1]
+
+    def value(self, sheet: str, addr: str) -> "np.ndarray":
+        """Length-N vector of a cell (NaN where unresolved or not numeric)"""
+        i = self.evaluator.index.get((sheet, _norm_addr(addr)))
+        if i is None:
+            return np.full(len(self), np.nan)
+        return self.values[i].copy()
+
+    def sheet_values(self, sheet: str) -> Dict[str, "np.ndarray"]:
+        return {addr: self.values[i].copy()
+                for (s, addr), i in self.evaluator.index.items() if s == sheet}
+
+
+class WorkbookEvaluator:
+    """
+    Evaluate all formula cells of `sheets` (sheet name -> "A1" mapping of
+    {"value", "text", "formula"} entries, e.g. GeneHullODSReader.sheets).
+
+    Cells are numbered; `vals[i]` holds the current value of cell i. Empty
+    referenced cells (`empty`) count as 0 and are skipped by range
+    functions, references into sheets that were not loaded are None (and
+    make dependent formulas unresolved). Formulas the
+    engine cannot compile keep their saved value and are listed in
+    `uncompiled`. `vectorize` (default: when NumPy is available) enables
+    grouped array evaluation.
+
+    Constant cells of `input_sheets` (default: every sheet) are the inputs;
+    with `fold_constants` formulas that depend on no input are computed
+    once here and cannot change afterwards.
+    """
+
+    def __init__(self, sheets: Dict[str, Mapping], vectorize: Optional[bool] = None,
+                 input_sheets: Optional[Iterable[str]] = None, fold_constants: bool = True):
+        self._init_graph(sheets, input_sheets)
+        self._load(sheets)
+        self._link()
+        self.order: List[int] = self._topological_order()
+        if fold_constants:
+            self._fold_constants()
+        # Saved values are not trusted until the first recalculation
+        self._prepare(vectorize, dirty=self.order)
+
+    def _init_graph(self, sheets: Dict[str, Mapping], input_sheets: Optional[Iterable[str]]):
+        self.sheets = sheets
+        self.index: Dict[Ref, int] = {}
+        self.cells: List[Ref] = []
+        self.vals: List[Any] = []
+        self.formulas: Dict[int, CompiledFormula] = {}
+        self.precedents: Dict[int, Tuple[int, ...]] = {}
+        self.dependents: Dict[int, List[int]] = {}
+        self.uncompiled: Dict[Ref, str] = {}
+        self.empty: Set[int] = set()
+        # Formula cell -> (number of ref operands, cell indices of each range)
+        self.range_slots: Dict[int, Tuple[int, List["np.ndarray"]]] = {}
+        self.input_sheets: Optional[FrozenSet[str]] = (
+            frozenset(input_sheets) if input_sheets is not None else None)
+        self.folded: Dict[int, CompiledFormula] = {}
+
+    def _prepare(self, vectorize: Optional[bool], dirty: Iterable[int],
+                 group_keys: Optional[Dict[Tuple[int, str], List[int]]] = None):
+        """Derived evaluation state: positions, levels, groups, numeric mirror"""
+        self.position: Dict[int, int] = {i: k for k, i in enumerate(self.order)}
+        self.levels: Dict[int, int] = self._levels()
+        self.dirty: Set[int] = set(dirty)
+        self._slices: Dict[FrozenSet[int], FrozenSet[int]] = {}
+        self.executor: Optional[Executor] = None
+        self.workers = 1
+        self.parallel_min_cost = PARALLEL_MIN_COST
+        self.profile: Optional[EvaluationProfile] = None
+        self._profile_keys: Optional[Dict[int, Tuple[int, str]]] = None
+
+        if vectorize is None:
+            vectorize = np is not None
+        if vectorize and np is None:
+            raise ImportError("numpy is required for vectorized evaluation")
+        self.groups: Optional[List[FormulaGroup]] = (
+            self._build_groups(group_keys) if vectorize else None)
+        if np is not None:
+            self.is_empty = np.zeros(len(self.cells), dtype=bool)
+            self.is_empty[list(self.empty)] = True
+        if self.groups is not None:
+            # Numeric mirror of vals for gathering group operands
+            self.num = np.array([v if _is_number(v) else np.nan for v in self.vals], dtype=float)
+            self.is_num = np.array([_is_number(v) for v in self.vals], dtype=bool)
+
+    # --- graph construction ---------------------------------------------------
+
+    def _slot(self, ref: Ref) -> int:
+        i = self.index.get(ref)
+        if i is None:
+            i = self.index[ref] = len(self.cells)
+            self.cells.append(ref)
+            sheet = self.sheets.get(ref[0])
+            self.vals.append(0.0 if sheet is not None else None)
+            if sheet is not None:
+                self.empty.add(i)
+        return i
+
+    def _load(self, sheets: Dict[str, Mapping]):
+        for sheet_name, sheet in sheets.items():
+            for addr, payload in sheet.items():
+                i = self._slot((sheet_name, addr))
+                self.empty.discard(i)
+                value = payload.get("value")
+                formula = payload.get("formula")
+                self.vals[i] = 0.0 if value is None else value
+                if not formula:
+                    continue
+                try:
+                    self.formulas[i] = compile_formula(formula, sheet_name)
+                except FormulaError as e:
+                    self.uncompiled[(sheet_name, addr)] = str(e)
+
+    def _range_index(self, rng: RangeRef) -> "np.ndarray":
+        """(rows, cols) cell indices of a range, creating empty cells"""
+        slots = [self._slot(ref) for ref in range_cells(rng)]
+        return np.array(slots, dtype=np.intp).reshape(range_shape(rng))
+
+    def _link(self):
+        for formulas in (self.formulas, self.folded):
+            for i, compiled in formulas.items():
+                precs = tuple(self._slot(ref) for ref in compiled.refs)
+                if compiled.ranges:
+                    # Operands stay first; range cells follow, once each
+                    ranges = [self._range_index(rng) for rng in compiled.ranges]
+                    self.range_slots[i] = (len(precs), ranges)
+                    seen = set(precs)
+                    extra = []
+                    for idx in ranges:
+                        for j in idx.ravel().tolist():
+                            if j not in seen:
+                                seen.add(j)
+                                extra.append(j)
+                    precs += tuple(extra)
+                self.precedents[i] = precs
+                for j in precs:
+                    self.dependents.setdefault(j, []).append(i)
+
+    def _topological_order(self) -> List[int]:
+        """Kahn's algorithm over formula cells; raises on cycles"""
+        pending = {i: sum(1 for j in precs if j in self.formulas)
+                   for i, precs in self.precedents.items()}
+        ready = [i for i, n in pending.items() if n == 0]
+        order: List[int] = []
+        while ready:
+            i = ready.pop()
+            order.append(i)
+            for k in self.dependents.get(i, ()):
+                pending[k] -= 1
+                if pending[k] == 0:
+                    ready.append(k)
+        if len(order) != len(self.formulas):
+            stuck = sorted(self.cells[i] for i, n in pending.items() if n > 0)
+            raise CircularReferenceError(stuck)
+        return order
+
+    def _is_input(self, i: int) -> bool:
+        return i not in self.formulas and (
+            self.input_sheets is None or self.cells[i][0] in self.input_sheets)
+
+    def _fold_constants(self):
+        """Evaluate formulas reaching no input once and freeze them"""
+        varying: Set[int] = set()
+        folded: List[int] = []
+        for i in self.order:
+            if any(j in varying or self._is_input(j) for j in self.precedents[i]):
+                varying.add(i)
+            else:
+                folded.append(i)
+        for i in folded:
+            self.vals[i] = self.formulas[i].evaluate(self._operands(i, self.vals.__getitem__))
+            self.folded[i] = self.formulas.pop(i)
+        self.order = [i for i in self.order if i in varying]
+
+    def _levels(self) -> Dict[int, int]:
+        """Longest chain of formula precedents; cells of one level are independent"""
+        levels: Dict[int, int] = {}
+        for i in self.order:
+            levels[i] = max((levels[j] + 1 for j in self.precedents[i] if j in levels), default=0)
+        return levels
+
+    def _group_keys(self) -> Dict[Tuple[int, str], List[int]]:
+        keyed: Dict[Tuple[int, str], List[int]] = {}
+        for i in self.order:
+            row, col = parse_cell_ref(self.cells[i][1])
+            key = (self.levels[i], to_r1c1(self.formulas[i].source, row, col))
+            keyed.setdefault(key, []).append(i)
+        return keyed
+
+    def _build_groups(self, keyed: Optional[Dict[Tuple[int, str], List[int]]] = None
+                      ) -> List[FormulaGroup]:
+        if keyed is None:
+            keyed = self._group_keys()
+
+        groups = []
+        for (level, r1c1), members in sorted(keyed.items(), key=lambda kv: kv[0][0]):
+            try:
+                fn = compile_vector(self.formulas[members[0]].ast)
+            except FormulaError:
+                fn = None
+            operands = np.array([[self.index[ref] for ref in ref_occurrences(self.formulas[i].ast)]
+                                 for i in members], dtype=np.intp).reshape(len(members), -1).T
+            ranges = []
+            if members[0] in self.range_slots:
+                occurrences = [range_occurrences(self.formulas[i].ast) for i in members]
+                try:
+                    ranges = [np.stack([self._range_index(occ[k]) for occ in occurrences])
+                              for k in range(len(occurrences[0]))]
+                except ValueError:
+                    # Mixed anchors can give members ranges of different shapes
+                    fn, ranges = None, []
+            groups.append(FormulaGroup(level, r1c1, np.array(members, dtype=np.intp), operands, fn, ranges))
+        return groups
+
+    # --- compiled state -------------------------------------------------------
+
+    def to_state(self) -> Dict[str, Any]:
+        """
+        JSON-friendly compiled state (without the sheets, see compiled_workbook).
+        Cell values are saved as loaded from the sheets: set_input() overrides
+        are dropped, and formulas they reached are saved dirty.
+        """
+        def formula_list(formulas: Dict[int, CompiledFormula]) -> list:
+            return [[i, f.source, f.host_sheet, f.ast] for i, f in formulas.items()]
+
+        vals, empty, dirty = list(self.vals), set(self.empty), set(self.dirty)
+        overridden = False
+        for i in range(len(self.cells)):
+            if i in self.formulas or i in self.folded:
+                continue
+            value, is_empty = self.loaded(i)
+            if is_empty != (i in empty) or type(value) is not type(vals[i]) or value != vals[i]:
+                vals[i] = value
+                (empty.add if is_empty else empty.discard)(i)
+                overridden = True
+        if overridden:
+            # Formula values were computed from the overrides
+            for i in self.formulas:
+                vals[i] = self.loaded(i)[0]
+            dirty = set(self.order)
+
+        groups = None
+        if self.groups is not None:
+            groups = [[g.level, g.r1c1, g.members.tolist()] for g in self.groups]
+        return {
+            "input_sheets": sorted(self.input_sheets) if self.input_sheets is not None else None,
+            "cells": [list(ref) for ref in self.cells],
+            "vals": vals,
+            "formulas": formula_list(self.formulas),
+            "folded": formula_list(self.folded),
+            "uncompiled": [[s, a, msg] for (s, a), msg in self.uncompiled.items()],
+            "empty": sorted(empty),
+            "order": self.order,
+            "dirty": sorted(dirty),
+            "groups": groups,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], sheets: Dict[str, Mapping],
+                   vectorize: Optional[bool] = None) -> "WorkbookEvaluator":
+        """Rebuild an evaluator from to_state() output without parsing any formula"""
+        self = cls.__new__(cls)
+        self._init_graph(sheets, state["input_sheets"])
+        self.cells = [tuple(ref) for ref in state["cells"]]
+        self.index = {ref: i for i, ref in enumerate(self.cells)}
+        self.vals = list(state["vals"])
+        self.empty = set(state.get("empty", ()))
+        for key, target in (("formulas", self.formulas), ("folded", self.folded)):
+            for i, source, host_sheet, ast in state[key]:
+                target[i] = CompiledFormula(source, host_sheet, ast_from_json(ast))
+        self.uncompiled = {(s, a): msg for s, a, msg in state["uncompiled"]}
+        self._link()
+        self.order = list(state["order"])
+
+        group_keys = None
+        if state.get("groups") is not None:
+            group_keys = {(level, r1c1): members for level, r1c1, members in state["groups"]}
+        self._prepare(vectorize, dirty=state["dirty"], group_keys=group_keys)
+        return self
+
+    # --- evaluation -------------------------------------------------------------
+
+    def cell_index(self, sheet: str, addr: str) -> int:
+        i = self.index.get((sheet, _norm_addr(addr)))
+        if i is None:
+            raise KeyError(f"{sheet}.{addr}")
+        return i
+
+    def _store(self, i: int, value: Any):
+        self.vals[i] = value
+        if self.groups is not None and i < len(self.num):
+            number = _is_number(value)
+            self.num[i] = value if number else np.nan
+            self.is_num[i] = number
+
+    def _input_index(self, sheet: str, addr: str, create: bool = True) -> Optional[int]:
+        if sheet not in self.sheets:
+            raise KeyError(f"Sheet '{sheet}' is not loaded")
+        if self.input_sheets is not None and sheet not in self.input_sheets:
+            raise ValueError(f"'{sheet}' is not an input sheet")
+        ref = (sheet, _norm_addr(addr))
+        i = self.index.get(ref)
+        if i is None:
+            return self._slot(ref) if create else None
+        if i in self.formulas or i in self.folded:
+            raise ValueError(f"{sheet}.{addr} is a formula cell, not an input")
+        return i
+
+    def set_input(self, sheet: str, addr: str, value: Any):
+        """Set a constant cell and mark its dependents; recalc() propagates it"""
+        i = self._input_index(sheet, addr)
+        if self.vals[i] == value and type(self.vals[i]) is type(value) and i not in self.empty:
+            return
+        if i in self.empty:
+            self.empty.discard(i)
+            if np is not None and i < len(self.is_empty):
+                self.is_empty[i] = False
+        self._store(i, value)
+        self._mark_dirty(i)
+
+    def _mark_dirty(self, i: int):
+        dirty = self.dirty
+        dependents = self.dependents
+        stack = [i]
+        while stack:
+            for k in dependents.get(stack.pop(), ()):
+                if k not in dirty:
+                    dirty.add(k)
+                    stack.append(k)
+
+    def _operands(self, i: int, value: Callable[[int], Any],
+                  empty: Optional[Set[int]] = None) -> List[Any]:
+        """Operands of formula cell i; `value` gives the value of a cell"""
+        precs = self.precedents[i]
+        if i not in self.range_slots:
+            return [value(j) for j in precs]
+        n_refs, ranges = self.range_slots[i]
+        if empty is None:
+            empty = self.empty
+        return [value(j) for j in precs[:n_refs]] + [self._range_operand(idx, value, empty) for idx in ranges]
+
+    @staticmethod
+    def _range_operand(idx: "np.ndarray", value: Callable[[int], Any],
+                       empty: Set[int]) -> Optional["np.ndarray"]:
+        """2-D array of a range, NaN for empty and text cells; None if a cell is an error"""
+        cells = idx.ravel().tolist()
+        values = [value(j) for j in cells]
+        if any(v is None for v in values):
+            return None
+        return np.array([v if _is_number(v) and j not in empty else np.nan
+                         for j, v in zip(cells, values)], dtype=float).reshape(idx.shape)
+
+    def _evaluate_scalar(self, order):
+        vals = self.vals
+        formulas = self.formulas
+        precedents = self.precedents
+        range_slots = self.range_slots
+        operands = self._operands
+        get = vals.__getitem__
+        if self.groups is None:
+            for i in order:
+                ops = [vals[j] for j in precedents[i]] if i not in range_slots else operands(i, get)
+                vals[i] = formulas[i].evaluate(ops)
+        else:
+            store = self._store
+            for i in order:
+                ops = [vals[j] for j in precedents[i]] if i not in range_slots else operands(i, get)
+                store(i, formulas[i].evaluate(ops))
+
+    def set_executor(self, executor: Optional[Executor], workers: Optional[int] = None,
+                     min_cost: int = PARALLEL_MIN_COST):
+        """
+        Evaluate large topological levels on `executor` (a ThreadPoolExecutor;
+        None: serial). Groups of one level are independent, and big groups
+        are split into member chunks, one task each. Levels whose vector
+        work (cells x operands x scenarios) is below min_cost stay serial.
+        """
+        if isinstance(executor, ProcessPoolExecutor):
+            raise ValueError("Formula closures cannot be sent to other processes; use a ThreadPoolExecutor")
+        self.executor = executor
+        self.workers = workers or getattr(executor, "_max_workers", None) or os.cpu_count() or 1
+        self.parallel_min_cost = min_cost
+
+    def _vector_results(self, items: List[Tuple[FormulaGroup, "np.ndarray", "np.ndarray", list]],
+                        values: "np.ndarray", is_empty: Optional["np.ndarray"] = None
+                        ) -> List[Optional["np.ndarray"]]:
+        """
+        Vector results for the (group, members, operands, ranges) items of one level,
+        None where the scalar path is needed. `values` is the numeric mirror
+        (one scenario) or a cells x scenarios matrix.
+        """
+        batch = values.ndim == 2
+        width = values.shape[1] if batch else 1
+
+        def usable(group, members):
+            return group.fn is not None and (batch or len(members) >= MIN_VECTOR_GROUP)
+
+        def cost(members, operands, ranges):
+            return len(members) * max(1, len(operands) + sum(r[0].size for r in ranges)) * width
+
+        costs = [cost(m, o, r) if usable(g, m) else 0 for g, m, o, r in items]
+        total = sum(costs)
+        if is_empty is None:
+            is_empty = self.is_empty
+        if self.executor is None or total < self.parallel_min_cost:
+            return [_vector_result(g.fn, o, r, values, is_empty, len(m)) if c else None
+                    for (g, m, o, r), c in zip(items, costs)]
+
+        target = max(total // (2 * self.workers), PARALLEL_MIN_CHUNK)
+        pending = []
+        for (group, members, operands, ranges), c in zip(items, costs):
+            if not c:
+                pending.append(None)
+                continue
+            n_chunks = min(len(members), -(-c // target))
+            bounds = np.linspace(0, len(members), n_chunks + 1).astype(int)
+            pending.append([self.executor.submit(_vector_result, group.fn, operands[:, a:b],
+                                                 [r[a:b] for r in ranges], values, is_empty, b - a)
+                            for a, b in zip(bounds[:-1], bounds[1:])])
+        results = []
+        for futures in pending:
+            if futures is None:
+                results.append(None)
+                continue
+            chunks = [f.result() for f in futures]
+            results.append(None if any(c is None for c in chunks) else np.concatenate(chunks))
+        return results
+
+    @staticmethod
+    def _level_items(groups: List[FormulaGroup], mask: Optional["np.ndarray"] = None):
+        """(group, members, operands, ranges) per topological level, restricted to mask"""
+        for _, level_groups in groupby(groups, key=lambda g: g.level):
+            items = []
+            for group in level_groups:
+                members, operands, ranges = group.members, group.operands, group.ranges
+                if mask is not None:
+                    selected = mask[members]
+                    if not selected.any():
+                        continue
+                    if not selected.all():
+                        members, operands = members[selected], operands[:, selected]
+                        ranges = [r[selected] for r in ranges]
+                items.append((group, members, operands, ranges))
+            if items:
+                yield items
+
+    def _apply_group(self, members: "np.ndarray", operands: "np.ndarray", ranges: list,
+                     result: Optional["np.ndarray"]) -> int:
+        """Store a group result; returns how many members took the scalar path"""
+        if result is None:
+            self._evaluate_scalar(members.tolist())
+            return len(members)
+        # Spreadsheet errors (x/0, SQRT(-1), overflow) and non-numeric operands
+        # (including text and error cells of ranges) take the scalar path,
+        # which reports them exactly like per-cell evaluation
+        ok = np.isfinite(result)
+        if operands.size:
+            ok &= self.is_num[operands].all(axis=0)
+        for idx in ranges:
+            ok &= self.is_num[idx].reshape(len(members), -1).all(axis=1)
+        good = members[ok]
+        values = result[ok]
+        self.num[good] = values
+        self.is_num[good] = True
+        vals = self.vals
+        for i, v in zip(good.tolist(), values.tolist()):
+            vals[i] = v
+        if ok.all():
+            return 0
+        scalar = members[~ok].tolist()
+        self._evaluate_scalar(scalar)
+        return len(scalar)
+
+    def set_profiling(self, enabled: bool = True) -> Optional[EvaluationProfile]:
+        """
+        Record every formula group evaluation from now on; returns the
+        EvaluationProfile (kept across calls until disabled). Groups are
+        timed one by one, so parallel levels are serialized while profiling.
+        """
+        if not enabled:
+            self.profile = None
+            return None
+        if self.profile is None:
+            self.profile = EvaluationProfile(self)
+        return self.profile
+
+    def _evaluate_scalar_profiled(self, order: List[int]):
+        # Without groups each cell is one evaluation of its (level, R1C1) group
+        if self._profile_keys is None:
+            self._profile_keys = {i: key for key, members in self._group_keys().items() for i in members}
+        record, keys = self.profile.record, self._profile_keys
+        for i in order:
+            start = perf_counter()
+            self._evaluate_scalar((i,))
+            level, r1c1 = keys[i]
+            record(("recalc", level, r1c1), [i], 1, perf_counter() - start, False, 1)
+
+    def _evaluate(self, dirty: Optional[Set[int]] = None):
+        profile = self.profile
+        if self.groups is None:
+            order = self.order if dirty is None else sorted(dirty, key=self.position.__getitem__)
+            if profile is not None:
+                self._evaluate_scalar_profiled(order)
+            else:
+                self._evaluate_scalar(order)
+            return
+        mask = None
+        if dirty is not None:
+            mask = np.zeros(len(self.cells), dtype=bool)
+            mask[np.fromiter(dirty, dtype=np.intp, count=len(dirty))] = True
+        for items in self._level_items(self.groups, mask):
+            if profile is None:
+                results = self._vector_results(items, self.num)
+                for (group, members, operands, ranges), result in zip(items, results):
+                    self._apply_group(members, operands, ranges, result)
+                continue
+            for item in items:
+                group, members, operands, ranges = item
+                start = perf_counter()
+                result = self._vector_results([item], self.num)[0]
+                scalar = self._apply_group(members, operands, ranges, result)
+                profile.record(("recalc", group.level, group.r1c1), members.tolist(), len(members),
+                               perf_counter() - start, result is not None, scalar)
+
+    def recalculate(self) -> int:
+        """Evaluate every formula cell once, in dependency order"""
+        self._evaluate()
+        self.dirty.clear()
+        return len(self.order)
+
+    def backward_slice(self, targets: Iterable[int]) -> FrozenSet[int]:
+        """Formula cells among `targets` and all their formula ancestors"""
+        key = frozenset(targets)
+        cached = self._slices.get(key)
+        if cached is not None:
+            return cached
+        needed: Set[int] = set()
+        stack = [i for i in key if i in self.formulas]
+        while stack:
+            i = stack.pop()
+            if i in needed:
+                continue
+            needed.add(i)
+            stack.extend(j for j in self.precedents[i] if j in self.formulas and j not in needed)
+        self._slices[key] = result = frozenset(needed)
+        return result
+
+    def recalc(self, targets: Optional[Iterable[int]] = None) -> int:
+        """
+        Re-evaluate dirty cells; returns how many were touched. With
+        `targets` (cell indices, see cell_index) only dirty cells in their
+        backward slice are evaluated; the rest stay dirty for later.
+        """
+        if not self.dirty:
+            return 0
+        if targets is None:
+            if len(self.dirty) == len(self.order):
+                return self.recalculate()
+            todo = self.dirty
+        else:
+            todo = self.dirty & self.backward_slice(targets)
+            if not todo:
+                return 0
+        touched = len(todo)
+        self._evaluate(todo)
+        self.dirty -= todo
+        return touched
+
+    # --- scenario batches --------------------------------------------------------
+
+    def _batch_operand(self, j: int, n: int, values, valid, extra) -> Any:
+        if valid[j, n]:
+            # Python floats, so 1/0 raises (and gives None) as in recalculate()
+            return float(values[j, n])
+        if (j, n) in extra:
+            return extra[(j, n)]
+        return None if j in self.formulas else self.vals[j]
+
+    def _batch_scalar(self, i: int, n: int, values, valid, extra, empty: Set[int]):
+        operands = self._operands(i, lambda j: self._batch_operand(j, n, values, valid, extra), empty)
+        result = self.formulas[i].evaluate(operands)
+        if _is_number(result):
+            values[i, n] = result
+            valid[i, n] = True
+        else:
+            values[i, n] = np.nan
+            valid[i, n] = False
+            if result is not None:
+                extra[(i, n)] = result
+
+    def evaluate_batch(self, inputs: Dict[Ref, Any]) -> ScenarioBatch:
+        """
+        Evaluate the workbook for N scenarios. `inputs` maps (sheet, addr) to
+        a length-N sequence (or a scalar shared by all scenarios); cells not
+        in `inputs` keep their current value. The evaluator state is not
+        modified.
+        """
+        if np is None:
+            raise ImportError("numpy is required for batch evaluation")
+        columns = {ref: np.asarray(v, dtype=float) for ref, v in inputs.items()}
+        sizes = {c.shape[0] for c in columns.values() if c.ndim == 1}
+        if len(sizes) > 1:
+            raise ValueError(f"Scenario inputs have different lengths: {sorted(sizes)}")
+        n_scenarios = sizes.pop() if sizes else 1
+
+        values = np.empty((len(self.cells), n_scenarios))
+        valid = np.empty((len(self.cells), n_scenarios), dtype=bool)
+        values[:] = np.array([v if _is_number(v) else np.nan for v in self.vals], dtype=float)[:, None]
+        valid[:] = np.array([_is_number(v) for v in self.vals], dtype=bool)[:, None]
+        empty, is_empty = self.empty, self.is_empty
+        for (sheet, addr), column in columns.items():
+            i = self._input_index(sheet, addr, create=False)
+            if i is None:
+                continue  # nothing refers to it
+            values[i] = column
+            valid[i] = True
+            if i in empty:
+                # An input over an empty range cell fills it in this batch only
+                empty, is_empty = empty - {i}, is_empty.copy()
+                is_empty[i] = False
+
+        extra: Dict[Tuple[int, int], Any] = {}
+        groups = self.groups if self.groups is not None else self._build_groups()
+        profile = self.profile
+        for items in self._level_items(groups):
+            if profile is None:
+                results = self._vector_results(items, values, is_empty)
+            for k, (group, members, operands, ranges) in enumerate(items):
+                if profile is None:
+                    result = results[k]
+                else:
+                    start = perf_counter()
+                    result = self._vector_results([items[k]], values, is_empty)[0]
+                if result is None:
+                    bad = np.ones((len(members), n_scenarios), dtype=bool)
+                else:
+                    ok = np.isfinite(result)
+                    if operands.size:
+                        ok &= valid[operands].all(axis=0)
+                    for idx in ranges:
+                        ok &= valid[idx].reshape(len(members), -1, n_scenarios).all(axis=1)
+                    values[members] = result
+                    valid[members] = ok
+                    bad = ~ok
+                for m, n in zip(*np.nonzero(bad)):
+                    self._batch_scalar(int(members[m]), int(n), values, valid, extra, empty)
+                if profile is not None:
+                    profile.record(("batch", group.level, group.r1c1), members.tolist(),
+                                   len(members) * n_scenarios, perf_counter() - start,
+                                   result is not None, int(np.count_nonzero(bad)))
+        return ScenarioBatch(self, values, valid, extra)
+
+    def loaded(self, i: int) -> Tuple[Any, bool]:
+        """(value, empty) of cell i as loaded from the sheets, ignoring set_input"""
+        if i in self.folded:
+            return self.vals[i], False
+        sheet, addr = self.cells[i]
+        cells = self.sheets.get(sheet)
+        if cells is None:
+            return None, False
+        payload = cells.get(addr)
+        if payload is None:
+            return 0.0, True
+        value = payload.get("value")
+        return 0.0 if value is None else value, False
+
+    def value(self, sheet: str, addr: str) -> Optional[Any]:
+        i = self.index.get((sheet, _norm_addr(addr)))
+        return self.vals[i] if i is not None else None
+
+    def sheet_values(self, sheet: str) -> Dict[str, Any]:
+        """Current value of every known cell of a sheet, keyed by address"""
+        return {addr: self.vals[i] for (s, addr), i in self.index.items() if s == sheet}
@@ -3,13 +3,18 @@ import re
 import os
 from typing import Dict, List, Tuple, Optional
 
-# Lazy imports to allow running without optional deps
+# Shared ODS extraction core (streaming reader + on-disk cache) from ghi_logic
 try:
-    from odf.opendocument import load
-    from odf.table import Table, TableRow, TableCell
-    from odf.text import P
-except Exception:
-    load = None  # type: ignore
+    from ghi_logic.ods_cells import raw_value, read_workbook, sheet_map
+    from ghi_logic.ods_dom import table_rows
+    from ghi_logic.workbook_cache import cache_from_argv
+except ImportError:
+    # Repo root not on the path (script use, or imported from elsewhere):
+    # ghi_logic sits next to this directory
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from ghi_logic.ods_cells import raw_value, read_workbook, sheet_map
+    from ghi_logic.ods_dom import table_rows
+    from ghi_logic.workbook_cache import cache_from_argv
 
 try:
     from reportlab.lib.pagesizes import A4
@@ -20,68 +25,11 @@ except Exception:
     REPORTLAB_AVAILABLE = False
 
 
-def col_to_letter(col_idx: int) -> str:
-    letters = ""
-    while col_idx > 0:
-        col_idx, rem = divmod(col_idx - 1, 26)
-        letters = chr(65 + rem) + letters
-    return letters
-
-
-def cell_address(row_idx: int, col_idx: int) -> str:
-    return f"{col_to_letter(col_idx)}{row_idx}"
-
-
-def get_text(cell: TableCell) -> str:
-    paras = cell.getElementsByType(P)
-    if not paras:
-        return ""
-    texts = []
-    for p in paras:
-        texts.append("".join([getattr(t, 'data', '') for t in p.childNodes]))
-    return "\n".join(texts).strip()
-
-
-def get_formula(cell: TableCell) -> Optional[str]:
-    # ODF formula attribute 'formula' (e.g., of:=SUM([.A1];[.B1]))
-    try:
-        return cell.getAttribute("formula")
-    except Exception:
-        return None
-
-
-def get_value(cell: TableCell) -> Optional[str]:
-    try:
-        val = cell.getAttribute("value")
-    except Exception:
-        val = None
-    if val is not None:
-        return val
-    txt = get_text(cell)
-    return txt if txt else None
-
-
-def read_sheet(table: Table) -> Dict[str, Dict[str, Optional[str]]]:
-    sheet_map: Dict[str, Dict[str, Optional[str]]] = {}
-    row_idx = 0
-    for row in table.getElementsByType(TableRow):
-        row_idx += 1
-        col_idx = 0
-        for cell in row.getElementsByType(TableCell):
-            try:
-                repeat_attr = cell.getAttribute("numbercolumnsrepeated")
-            except Exception:
-                repeat_attr = None
-            repeat = int(repeat_attr or "1")
-            for _ in range(repeat):
-                col_idx += 1
-                addr = cell_address(row_idx, col_idx)
-                sheet_map[addr] = {
-                    "text": get_text(cell),
-                    "value": get_value(cell),
-                    "formula": get_formula(cell),
-                }
-    return sheet_map
+def read_sheet(table) -> Dict[str, Dict[str, Optional[str]]]:
+    # Accepts an odfpy Table or the row runs of read_workbook; values are
+    # kept as the raw strings written in the file
+    rows = table_rows(table) if hasattr(table, "getElementsByType") else table
+    return sheet_map(rows, value_rule=raw_value)
 
 
 def parse_references(odf_formula: str) -> List[str]:
@@ -206,12 +154,10 @@ def generate_text(report_path: str, title: str, inputs: List[Tuple[str, Optional
 
 
 def main():
-    if load is None:
-        print("Errore: libreria odfpy non disponibile. Installa con 'pip install odfpy'.")
-        sys.exit(1)
+    cache = cache_from_argv(sys.argv)
 
     if len(sys.argv) < 2:
-        print("Uso: python ods_analyzer.py <percorso_file.ods> [--txt <percorso_report.txt>] [--pdf <percorso_report.pdf>]")
+        print("Uso: python ods_analyzer.py <percorso_file.ods> [--txt <percorso_report.txt>] [--pdf <percorso_report.pdf>] [--no-cache] [--clear-cache]")
         sys.exit(1)
 
     ods_path = sys.argv[1]
@@ -226,21 +172,20 @@ def main():
         if idx + 1 < len(sys.argv):
             txt_path = sys.argv[idx + 1]
 
-    doc = load(ods_path)
-    tables = doc.spreadsheet.getElementsByType(Table)
+    tables = read_workbook(ods_path, cache=cache)
     print(f"Trovati {len(tables)} fogli nel file ODS.")
     if not tables:
         print("Nessun foglio trovato nel file ODS.")
         sys.exit(1)
 
-    first_table = tables[0]
-    last_table = tables[-1]
-    first_name = first_table.getAttribute("name") or "PrimoFoglio"
-    last_name = last_table.getAttribute("name") or "UltimoFoglio"
+    first_name, first_rows = tables[0]
+    last_name, last_rows = tables[-1]
+    first_name = first_name or "PrimoFoglio"
+    last_name = last_name or "UltimoFoglio"
     print(f"Primo foglio: {first_name} | Ultimo foglio: {last_name}")
 
-    first_map = read_sheet(first_table)
-    last_map = read_sheet(last_table)
+    first_map = read_sheet(first_rows)
+    last_map = read_sheet(last_rows)
 
     inputs = summarize_inputs(first_map)
     outputs = summarize_outputs(last_name, last_map)